@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks device discovery against SNMP fixtures instead of real devices.
+
+Fixtures are recorded from real devices by running ptr-update with snmp.engine set to 'record',
+or generated with --generate. Devices are replayed with simulated latency and loss.
+DNS is not queried, every PTR is reported as not created.
+
+    ./benchmark/poller-benchmark.py --generate 5000 --interfaces 20
+    ./benchmark/poller-benchmark.py --workers 64 --latency 0.02 --loss 0.01
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from classes import Config
+from classes import Device
+from classes import DevicePoller
+from classes import Dispatcher
+from classes import DnsCheck
+from classes import PtrPipeline
+from classes.snmp_session import MemorySession
+
+
+class OfflineDnsCheck(DnsCheck):
+    """
+    DnsCheck that doesn't query DNS servers. Optionally waits to simulate DNS latency
+    """
+
+    def __init__(self, config, latency=0):
+        DnsCheck.__init__(self, config)
+        self.latency = latency
+
+    def get_fqdn(self, hostname):
+        return hostname
+
+    def get_a(self, hostname):
+        return None
+
+    def get_status(self, ip_address, expected_ptr):
+        if self.latency:
+            time.sleep(self.latency)
+        return None, DnsCheck.STATUS_NOT_CREATED
+
+
+def generate_fleet(fixtures_dir, device_number, interface_number):
+    """
+    Write fixture files for a synthetic fleet of devices
+    :param fixtures_dir:        Directory for fixture files
+    :param device_number:       Number of devices
+    :param interface_number:    Number of interfaces with IP address on each device
+    :return:
+    """
+    if not os.path.isdir(fixtures_dir):
+        os.makedirs(fixtures_dir)
+    for device in range(device_number):
+        hostname = 'bench-r%05d.domain.example' % device
+        session = MemorySession(hostname)
+        session.add('.1.3.6.1.2.1.1.3.0', '123456789', 'TICKS')
+        session.add('.1.3.6.1.2.1.31.1.5.0', '1000', 'TICKS')
+        for if_index in range(1, interface_number + 1):
+            ip_address = '10.%d.%d.%d' % (device / 256 % 256, device % 256, if_index)
+            session.add('.1.3.6.1.2.1.31.1.1.1.1.%d' % if_index, 'GigabitEthernet0/0/%d' % if_index, 'OCTETSTR')
+            session.add('.1.3.6.1.2.1.4.20.1.2.%s' % ip_address, str(if_index), 'INTEGER')
+            # HSRP VIP on every 10th interface
+            if if_index % 10 == 0:
+                session.add(
+                    '.1.3.6.1.4.1.9.9.106.1.2.1.1.11.%d.%d' % (if_index, if_index),
+                    '10.%d.%d.%d' % (device / 256 % 256, device % 256, 200 + if_index / 10),
+                    'IPADDR'
+                )
+        session.save('%s/%s.json' % (fixtures_dir, hostname))
+    print "Generated %d device(s) with %d interface(s) in %s" % (device_number, interface_number, fixtures_dir)
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-c", "--config", default="configuration.json",
+                    help="configuration file relative to script root (default: configuration.json)")
+parser.add_argument("-f", "--fixtures", help="fixture directory (default: snmp.fixtures.dir)")
+parser.add_argument("-g", "--generate", type=int, metavar="N", help="generate fixtures for N devices and exit")
+parser.add_argument("-i", "--interfaces", type=int, default=10, help="interfaces per generated device")
+parser.add_argument("-w", "--workers", type=int, help="number of devices polled in parallel")
+parser.add_argument("-l", "--latency", type=float, default=0, help="average SNMP response time in seconds")
+parser.add_argument("--loss", type=float, default=0, help="probability of SNMP request being lost")
+parser.add_argument("--dns-latency", type=float, default=0, help="time of each PTR check in seconds")
+parser.add_argument("-r", "--max-repetitions", type=int, help="GETBULK max repetitions. 0 for GETNEXT walks")
+parser.add_argument("-p", "--pipeline", action="store_true", help="use pipeline poller")
+args = parser.parse_args()
+
+logging.basicConfig(level=logging.CRITICAL)
+
+config = Config(filename=args.config)
+fixtures_dir = os.path.abspath(args.fixtures) if args.fixtures else config.get_snmp_fixtures_dir()
+
+if args.generate:
+    generate_fleet(fixtures_dir, args.generate, args.interfaces)
+    sys.exit(0)
+
+config.data['snmp']['engine'] = 'replay'
+config.data['snmp']['fixtures'] = {
+    'dir': fixtures_dir,
+    'latency': args.latency,
+    'loss': args.loss
+}
+if args.max_repetitions is not None:
+    config.data['snmp']['max_repetitions'] = args.max_repetitions
+
+dispatcher = Dispatcher(config, auto_load=False)
+dispatcher.dns = OfflineDnsCheck(config, args.dns_latency)
+for filename in sorted(os.listdir(fixtures_dir)):
+    if filename.endswith('.json'):
+        hostname = filename[:-len('.json')]
+        dispatcher.devices[hostname] = Device(
+            hostname, config, dispatcher.dns, dispatcher.snmp_cache, dispatcher.snmp_latency
+        )
+
+if args.pipeline:
+    poller = PtrPipeline(dispatcher, workers=args.workers)
+else:
+    poller = DevicePoller(dispatcher, workers=args.workers)
+
+start_time = time.time()
+poller.poll()
+delta_time = time.time() - start_time
+
+requests = sum(getattr(device.session, 'requests', 0) for device in dispatcher.devices.values())
+print "Poller:          %s (%d workers)" % (poller.__class__.__name__, poller.workers)
+print "Devices:         %d (%d failed)" % (len(dispatcher.devices), len(poller.failed_devices))
+print "Interfaces:      %d" % poller.interface_number
+print "IP addresses:    %d" % poller.ip_address_number
+print "SNMP requests:   %d" % requests
+print "Time:            %.2f sec (%.1f devices/sec)" % (delta_time, len(dispatcher.devices) / max(delta_time, 1e-6))
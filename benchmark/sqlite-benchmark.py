@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks saving PTRs to SQLite database with SqliteConnector.
+
+Bulk path (save_ptrs) is compared to the way PTRs were saved before it: one INSERT per PTR
+with parameters bound from a dict, all in a single transaction.
+Database is created in a temporary file relative to script root and removed afterwards.
+
+    ./benchmark/sqlite-benchmark.py --ptrs 100000
+    ./benchmark/sqlite-benchmark.py --ptrs 100000 --journal-mode DELETE --synchronous FULL
+"""
+
+import argparse
+import calendar
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from classes import Config
+from classes import Dispatcher
+from classes import Ptr
+from classes.connectors.sqlite.sqlite_connector import SqliteConnector
+
+
+def generate_ptrs(ptr_number):
+    """
+    Generate PTRs for consecutive IP addresses in 10.0.0.0/8
+    :param ptr_number:  Number of PTRs
+    :return: dict of Ptr objects
+    """
+    ptrs = {}
+    for x in range(ptr_number):
+        ip_int = (10 << 24) + x
+        hostname = 'bench-r%05d.domain.example.' % (x / 256)
+        ptr = Ptr(ip_int, 'bench-r%05d-gi0-0-%d.domain.example.' % (x / 256, x % 256), hostname,
+                  'GigabitEthernet0/0/%d' % (x % 256), status=Ptr.STATUS_OK)
+        ptrs[str(ptr.ip_address)] = ptr
+    return ptrs
+
+
+def run(name, connector, save):
+    connector.drop_ptr_table()
+    connector.create_ptr_table()
+    start_time = time.time()
+    save()
+    delta_time = time.time() - start_time
+    print "%-16s %.2f sec (%.0f rows/sec)" % (name + ':', delta_time, len(ptrs) / max(delta_time, 1e-6))
+
+
+def save_one_by_one():
+    # Row by row insert with named parameters, as save_ptrs did before it used executemany
+    sql = "INSERT OR REPLACE INTO `ptrs` VALUES (" \
+          ":ip_address, :hostname, :if_name, :ptr, :ptr_zone, :status, :insert_time" \
+          ")"
+    for ptr in ptrs.values():
+        data = {
+            "ip_address": ptr.ip_int(),
+            "hostname": ptr.hostname,
+            "if_name": ptr.if_name,
+            "ptr": ptr.ptr,
+            "ptr_zone": ptr.get_ptr_zone(),
+            "status": ptr.status,
+            "insert_time": calendar.timegm(ptr.time)
+        }
+        connector.c.execute(sql, data)
+    connector.connection.commit()
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-c", "--config", default="configuration.json",
+                    help="configuration file relative to script root (default: configuration.json)")
+parser.add_argument("-n", "--ptrs", type=int, default=100000, help="number of PTRs (default: 100000)")
+parser.add_argument("--chunk-size", type=int, help="rows saved in a single transaction")
+parser.add_argument("--journal-mode", help="SQLite journal mode (default: WAL)")
+parser.add_argument("--synchronous", help="SQLite synchronous setting (default: NORMAL)")
+parser.add_argument("--cache-size", type=int, help="SQLite cache size in pages, KiB if negative")
+parser.add_argument("--mmap-size", type=int, help="SQLite memory map size in bytes")
+args = parser.parse_args()
+
+logging.basicConfig(level=logging.CRITICAL)
+
+config = Config(filename=args.config)
+db = 'benchmark/sqlite-benchmark.sql'
+connector_config = {'db': db, 'enabled': False}
+for key in ['chunk_size', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size']:
+    if getattr(args, key) is not None:
+        connector_config[key] = getattr(args, key)
+config.data['connector']['sqlite'] = connector_config
+
+dispatcher = Dispatcher(config, auto_load=False)
+connector = SqliteConnector(dispatcher)
+ptrs = generate_ptrs(args.ptrs)
+connector.c.execute("PRAGMA journal_mode")
+print "PTRs:            %d" % len(ptrs)
+print "Journal mode:    %s" % connector.c.fetchone()[0]
+try:
+    run('one by one', connector, save_one_by_one)
+    run('save_ptrs', connector, lambda: connector.save_ptrs(ptrs))
+finally:
+    connector.connection.close()
+    db_file = os.path.dirname(os.path.abspath(__file__)) + '/../' + db
+    for suffix in ['', '-wal', '-shm']:
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
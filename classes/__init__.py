@@ -17,9 +17,19 @@
 
 
 from config import Config
+from dns_cache import DnsCache
+from nameserver_selector import NameserverSelector
+from zone_mirror import ZoneMirror
+from zone_transfer import ZoneTransfer
 from dns_check import DnsCheck
+from snmp_cache import SnmpCache
+from snmp_latency import SnmpLatency
+from circuit_breaker import CircuitBreaker
 from device import Device
 from device_interface import DeviceInterface
 from ptr import Ptr
+from poll_result import PollResult
 from dispatcher import Dispatcher
+from device_poller import DevicePoller
+from ptr_pipeline import PtrPipeline
 from email_report import EmailReport
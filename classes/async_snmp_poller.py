@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import time
+from collections import deque
+
+from pysnmp.error import PySnmpError
+from pysnmp.hlapi.asyncore import CommunityData
+from pysnmp.hlapi.asyncore import ContextData
+from pysnmp.hlapi.asyncore import ObjectIdentity
+from pysnmp.hlapi.asyncore import ObjectType
+from pysnmp.hlapi.asyncore import SnmpEngine
+from pysnmp.hlapi.asyncore import UdpTransportTarget
+from pysnmp.hlapi.asyncore import bulkCmd
+from pysnmp.hlapi.asyncore import nextCmd
+from pysnmp.proto.errind import RequestTimedOut
+from pysnmp.proto.rfc1905 import EndOfMibView
+
+from snmp_session import MemorySession
+
+
+class AsyncSnmpPoller:
+    """
+
+    Fetches SNMP tables used for device discovery from many devices at once.
+    All requests are sent from a single pysnmp asyncore dispatcher, without a thread per device.
+    Results are returned as MemorySession objects that Device.get_interfaces consumes
+    the same way as easysnmp sessions.
+
+    """
+
+    # Subtrees walked on each device:
+    # IP-MIB::ipAdEntIfIndex, CISCO-HSRP-MIB::cHsrpGrpVirtualIpAddr, IF-MIB::ifName
+    OIDS = [
+        '.1.3.6.1.2.1.4.20.1.2',
+        '.1.3.6.1.4.1.9.9.106.1.2.1.1.11',
+        '.1.3.6.1.2.1.31.1.1.1.1'
+    ]
+
+    def __init__(self, config, max_in_flight=None):
+        """
+        :param config:          Config instance
+        :param max_in_flight:   Maximum number of devices with outstanding requests
+        """
+        self.logger = logging.getLogger('dns_update.async_snmp_poller')
+        self.config = config
+        self.max_in_flight = max_in_flight if max_in_flight else config.get_snmp_max_in_flight()
+        self.engine = None
+        self._queue = deque()
+        self._sessions = {}
+
+    def poll(self, devices):
+        """
+        Walk discovery tables on all devices
+        :param devices: List of Device objects
+        :return: Dict of MemorySession objects keyed by device hostname
+        """
+        self.engine = SnmpEngine()
+        self._queue = deque(devices)
+        self._sessions = {}
+        self.logger.info("Polling %d device(s) with %d request(s) in flight" % (len(devices), self.max_in_flight))
+
+        for _ in range(min(self.max_in_flight, len(devices))):
+            self._start_next_device()
+        # Dispatcher is created with the first request sent
+        if self.engine.transportDispatcher:
+            self.engine.transportDispatcher.runDispatcher()
+            self.engine.transportDispatcher.closeDispatcher()
+
+        failed = len([x for x in self._sessions.values() if x.error])
+        self.logger.info("Polled %d device(s), %d failed" % (len(self._sessions), failed))
+        return self._sessions
+
+    def _start_next_device(self):
+        """
+        Start walking the next device in queue.
+        Devices that can't be reached (unresolvable hostname etc.) are skipped over.
+        :return:
+        """
+        while self._queue:
+            device = self._queue.popleft()
+            session = MemorySession(device.hostname)
+            self._sessions[device.hostname] = session
+            try:
+                target = UdpTransportTarget(
+                    (device.hostname, 161), timeout=device.get_snmp_timeout(), retries=device.get_snmp_retries()
+                )
+            except PySnmpError as e:
+                self.logger.error("Failed to connect to '%s': %s" % (device.hostname, e))
+                session.set_error(str(e))
+                continue
+            job = {
+                'device': device,
+                'session': session,
+                'target': target,
+                'oids': list(AsyncSnmpPoller.OIDS),
+                # Time of the first response. Used to measure response time for adaptive timeout
+                'start': None,
+                'timed': False
+            }
+            self._walk_next_oid(job)
+            return
+
+    def _walk_next_oid(self, job):
+        """
+        Start walking the next subtree for the device or finish with it
+        :param job: Device job dict
+        :return:
+        """
+        if not job['oids']:
+            self.logger.debug("Finished polling '%s'" % job['device'].hostname)
+            self._start_next_device()
+            return
+        oid = job['oids'].pop(0)
+        job['root'] = MemorySession.normalize_oid(oid).lstrip('.') + '.'
+        device = job['device']
+        auth_data = CommunityData(device.community, mpModel=1)
+        var_bind = ObjectType(ObjectIdentity(oid.lstrip('.')))
+        # GETBULK walk unless max repetitions is set to 0 for the device
+        if device.max_repetitions:
+            bulkCmd(
+                self.engine, auth_data, job['target'], ContextData(), 0, device.max_repetitions, var_bind,
+                cbFun=self._walk_callback, cbCtx=job, lookupMib=False
+            )
+        else:
+            nextCmd(
+                self.engine, auth_data, job['target'], ContextData(), var_bind,
+                cbFun=self._walk_callback, cbCtx=job, lookupMib=False
+            )
+
+    def _record_latency(self, job, error_indication):
+        """
+        Record response time of the second request sent to the device.
+        The first one also waits for engine startup and requests to other devices being sent.
+        :param job:                 Device job dict
+        :param error_indication:    Error returned by pysnmp
+        :return:
+        """
+        device = job['device']
+        if isinstance(error_indication, RequestTimedOut):
+            device.snmp_latency.record_loss(device.hostname)
+            job['timed'] = True
+        elif not error_indication:
+            if job['start']:
+                device.snmp_latency.record(device.hostname, time.time() - job['start'])
+                job['timed'] = True
+            else:
+                job['start'] = time.time()
+
+    def _walk_callback(self, snmp_engine, send_request_handle, error_indication,
+                       error_status, error_index, var_bind_table, job):
+        """
+        Called by dispatcher for every response received.
+        :return: True if the walk should continue
+        """
+        device = job['device']
+        if device.snmp_latency and not job['timed']:
+            self._record_latency(job, error_indication)
+
+        if error_indication or error_status:
+            error = error_indication if error_indication else error_status.prettyPrint()
+            self.logger.error("Failed to connect to '%s': %s" % (device.hostname, error))
+            job['session'].set_error(str(error))
+            job['oids'] = []
+            self._walk_next_oid(job)
+            return False
+
+        for var_bind_row in var_bind_table:
+            for oid, value in var_bind_row:
+                oid = str(oid)
+                # Walk is finished once we step out of the subtree
+                if isinstance(value, EndOfMibView) or not oid.startswith(job['root']):
+                    self._walk_next_oid(job)
+                    return False
+                job['session'].add(oid, value.prettyPrint(), value.__class__.__name__)
+        return True
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import time
+
+from state_file import StateFile
+
+
+class CircuitBreaker(StateFile):
+    """
+
+    Keeps track of devices that couldn't be polled.
+    After each consecutive failure device is skipped for a backoff period that doubles
+    every time (limited by max backoff). Once backoff expires device is polled again.
+    Successful poll resets the failure count.
+
+    """
+
+    def __init__(self, config, filename=None):
+        """
+        :param config:      Config instance
+        :param filename:    State file. circuit_breaker.json in state directory if not set
+        """
+        StateFile.__init__(self, filename if filename else config.get_state_dir() + '/circuit_breaker.json')
+        self.logger = logging.getLogger('dns_update.circuit_breaker')
+        self.backoff = config.get_breaker_backoff()
+        self.max_backoff = config.get_breaker_max_backoff()
+
+    def is_open(self, hostname):
+        """
+        Check if device should be skipped
+        :param hostname:    Device hostname
+        :return: True if device is in backoff period
+        """
+        entry = self.get(hostname)
+        return bool(entry) and time.time() < entry['retry_after']
+
+    def get_retry_after(self, hostname):
+        """
+        Returns time when device will be polled again
+        :param hostname:    Device hostname
+        :return: Unix timestamp or None if device didn't fail
+        """
+        entry = self.get(hostname)
+        return entry['retry_after'] if entry else None
+
+    def record_success(self, hostname):
+        """
+        Reset failure count for the device
+        :param hostname:    Device hostname
+        :return:
+        """
+        if self.get(hostname):
+            self.logger.info("'%s' polled successfully. Circuit breaker closed" % hostname)
+            self.delete(hostname)
+
+    def record_failure(self, hostname):
+        """
+        Increase failure count for the device and start the backoff period
+        :param hostname:    Device hostname
+        :return:
+        """
+        with self.lock:
+            failures = self.get(hostname, {}).get('failures', 0) + 1
+            backoff = min(self.backoff * 2 ** (failures - 1), self.max_backoff)
+            self.set(hostname, {
+                'failures': failures,
+                'retry_after': time.time() + backoff * 3600
+            })
+        self.logger.info("'%s' failed %d time(s). Skipping for %.1f hour(s)" % (hostname, failures, backoff))
@@ -138,6 +138,153 @@ class Config:
         """
         return self.data['dns']['search']['servers']
 
+    def get_ns_authoritative_prefixes(self):
+        """
+        Returns list of networks whose PTR zones are known to be on our DNS servers.
+        SOA isn't queried for IP addresses from these networks. Invalid networks are skipped.
+        :return: List of IPv4Network objects
+        """
+        try:
+            prefixes = self.data['dns']['authoritative_prefixes']
+        except KeyError:
+            self.logger.debug("No authoritative prefixes in configuration")
+            return []
+        networks = []
+        for prefix in prefixes:
+            try:
+                networks.append(ipaddress.IPv4Network(prefix))
+            except (ipaddress.AddressValueError, ipaddress.NetmaskValueError, ValueError):
+                self.logger.error("Invalid authoritative prefix '%s' in configuration" % prefix)
+        self.logger.info("There are %d authoritative prefix(es) in configuration" % len(networks))
+        return networks
+
+    def get_ns_max_in_flight(self, default=50):
+        """
+        Returns maximum number of DNS queries sent at once by DnsCheck.check_many
+        :param default: No value in Config - default value returned. Must be int >= 1
+        :return:
+        """
+        default = int(default)
+        try:
+            config_value = int(self.data['dns']['max_in_flight'])
+            if config_value < 1:
+                self.logger.warning(
+                    "DNS max in flight value in configuration file not positive. Returning default value of: %d" % default
+                )
+                return default
+            self.logger.info("DNS max in flight value in configuration file is: %d" % config_value)
+            return config_value
+        except KeyError:
+            self.logger.debug("No value set in configuration. Returning default value of: %d" % default)
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning("DNS max in flight value not integer. Returning default value of: %d" % default)
+            return default
+
+    def is_ns_hedge_enabled(self):
+        """
+        Check if query should also be sent to the next DNS server when the fastest one is late
+        :return: False only if dns.hedge is set to false
+        """
+        try:
+            return self.data['dns']['hedge'] is not False
+        except KeyError:
+            return True
+
+    def is_ns_cache_enabled(self):
+        """
+        Check if DNS answers should be cached
+        :return: True if dns.cache.enabled is set to true
+        """
+        try:
+            return self.data['dns']['cache']['enabled'] is True
+        except KeyError:
+            return False
+
+    def is_ns_cache_persistent(self):
+        """
+        Check if cached DNS answers should be kept between runs
+        :return: True if dns.cache.persist is set to true
+        """
+        try:
+            return self.data['dns']['cache']['persist'] is True
+        except KeyError:
+            return False
+
+    def _get_ns_cache_value(self, key, default):
+        """
+        Returns positive integer value from dns.cache section
+        :param key:         Key in dns.cache section
+        :param default:     No value in Config - default value returned. Must be int >= 1
+        :return:
+        """
+        default = int(default)
+        try:
+            config_value = int(self.data['dns']['cache'][key])
+            if config_value < 1:
+                self.logger.warning(
+                    "DNS cache '%s' value in configuration file not positive. Returning default value of: %d"
+                    % (key, default)
+                )
+                return default
+            self.logger.info("DNS cache '%s' value in configuration file is: %d" % (key, config_value))
+            return config_value
+        except KeyError:
+            self.logger.debug("No value set in configuration. Returning default value of: %d" % default)
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning("DNS cache '%s' value not integer. Returning default value of: %d" % (key, default))
+            return default
+
+    def get_ns_cache_size(self, default=10000):
+        """
+        Returns maximum number of cached DNS answers. Least recently used answers are removed first
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_ns_cache_value('size', default)
+
+    def get_ns_cache_negative_ttl(self, default=300):
+        """
+        Returns number of seconds non-existing names are cached if the answer doesn't have SOA record
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_ns_cache_value('negative_ttl', default)
+
+    def is_ns_axfr_enabled(self):
+        """
+        Check if PTR zones we're authoritative for should be transferred instead of querying each PTR
+        :return: True if dns.axfr.enabled is set to true
+        """
+        try:
+            return self.data['dns']['axfr']['enabled'] is True
+        except KeyError:
+            return False
+
+    def is_ns_zone_mirror_enabled(self):
+        """
+        Check if transferred zones should be kept between runs and updated with IXFR
+        :return: True if dns.axfr.mirror is set to true
+        """
+        try:
+            return self.data['dns']['axfr']['mirror'] is True
+        except KeyError:
+            return False
+
+    def get_ns_axfr_master(self):
+        """
+        Returns master server zones are transferred from and TSIG key used for the transfer.
+        Both are taken from DNS connector configuration.
+        :return: tuple (hostname, key) or None if DNS connector isn't configured
+        """
+        try:
+            connector = self.data['connector']['dns']
+            return connector['hostname'], connector.get('key')
+        except KeyError:
+            self.logger.warning("No DNS connector hostname in configuration. Zone transfers disabled")
+            return None
+
     def get_device_ignore_rules(self):
         """
         Returns ignore devices
@@ -177,19 +324,63 @@ class Config:
             self.logger.info("No device specified, returning default community '%s'" % default)
             return default
 
-        for hostname_match, community in self._get_snmp_overridden_communities().iteritems():
+        community = self._match_hostname_override(self._get_snmp_overridden_communities(), hostname)
+        if community is not None:
+            self.logger.info("Community for '%s' found: '%s'" % (hostname, community))
+            return community
+
+        self.logger.info("No custom rules found for hostname, returning default community '%s'" % default)
+        return default
+
+    def _match_hostname_override(self, overrides, hostname):
+        """
+        Go trough override rules and return value of the first rule
+        whose hostname regexp matches provided hostname
+        :param overrides:   dict {hostname regexp: value}
+        :param hostname:    Device hostname
+        :return: Value or None if no rule matches
+        """
+        for hostname_match, value in overrides.iteritems():
             try:
                 if re.match(hostname_match, hostname):
-                    self.logger.info("Community for '%s' found: '%s'" % (hostname, community))
-                    return community
+                    return value
                 else:
-                    self.logger.debug("Community for '%s' not found in rule '%s'" % (hostname, hostname_match))
+                    self.logger.debug("Hostname '%s' not matched by rule '%s'" % (hostname, hostname_match))
             except sre_constants.error:
-                self.logger.error("Custom SNMP community rule '%s' not valid." % hostname_match)
+                self.logger.error("Custom SNMP rule '%s' not valid." % hostname_match)
                 continue
+        return None
 
-        self.logger.info("No custom rules found for hostname, returning default community '%s'" % default)
-        return default
+    def get_snmp_max_repetitions(self, hostname=None, default=10):
+        """
+        Returns max-repetitions value used for GETBULK walks on given hostname.
+        Value can be a single number or a dict with default value and per host overrides
+        (regexp matching of hostname, same as community overrides). 0 disables GETBULK.
+        :param hostname:    Device hostname
+        :param default:     No value in Config - default value returned. Must be int >= 0
+        :return:
+        """
+        default = int(default)
+        config_value = self.data['snmp'].get('max_repetitions', default)
+        if isinstance(config_value, dict):
+            overrides = config_value.get('override', {})
+            config_value = config_value.get('default', default)
+            if hostname:
+                override = self._match_hostname_override(overrides, hostname)
+                if override is not None:
+                    self.logger.info("Max repetitions for '%s' found: '%s'" % (hostname, override))
+                    config_value = override
+        try:
+            config_value = int(config_value)
+            if config_value < 0:
+                self.logger.warning(
+                    "Max repetitions value in configuration not positive. Returning default value of: %d" % default
+                )
+                return default
+            return config_value
+        except (TypeError, ValueError):
+            self.logger.warning("Max repetitions value not integer. Returning default value of: %d" % default)
+            return default
 
     def get_snmp_retries(self, default=0):
         """
@@ -247,6 +438,346 @@ class Config:
             self.logger.warning("No value set in configuration. Returning default value of: %d" % default)
             return default
 
+    def is_snmp_adaptive_timeout_enabled(self):
+        """
+        Check if SNMP timeout and retries should be derived from recorded response times of each device
+        :return: True if snmp.adaptive_timeout.enabled is set to true
+        """
+        try:
+            return self.data['snmp']['adaptive_timeout']['enabled'] is True
+        except KeyError:
+            return False
+
+    def _get_snmp_adaptive_timeout_value(self, key, default, value_type=float):
+        """
+        Returns value from snmp.adaptive_timeout section
+        :param key:         Key in snmp.adaptive_timeout section
+        :param default:     No value in Config - default value returned. Must be positive
+        :param value_type:  float or int
+        :return:
+        """
+        default = value_type(default)
+        try:
+            config_value = value_type(self.data['snmp']['adaptive_timeout'][key])
+            if config_value <= 0:
+                self.logger.warning(
+                    "Adaptive timeout '%s' value in configuration not positive. Returning default value of: %s"
+                    % (key, default)
+                )
+                return default
+            self.logger.info("Adaptive timeout '%s' value in configuration file is: %s" % (key, config_value))
+            return config_value
+        except KeyError:
+            self.logger.debug("No value set in configuration. Returning default value of: %s" % default)
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning(
+                "Adaptive timeout '%s' value is invalid. Returning default value of: %s" % (key, default)
+            )
+            return default
+
+    def get_snmp_timeout_factor(self, default=3):
+        """
+        Returns multiplier applied to 99th percentile of device response times
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_snmp_adaptive_timeout_value('factor', default)
+
+    def get_snmp_min_timeout(self, default=0.1):
+        """
+        Returns lowest timeout derived from device response times
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_snmp_adaptive_timeout_value('min', default)
+
+    def get_snmp_max_timeout(self, default=5):
+        """
+        Returns highest timeout derived from device response times
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_snmp_adaptive_timeout_value('max', default)
+
+    def get_snmp_max_retries(self, default=3):
+        """
+        Returns highest number of retries for devices that lost requests
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_snmp_adaptive_timeout_value('max_retries', default, int)
+
+    def get_snmp_engine(self, default='easysnmp'):
+        """
+        Returns SNMP engine used for device discovery:
+            - easysnmp: blocking easysnmp session per device
+            - pysnmp:   asynchronous pysnmp engine polling many devices from a single thread
+            - record:   easysnmp session per device. Responses are saved to fixture files
+            - replay:   responses are served from fixture files with simulated latency and loss
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        engines = ['easysnmp', 'pysnmp', 'record', 'replay']
+        engine = self.data['snmp'].get('engine', default)
+        if engine not in engines:
+            self.logger.warning("Unknown SNMP engine '%s'. Returning default value of: %s" % (engine, default))
+            return default
+        self.logger.debug("SNMP engine is: %s" % engine)
+        return engine
+
+    def get_snmp_fixtures_dir(self):
+        """
+        Returns directory with SNMP fixture files used by record and replay engines.
+        snmp.fixtures.dir from configuration file (relative to script root) or 'fixtures' in state directory
+        :return: Absolute path to directory
+        """
+        try:
+            root = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + '/..')
+            return os.path.join(root, self.data['snmp']['fixtures']['dir'])
+        except KeyError:
+            return self.get_state_dir() + '/fixtures'
+
+    def get_snmp_replay_latency(self, default=0):
+        """
+        Returns average response time in seconds simulated by replay engine
+        :param default: No value in Config - default value returned. Must be >= 0
+        :return:
+        """
+        default = float(default)
+        try:
+            config_value = float(self.data['snmp']['fixtures']['latency'])
+            if config_value < 0:
+                self.logger.warning("Replay latency is negative. Returning default value of: %s" % default)
+                return default
+            return config_value
+        except KeyError:
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning("Replay latency is invalid. Returning default value of: %s" % default)
+            return default
+
+    def get_snmp_replay_loss(self, default=0):
+        """
+        Returns probability of request being lost simulated by replay engine
+        :param default: No value in Config - default value returned. Must be 0 <= loss < 1
+        :return:
+        """
+        default = float(default)
+        try:
+            config_value = float(self.data['snmp']['fixtures']['loss'])
+            if not 0 <= config_value < 1:
+                self.logger.warning("Replay loss not in [0, 1) range. Returning default value of: %s" % default)
+                return default
+            return config_value
+        except KeyError:
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning("Replay loss is invalid. Returning default value of: %s" % default)
+            return default
+
+    def get_snmp_max_in_flight(self, default=100):
+        """
+        Returns maximum number of devices polled at once by asynchronous SNMP engine
+        :param default: No value in Config - default value returned. Must be int >= 1
+        :return:
+        """
+        default = int(default)
+        try:
+            config_value = int(self.data['snmp']['max_in_flight'])
+            if config_value < 1:
+                self.logger.warning(
+                    "Max in flight value in configuration file not positive. Returning default value of: %d" % default
+                )
+                return default
+            self.logger.info("Max in flight value in configuration file is: %d" % config_value)
+            return config_value
+        except KeyError:
+            self.logger.debug("No value set in configuration. Returning default value of: %d" % default)
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning("Max in flight value not integer. Returning default value of: %d" % default)
+            return default
+
+    def get_poller_workers(self, default=1):
+        """
+        Returns number of devices that are polled and checked in parallel
+        :param default: No value in Config - default value returned. Must be int >= 1
+        :return:
+        """
+        default = int(default)
+        try:
+            config_value = int(self.data['poller']['workers'])
+            if config_value < 1:
+                self.logger.warning(
+                    "Number of workers in configuration file not positive. Returning default value of: %d" % default
+                )
+                return default
+            self.logger.info("Number of workers in configuration file is: %d" % config_value)
+            return config_value
+        except KeyError:
+            self.logger.debug("No value set in configuration. Returning default value of: %d" % default)
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning("Number of workers not integer. Returning default value of: %d" % default)
+            return default
+
+    def get_state_dir(self):
+        """
+        Returns directory where state kept between runs (SNMP cache...) is stored.
+        Order of lookup:
+            - state.dir from configuration file (relative to script root directory)
+            - directory of SQLite connector database
+            - script root directory
+        :return: Absolute path to directory
+        """
+        root = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + '/..')
+        try:
+            state_dir = os.path.join(root, self.data['state']['dir'])
+        except KeyError:
+            try:
+                state_dir = os.path.dirname(os.path.join(root, self.data['connector']['sqlite']['db']))
+            except KeyError:
+                state_dir = root
+        self.logger.debug("State directory is: %s" % state_dir)
+        return state_dir
+
+    def is_snmp_cache_enabled(self):
+        """
+        Check if ifName and HSRP tables should be cached between runs
+        :return: True if snmp.cache.enabled is set to true
+        """
+        try:
+            return self.data['snmp']['cache']['enabled'] is True
+        except KeyError:
+            return False
+
+    def get_snmp_cache_max_age(self, default=24):
+        """
+        Returns number of hours after which cached SNMP tables are fetched again even if device didn't change
+        :param default: No value in Config - default value returned. Must be int >= 0
+        :return:
+        """
+        default = int(default)
+        try:
+            config_value = int(self.data['snmp']['cache']['max_age'])
+            if config_value < 0:
+                self.logger.warning(
+                    "SNMP cache max age in configuration file is negative. Returning default value of: %d" % default
+                )
+                return default
+            self.logger.info("SNMP cache max age in configuration file is: %d" % config_value)
+            return config_value
+        except KeyError:
+            self.logger.debug("No value set in configuration. Returning default value of: %d" % default)
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning("SNMP cache max age not integer. Returning default value of: %d" % default)
+            return default
+
+    def _get_poller_value(self, key, default):
+        """
+        Returns positive integer value from poller section
+        :param key:         Key in poller section
+        :param default:     No value in Config - default value returned. Must be int >= 1
+        :return:
+        """
+        default = int(default)
+        try:
+            config_value = int(self.data['poller'][key])
+            if config_value < 1:
+                self.logger.warning(
+                    "Poller '%s' value in configuration file not positive. Returning default value of: %d"
+                    % (key, default)
+                )
+                return default
+            self.logger.info("Poller '%s' value in configuration file is: %d" % (key, config_value))
+            return config_value
+        except KeyError:
+            self.logger.debug("No value set in configuration. Returning default value of: %d" % default)
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning("Poller '%s' value not integer. Returning default value of: %d" % (key, default))
+            return default
+
+    def get_poller_dns_workers(self, default=None):
+        """
+        Returns number of threads checking PTRs in pipeline mode
+        :param default: No value in Config - default value returned. Number of poller workers if not set
+        :return:
+        """
+        return self._get_poller_value('dns_workers', default if default else self.get_poller_workers())
+
+    def get_poller_queue_size(self, default=1000):
+        """
+        Returns maximum number of items waiting between pipeline stages
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_poller_value('queue_size', default)
+
+    def get_poller_batch_size(self, default=100):
+        """
+        Returns number of PTRs saved through connectors at once in pipeline mode
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_poller_value('batch_size', default)
+
+    def is_breaker_enabled(self):
+        """
+        Check if devices that failed to be polled should be skipped for a backoff period
+        :return: True if poller.breaker.enabled is set to true
+        """
+        try:
+            return self.data['poller']['breaker']['enabled'] is True
+        except KeyError:
+            return False
+
+    def _get_breaker_value(self, key, default):
+        """
+        Returns value from poller.breaker section
+        :param key:         Key in poller.breaker section
+        :param default:     No value in Config - default value returned. Must be positive
+        :return:
+        """
+        default = float(default)
+        try:
+            config_value = float(self.data['poller']['breaker'][key])
+            if config_value <= 0:
+                self.logger.warning(
+                    "Circuit breaker '%s' value in configuration not positive. Returning default value of: %s"
+                    % (key, default)
+                )
+                return default
+            self.logger.info("Circuit breaker '%s' value in configuration file is: %s" % (key, config_value))
+            return config_value
+        except KeyError:
+            self.logger.debug("No value set in configuration. Returning default value of: %s" % default)
+            return default
+        except (TypeError, ValueError):
+            self.logger.warning(
+                "Circuit breaker '%s' value is invalid. Returning default value of: %s" % (key, default)
+            )
+            return default
+
+    def get_breaker_backoff(self, default=1):
+        """
+        Returns number of hours device is skipped after the first failure.
+        Doubles with each consecutive failure.
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_breaker_value('backoff', default)
+
+    def get_breaker_max_backoff(self, default=168):
+        """
+        Returns maximum number of hours device is skipped
+        :param default: No value in Config - default value returned
+        :return:
+        """
+        return self._get_breaker_value('max_backoff', default)
+
     def is_device_ignored(self, hostname):
         """
         Go trough each ignore rule and check
@@ -25,6 +25,9 @@ class BaseConnector:
     Connector name is used for fetching connector's configuration
     """
 
+    # Statuses of PTRs passed to save_ptrs (Ptr.STATUS_NOT_CREATED...). All PTRs are passed if None
+    ptr_statuses = None
+
     def __init__(self, dispatcher):
         # Get connector's config
         self.config = dispatcher.get_connector_config(self)
@@ -32,6 +35,32 @@ class BaseConnector:
         if "enabled" in self.config and self.config["enabled"]:
             dispatcher.register_connector(self)
 
+    def _get_positive(self, name, default, value_type=int, section=None, allow_zero=False):
+        """
+        Returns positive number from connector's config. Connector's logger is used for warnings
+        :param name:        Config key
+        :param default:     No value or invalid value in config - Default value returned
+        :param value_type:  int or float
+        :param section:     Key of the config section the value is in. Top level of connector's config if not set
+        :param allow_zero:  Accept 0 as well
+        :return:
+        """
+        config = self.config
+        if section:
+            config = self.config[section] if section in self.config else {}
+        if name not in config:
+            return default
+        try:
+            value = value_type(config[name])
+            if value > 0 or (allow_zero and value == 0):
+                return value
+        except (TypeError, ValueError):
+            pass
+        self.logger.warning("Value of '%s' in configuration not a %s number. Returning default value of: %s" % (
+            section + '.' + name if section else name, 'non-negative' if allow_zero else 'positive', default
+        ))
+        return default
+
     def get_connector_name(self):
         connector_name = re.match('(.*)Connector', self.__class__.__name__)
         return connector_name.group(1).lower()
@@ -63,8 +92,17 @@ class BaseConnector:
 
     def delete_ptrs(self, ip_addresses):
         """
-        Delete PTRs for given IP addresses
-        :param ip_addresses:
+        Delete PTRs for given IP addresses.
+        If dict of Ptr objects is given, connector may delete only records that still have the same PTR
+        :param ip_addresses:    List of IP addresses or dict of Ptr objects keyed by IP address
+        :return: List of IP addresses whose PTRs were deleted
+        """
+        raise NotImplementedError()
+
+    def load_stale_ptrs(self):
+        """
+        Returns PTRs that are most likely obsolete (not seen for a long time)
+        in the same format as `load_ptrs`. Connector-dependent behaviour.
         :return:
         """
         raise NotImplementedError()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import socket
+import struct
+import threading
+import dns.entropy
+import dns.message
+import dns.query
+
+
+class DnsChannel:
+    """
+
+    TCP connection to the DNS server kept open between messages.
+    Messages are pipelined: up to max_in_flight messages are sent before waiting for responses.
+    Responses are matched to requests by message ID, so the server may answer out of order.
+    Broken connection is reopened and messages without response are sent again.
+
+    """
+
+    def __init__(self, hostname, port=53, timeout=10, max_in_flight=10, retries=1, governor=None):
+        """
+        :param hostname:        DNS server
+        :param port:            DNS server port
+        :param timeout:         Seconds to wait for connection and each response
+        :param max_in_flight:   Maximum number of messages waiting for response
+        :param retries:         Number of reconnects for a single send_many call
+        :param governor:        RateGovernor instance. Messages are sent without delay if not set
+        """
+        self.logger = logging.getLogger('dns_update.connector.dns.channel')
+        self.hostname = hostname
+        self.port = port
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.governor = governor
+        self.socket = None
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+
+    def _connect(self):
+        self.logger.debug("Connecting to %s:%d" % (self.hostname, self.port))
+        self.socket = socket.create_connection((self.hostname, self.port), self.timeout)
+        self.connections += 1
+
+    def close(self):
+        """
+        Close connection to the server. It's reopened on next send
+        :return:
+        """
+        if self.socket:
+            try:
+                self.socket.close()
+            except socket.error:
+                pass
+            self.socket = None
+
+    def send(self, message):
+        """
+        Send a single message
+        :param message: dns.message.Message instance
+        :return: Response message
+        """
+        return self.send_many([message])[0]
+
+    def send_many(self, messages):
+        """
+        Send messages over the same connection.
+        Raises socket.error if connection fails more than `retries` times,
+        dns.query.BadResponse if response doesn't match the request. Connection is closed on any error
+        :param messages:    List of dns.message.Message instances
+        :return: List of response messages in the same order
+        """
+        responses = [None] * len(messages)
+        pending = range(len(messages))
+        attempt = 0
+        with self.lock:
+            while pending:
+                in_flight = {}
+                try:
+                    if not self.socket:
+                        self._connect()
+                    self._exchange(messages, pending, in_flight, responses)
+                except (socket.error, EOFError) as e:
+                    self.close()
+                    # Messages without response are sent again on the new connection
+                    pending = sorted(pending + in_flight.values())
+                    attempt += 1
+                    if attempt > self.retries:
+                        raise
+                    self.logger.warning("Connection to %s failed: %s. Reconnecting..." % (self.hostname, e))
+                except Exception:
+                    # Responses to messages still in flight would be read by the next call
+                    self.close()
+                    raise
+        return responses
+
+    def _exchange(self, messages, pending, in_flight, responses):
+        """
+        Send pending messages keeping up to max_in_flight of them waiting for response
+        :param messages:    List of all messages
+        :param pending:     Indexes of messages not sent yet. Sent ones are removed
+        :param in_flight:   Indexes of messages waiting for response keyed by message ID
+        :param responses:   List of responses. Filled as responses arrive
+        :return:
+        """
+        while pending or in_flight:
+            while pending and len(in_flight) < self.max_in_flight:
+                index = pending[0]
+                message = messages[index]
+                # Message ID must be unique on the connection
+                while message.id in in_flight:
+                    message.id = dns.entropy.random_16()
+                if self.governor:
+                    self.governor.acquire(message.origin.to_text() if message.origin else None)
+                # Signed after the wait so TSIG time is current
+                wire = message.to_wire()
+                self.socket.sendall(struct.pack('!H', len(wire)) + wire)
+                in_flight[message.id] = index
+                pending.pop(0)
+                self.messages += 1
+            wire = self._receive()
+            (message_id,) = struct.unpack('!H', wire[:2])
+            index = in_flight.pop(message_id, None)
+            if index is None:
+                self.logger.warning("Unexpected response with ID %d from %s" % (message_id, self.hostname))
+                continue
+            request = messages[index]
+            response = dns.message.from_wire(wire, keyring=request.keyring, request_mac=request.mac)
+            if not request.is_response(response):
+                raise dns.query.BadResponse
+            responses[index] = response
+
+    def _receive(self):
+        """
+        Read single length-prefixed message from the connection
+        :return: Message in wire format
+        """
+        (length,) = struct.unpack('!H', self._read(2))
+        return self._read(length)
+
+    def _read(self, count):
+        data = ''
+        while len(data) < count:
+            chunk = self.socket.recv(count - len(data))
+            if not chunk:
+                raise EOFError("Connection closed by %s" % self.hostname)
+            data += chunk
+        return data
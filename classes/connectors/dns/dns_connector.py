@@ -17,49 +17,240 @@
 
 from classes.connectors.base import BaseConnector
 from classes import Ptr
-import dns.query
+from classes.connectors.dns.dns_channel import DnsChannel
+from classes.connectors.dns.dns_outbox import DnsOutbox
+from classes.connectors.dns.rate_governor import RateGovernor
+import dns.exception
+import dns.rcode
+import dns.reversename
 import dns.tsigkeyring
 import dns.update
 import ipaddress
 from dns.tsig import HMAC_MD5
 import logging
+import os
+import socket
+import time
 
 __version__ = '0.4.4'
 
 
 class DnsConnector(BaseConnector):
+    # Only PTRs that differ from DNS are sent to the server
+    ptr_statuses = (Ptr.STATUS_NOT_CREATED, Ptr.STATUS_NOT_UPDATED)
+
     def __init__(self, dispatcher):
         BaseConnector.__init__(self, dispatcher)
         self.logger = logging.getLogger('dns_update.connector.dns')
+        # Cached PTRs are removed from dispatcher's DnsCheck after they're changed
+        self.dns_check = dispatcher.dns
         self.dns_hostname = self.config['hostname']
         self.keyring = dns.tsigkeyring.from_text({
             'nsupdate_key': self.config['key']
         })
+        # Maximum number of records changed by a single UPDATE message
+        self.max_records = self._get_positive('max_records', 100)
+        self.ttl = self._get_positive('ttl', 300)
+        # Rate of UPDATE messages is limited if configured
+        rate = self._get_positive('updates_per_second', None, float, section='rate')
+        zone_rate = self._get_positive('zone_updates_per_second', None, float, section='rate')
+        self.governor = None
+        if rate or zone_rate:
+            self.governor = RateGovernor(
+                rate=rate,
+                burst=self._get_positive('burst', None, section='rate'),
+                zone_rate=zone_rate,
+                zone_burst=self._get_positive('zone_burst', None, section='rate')
+            )
+        # Connection to the master is kept open and UPDATE messages are pipelined
+        self.channel = DnsChannel(
+            self.dns_hostname,
+            timeout=self._get_positive('timeout', 10, float),
+            max_in_flight=self._get_positive('max_in_flight', 10),
+            governor=self.governor
+        )
+        # Changes are kept in the outbox until the server applies them
+        outbox_config = self.config['outbox'] if 'outbox' in self.config else {}
+        self.outbox = None
+        if 'enabled' not in outbox_config or outbox_config['enabled']:
+            if 'db' in outbox_config:
+                db_file = os.path.dirname(os.path.abspath(__file__)) + '/../../../' + outbox_config['db']
+            else:
+                db_file = dispatcher.config.get_state_dir() + '/dns_outbox.sql'
+            self.outbox = DnsOutbox(
+                db_file,
+                backoff=self._get_positive('backoff', 1, float, section='outbox', allow_zero=True),
+                max_backoff=self._get_positive('max_backoff', 300, float, section='outbox'),
+                max_attempts=self._get_positive('max_attempts', 10, section='outbox')
+            )
+        # Number of retries of changes that failed because of connection problems in the same run
+        self.retries = self._get_positive('retries', 2, section='outbox', allow_zero=True)
+
+    def _new_update(self, zone):
+        return dns.update.Update(zone, keyring=self.keyring, keyalgorithm=HMAC_MD5)
+
+    def _send(self, update, count):
+        """
+        Send UPDATE message to the server
+        :param update:  dns.update.Update instance
+        :param count:   Number of records changed by the message (for logging)
+        :return: True if update was accepted
+        """
+        return self._send_many([(update, count)])[0]
+
+    def _send_many(self, updates):
+        """
+        Send UPDATE messages over the open connection to the server
+        :param updates: List of (dns.update.Update instance, number of records changed) tuples
+        :return: List of booleans, True if update was accepted
+        """
+        for update, count in updates:
+            self.logger.debug("Sending %d change(s) in zone '%s' to %s" % (count, update.origin, self.dns_hostname))
+        responses = self.channel.send_many([update for update, _ in updates])
+        results = []
+        for (update, count), response in zip(updates, responses):
+            if response.rcode() != dns.rcode.NOERROR:
+                self.logger.error("Update of %d record(s) in zone '%s' refused by %s: %s" % (
+                    count, update.origin, self.dns_hostname, dns.rcode.to_text(response.rcode())
+                ))
+                results.append(False)
+            else:
+                results.append(True)
+        return results
+
+    def _group_by_zone(self, items, get_zone):
+        """
+        Split items into chunks of up to max_records items from the same zone
+        :param items:       List of items
+        :param get_zone:    Function returning zone of an item
+        :return: List of (zone, list of items) tuples
+        """
+        zones = {}
+        for item in items:
+            zones.setdefault(get_zone(item), []).append(item)
+        chunks = []
+        for zone in sorted(zones):
+            for i in range(0, len(zones[zone]), self.max_records):
+                chunks.append((zone, zones[zone][i:i + self.max_records]))
+        return chunks
+
+    def _apply(self, changes):
+        """
+        Send changes to the server in one UPDATE message per zone (up to max_records records each).
+        Raises socket.error or dns.exception.DNSException if server couldn't be reached
+        :param changes: List of (ip_address, action, ptr) tuples
+        :return: tuple (accepted, refused) of IP address lists
+        """
+        names = []
+        for ip_address, action, ptr in changes:
+            name, zone = str(dns.reversename.from_address(ip_address)).split('.', 1)
+            names.append((zone, name, ip_address, action, ptr))
+        chunks = self._group_by_zone(names, lambda x: x[0])
+        updates = []
+        for zone, chunk in chunks:
+            update = self._new_update(zone)
+            for _, name, _, action, ptr in chunk:
+                if action == DnsOutbox.ACTION_REPLACE:
+                    update.replace(name, self.ttl, 'PTR', ptr)
+                elif ptr:
+                    # Delete only the same record, so PTR recreated in the meantime is kept
+                    update.delete(name, 'PTR', ptr)
+                else:
+                    update.delete(name)
+            updates.append((update, len(chunk)))
+        try:
+            results = self._send_many(updates)
+        finally:
+            for ip_address, _, _ in changes:
+                self.dns_check.invalidate_ptr(ip_address)
+        accepted = []
+        refused = []
+        for (_, chunk), result in zip(chunks, results):
+            (accepted if result else refused).extend(x[2] for x in chunk)
+        return accepted, refused
+
+    def _submit(self, changes):
+        """
+        Apply changes. If outbox is used, changes are added to it and the outbox is drained
+        :param changes: List of (ip_address, action, ptr) tuples
+        :return: List of IP addresses whose changes were accepted by the server
+        """
+        try:
+            if not self.outbox:
+                return self._apply(changes)[0]
+            self.outbox.add(changes)
+            submitted = set(x[0] for x in changes)
+            return [x for x in self.drain() if x in submitted]
+        finally:
+            if self.governor:
+                self.governor.log_stats()
+
+    def drain(self):
+        """
+        Send changes waiting in the outbox (including ones left from previous runs).
+        Changes that couldn't be sent because of connection problems are retried
+        up to `retries` times with exponential backoff. Changes refused by the server
+        and ones still failing are retried in the next run.
+        :return: List of IP addresses whose changes were accepted by the server
+        """
+        accepted = []
+        for attempt in range(self.retries + 1):
+            changes = self.outbox.get_due()
+            if not changes:
+                break
+            try:
+                applied, refused = self._apply([(x['ip_address'], x['action'], x['ptr']) for x in changes])
+            except (socket.error, EOFError, dns.exception.DNSException) as e:
+                self.logger.warning("Couldn't send %d change(s) to %s: %s" % (len(changes), self.dns_hostname, e))
+                self.outbox.defer([x['ip_address'] for x in changes], str(e))
+                if attempt < self.retries and self.outbox.count():
+                    time.sleep(max(0, self.outbox.get_next_attempt() - time.time()))
+                continue
+            self.outbox.remove(applied)
+            self.outbox.defer(refused, 'refused')
+            accepted += applied
+            break
+        remaining = self.outbox.count()
+        if remaining:
+            self.logger.warning("%d change(s) left in outbox for the next run" % remaining)
+        return accepted
 
     def delete_ptr(self, ip_address):
-        name, zone = str(dns.reversename.from_address(ip_address)).split('.', 1)
-        update = dns.update.Update(zone, keyring=self.keyring, keyalgorithm=HMAC_MD5)
-        update.delete(name)
-        dns.query.tcp(update, self.dns_hostname)
+        self._submit([(ip_address, DnsOutbox.ACTION_DELETE, None)])
 
     def create_ptr(self, ptr):
         if not isinstance(ptr, Ptr):
             raise ValueError("Argument must be of Ptr class.")
-        update = dns.update.Update(ptr.get_ptr_zone(), keyring=self.keyring, keyalgorithm=HMAC_MD5)
-        update.replace(ptr.get_ptr_zone_name(), 300, 'PTR', ptr.ptr)
-        self.logger.debug("Updating %s" % self.dns_hostname)
-        dns.query.tcp(update, self.dns_hostname)
+        self._submit([(str(ptr.ip_address), DnsOutbox.ACTION_REPLACE, ptr.ptr)])
 
     def delete_stale_ptrs(self):
-        pass
+        """
+        DNS server doesn't know when PTRs were last seen.
+        Stale PTRs are selected by database connectors and deleted with Dispatcher.delete_stale_ptrs
+        :return:
+        """
+        return 0
+
+    def load_stale_ptrs(self):
+        return {}
 
     def delete_ptrs(self, ip_addresses):
+        """
+        Delete PTRs with one UPDATE message per zone (up to max_records records each).
+        If dict of Ptr objects is given, only records with the same PTR are deleted,
+        so PTRs recreated in the meantime are kept
+        :param ip_addresses:    List of IP addresses or dict of Ptr objects keyed by IP address
+        :return: List of IP addresses whose PTRs were deleted (update accepted by the server)
+        """
+        changes = []
         for ip_address in ip_addresses:
             try:
                 ipaddress.IPv4Address(ip_address.decode('utf-8'))
-                self.delete_ptr(ip_address)
             except ipaddress.AddressValueError:
                 continue
+            ptr = ip_addresses[ip_address].ptr if isinstance(ip_addresses, dict) else None
+            changes.append((ip_address, DnsOutbox.ACTION_DELETE, ptr))
+        return self._submit(changes)
 
     def load_devices(self):
         return []
@@ -68,7 +259,13 @@ class DnsConnector(BaseConnector):
         return {}
 
     def save_ptrs(self, ptrs):
+        """
+        Create or replace PTRs with one UPDATE message per zone (up to max_records records each)
+        :param ptrs:    dict of Ptr objects
+        :return:
+        """
         self.logger.info("Saving %d PTRs to database..." % len(ptrs))
-        for ptr in ptrs:
-            self.create_ptr(ptrs[ptr])
-        self.logger.info("Saved %d PTRs to database." % len(ptrs))
+        accepted = self._submit([
+            (str(ptr.ip_address), DnsOutbox.ACTION_REPLACE, ptr.ptr) for ptr in ptrs.values()
+        ])
+        self.logger.info("Saved %d PTRs to database, %d failed." % (len(accepted), len(ptrs) - len(accepted)))
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+# noinspection SqlResolve
+class DnsOutbox:
+    """
+
+    PTR changes waiting to be sent to the DNS server.
+    Kept in SQLite database so changes that couldn't be sent are retried in the next run.
+    There's a single change per IP address, newer change replaces the older one.
+    Replacing or deleting a PTR gives the same result if it's applied more than once,
+    so a change is safely sent again if it's not known whether the server applied it.
+    Failed changes are retried with exponential backoff and dropped after max_attempts.
+
+    """
+
+    ACTION_REPLACE = 'replace'
+    ACTION_DELETE = 'delete'
+
+    def __init__(self, filename, backoff=1, max_backoff=300, max_attempts=10):
+        """
+        :param filename:        Database file. Created with its directory on first use
+        :param backoff:         Seconds to wait before the first retry. Doubled on each next one
+        :param max_backoff:     Maximum number of seconds between retries
+        :param max_attempts:    Change is dropped after this number of failed attempts
+        """
+        self.logger = logging.getLogger('dns_update.connector.dns.outbox')
+        self.filename = filename
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.connection = None
+        self.lock = threading.RLock()
+
+    def _get_cursor(self):
+        """
+        Open database on first use
+        :return: sqlite3.Cursor
+        """
+        if not self.connection:
+            self.logger.debug("Outbox database file: '%s'" % self.filename)
+            # Outbox is opened before state is saved, so state directory may not exist yet
+            directory = os.path.dirname(self.filename)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS `outbox` (
+                  `ip_address` VARCHAR(15) NOT NULL PRIMARY KEY,
+                  `action` VARCHAR(8) NOT NULL,
+                  `ptr` VARCHAR(128) DEFAULT NULL,
+                  `attempts` INTEGER UNSIGNED NOT NULL DEFAULT 0,
+                  `next_attempt` REAL NOT NULL DEFAULT 0,
+                  `error` VARCHAR(128) DEFAULT NULL
+                )""")
+        return self.connection.cursor()
+
+    def add(self, changes):
+        """
+        Add changes to the outbox. Older change for the same IP address is replaced
+        :param changes: List of (ip_address, action, ptr) tuples.
+                        For ACTION_DELETE ptr can be None (delete any PTR) or PTR that should be deleted
+        :return:
+        """
+        with self.lock:
+            c = self._get_cursor()
+            c.executemany(
+                "INSERT OR REPLACE INTO `outbox` (`ip_address`, `action`, `ptr`) VALUES (?, ?, ?)",
+                changes
+            )
+            self.connection.commit()
+
+    def get_due(self):
+        """
+        Returns changes whose retry time has come
+        :return: List of dicts with 'ip_address', 'action', 'ptr' and 'attempts' keys
+        """
+        with self.lock:
+            c = self._get_cursor()
+            c.execute(
+                "SELECT `ip_address`, `action`, `ptr`, `attempts` FROM `outbox` WHERE `next_attempt` <= ?",
+                (time.time(),)
+            )
+            return [
+                {'ip_address': row[0], 'action': row[1], 'ptr': row[2], 'attempts': row[3]}
+                for row in c.fetchall()
+            ]
+
+    def remove(self, ip_addresses):
+        """
+        Remove changes that were applied by the server
+        :param ip_addresses:    List of IP addresses
+        :return:
+        """
+        with self.lock:
+            c = self._get_cursor()
+            c.executemany("DELETE FROM `outbox` WHERE `ip_address` = ?", [(x,) for x in ip_addresses])
+            self.connection.commit()
+
+    def defer(self, ip_addresses, error):
+        """
+        Schedule retry of failed changes. Changes that failed max_attempts times are dropped
+        :param ip_addresses:    List of IP addresses
+        :param error:           Reason of the failure
+        :return: List of IP addresses whose changes were dropped
+        """
+        dropped = []
+        with self.lock:
+            c = self._get_cursor()
+            now = time.time()
+            for ip_address in ip_addresses:
+                c.execute("SELECT `attempts` FROM `outbox` WHERE `ip_address` = ?", (ip_address,))
+                row = c.fetchone()
+                if not row:
+                    continue
+                attempts = row[0] + 1
+                if attempts >= self.max_attempts:
+                    c.execute("DELETE FROM `outbox` WHERE `ip_address` = ?", (ip_address,))
+                    dropped.append(ip_address)
+                    continue
+                c.execute(
+                    "UPDATE `outbox` SET `attempts` = ?, `next_attempt` = ?, `error` = ? WHERE `ip_address` = ?",
+                    (attempts, now + min(self.max_backoff, self.backoff * 2 ** (attempts - 1)), error, ip_address)
+                )
+            self.connection.commit()
+        if dropped:
+            self.logger.error("Dropped %d change(s) after %d failed attempts: %s" % (
+                len(dropped), self.max_attempts, error
+            ))
+        return dropped
+
+    def get_next_attempt(self):
+        """
+        Returns time of the earliest scheduled retry. None if outbox is empty
+        :return:
+        """
+        with self.lock:
+            c = self._get_cursor()
+            c.execute("SELECT MIN(`next_attempt`) FROM `outbox`")
+            return c.fetchone()[0]
+
+    def count(self):
+        """
+        Returns number of changes in the outbox
+        :return:
+        """
+        with self.lock:
+            c = self._get_cursor()
+            c.execute("SELECT COUNT(*) FROM `outbox`")
+            return c.fetchone()[0]
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import threading
+import time
+
+
+class TokenBucket:
+    """
+
+    Allows `rate` operations per second on average and bursts of up to `burst` operations.
+
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate:    Operations per second
+        :param burst:   Maximum number of operations without waiting. Same as rate if not set
+        """
+        self.rate = float(rate)
+        self.burst = max(1, burst if burst else rate)
+        self.tokens = float(self.burst)
+        self.last = time.time()
+
+    def reserve(self, now):
+        """
+        Take a token. Token can be taken before it's available (bucket goes into debt)
+        :param now: Current time
+        :return: Seconds until the token is available. 0 if it's available now
+        """
+        self.tokens = min(self.burst, self.tokens + max(0, now - self.last) * self.rate)
+        self.last = max(self.last, now)
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateGovernor:
+    """
+
+    Limits the rate of UPDATE messages sent to the DNS server, globally and per zone,
+    so bulk changes don't overload the server. Every message takes a token from the global
+    bucket and from the bucket of its zone, waiting until both of them have one.
+    Time messages waited (queueing delay) is recorded.
+
+    """
+
+    def __init__(self, rate=None, burst=None, zone_rate=None, zone_burst=None):
+        """
+        :param rate:        Messages per second to the server. Unlimited if not set
+        :param burst:       Messages sent without waiting after a quiet period. Same as rate if not set
+        :param zone_rate:   Messages per second for a single zone. Unlimited if not set
+        :param zone_burst:  Messages sent to a single zone without waiting. Same as zone_rate if not set
+        """
+        self.logger = logging.getLogger('dns_update.connector.dns.rate_governor')
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.zone_rate = zone_rate
+        self.zone_burst = zone_burst
+        self.zone_buckets = {}
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.delayed = 0
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+        # Total queueing delay of each zone
+        self.zone_delay = {}
+
+    def acquire(self, zone=None):
+        """
+        Wait until message can be sent
+        :param zone:    Zone the message updates. Only global limit is applied if not set
+        :return: Seconds waited
+        """
+        with self.lock:
+            now = time.time()
+            delay = self.bucket.reserve(now) if self.bucket else 0
+            if zone and self.zone_rate:
+                if zone not in self.zone_buckets:
+                    self.zone_buckets[zone] = TokenBucket(self.zone_rate, self.zone_burst)
+                delay = max(delay, self.zone_buckets[zone].reserve(now))
+            self.messages += 1
+            if delay:
+                self.delayed += 1
+                self.total_delay += delay
+                self.max_delay = max(self.max_delay, delay)
+                if zone:
+                    self.zone_delay[zone] = self.zone_delay.get(zone, 0) + delay
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def log_stats(self):
+        """
+        Log number of delayed messages and queueing delay
+        :return:
+        """
+        self.logger.info("%d UPDATE message(s), %d delayed. Total delay %.2f s, average %.1f ms, maximum %.1f ms" % (
+            self.messages, self.delayed, self.total_delay,
+            self.total_delay * 1000 / self.messages if self.messages else 0, self.max_delay * 1000
+        ))
+        for zone in sorted(self.zone_delay, key=self.zone_delay.get, reverse=True)[:10]:
+            self.logger.info("Zone '%s' delayed %.2f s" % (zone, self.zone_delay[zone]))
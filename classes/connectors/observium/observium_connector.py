@@ -76,3 +76,25 @@ class ObserviumConnector(BaseConnector):
         :return:
         """
         return {}
+
+    def load_stale_ptrs(self):
+        """
+        No PTR records in Observium
+        :return:
+        """
+        return {}
+
+    def delete_ptrs(self, ip_addresses):
+        """
+        No PTR records in Observium
+        :param ip_addresses:
+        :return:
+        """
+        return list(ip_addresses)
+
+    def delete_stale_ptrs(self):
+        """
+        No PTR records in Observium
+        :return:
+        """
+        return 0
@@ -20,7 +20,9 @@ import logging
 import time
 import os
 import calendar
+import itertools
 import sqlite3
+import ipaddress
 from classes.connectors import BaseConnector
 from classes import Ptr
 
@@ -37,13 +39,37 @@ class SqliteConnector(BaseConnector):
         self.connection = sqlite3.connect(db_file)
         self.logger.info("Database file '%s' loaded" % db_file)
         self.c = self.connection.cursor()
+        # Number of rows saved in a single transaction
+        self.chunk_size = self.config['chunk_size'] if 'chunk_size' in self.config else 10000
+        self.set_pragmas()
         try:
             self.c.execute("SELECT COUNT(*) FROM `ptrs`")
             self.logger.info("%s existing PTRs in database." % self.c.fetchall()[0][0])
+            # Databases created by older versions don't have indexes
+            self.create_indexes()
         except sqlite3.OperationalError:
             self.logger.warning("Table `ptrs` doesn't exists. Creating...")
             self.create_ptr_table()
 
+    def set_pragmas(self):
+        """
+        Tune database for bulk writes. WAL journal with synchronous=NORMAL syncs only on checkpoints,
+        database is still consistent after a crash. Cache size is in pages or in KiB if negative
+        :return:
+        """
+        pragmas = [
+            ('journal_mode', self.config['journal_mode'] if 'journal_mode' in self.config else 'WAL'),
+            ('synchronous', self.config['synchronous'] if 'synchronous' in self.config else 'NORMAL'),
+            ('cache_size', int(self.config['cache_size']) if 'cache_size' in self.config else -16000),
+            ('mmap_size', int(self.config['mmap_size']) if 'mmap_size' in self.config else 268435456)
+        ]
+        for name, value in pragmas:
+            try:
+                self.c.execute("PRAGMA %s = %s" % (name, value))
+                self.logger.debug("PRAGMA %s set to %s" % (name, value))
+            except sqlite3.DatabaseError as e:
+                self.logger.warning("Couldn't set PRAGMA %s to %s: %s" % (name, value, e))
+
     def create_ptr_table(self):
         """
         Create PTR table
@@ -59,6 +85,16 @@ class SqliteConnector(BaseConnector):
                   `insert_time` INTEGER UNSIGNED DEFAULT NULL
                 )"""
         self.c.execute(sql)
+        self.create_indexes()
+
+    def create_indexes(self):
+        """
+        Create indexes used for stale PTR cleanup and per device and per zone lookups
+        :return:
+        """
+        for column in ['insert_time', 'hostname', 'ptr_zone']:
+            self.c.execute("CREATE INDEX IF NOT EXISTS `ptrs_%s` ON `ptrs` (`%s`)" % (column, column))
+        self.connection.commit()
 
     def drop_ptr_table(self):
         """
@@ -77,14 +113,18 @@ class SqliteConnector(BaseConnector):
         self.c.execute(sql)
         return self.c.fetchone()[0]
 
-    def load_ptrs(self):
+    def _load_ptrs(self, where='', parameters=()):
         """
-        Load all PTRs from Database
-        :return:
+        Load PTRs matching the condition
+        :param where:       SQL condition. All PTRs are loaded if not set
+        :param parameters:  Condition parameters
+        :return: dict of Ptr objects keyed by IP address
         """
         ptrs = {}
         sql = "SELECT `ip_address`, `hostname`, `if_name`, `ptr`, `status` FROM `ptrs`"
-        self.c.execute(sql)
+        if where:
+            sql += " WHERE " + where
+        self.c.execute(sql, parameters)
         for ptr_row in self.c.fetchall():
             ptr = Ptr(
                 ip_address=ptr_row[0],
@@ -96,61 +136,139 @@ class SqliteConnector(BaseConnector):
             ptrs[str(ptr.ip_address)] = ptr
         return ptrs
 
+    def load_ptrs(self):
+        """
+        Load all PTRs from Database
+        :return:
+        """
+        return self._load_ptrs()
+
+    def load_prefix_ptrs(self, prefix):
+        """
+        Load PTRs of IP addresses in the prefix. Range of primary key is searched
+        :param prefix:  Prefix in 192.0.2.0/24 format
+        :return: dict of Ptr objects keyed by IP address
+        """
+        try:
+            network = ipaddress.IPv4Network(prefix.decode('utf-8'), strict=False)
+        except (ipaddress.AddressValueError, ipaddress.NetmaskValueError) as e:
+            raise ValueError("Invalid prefix: %s" % e)
+        return self._load_ptrs(
+            "`ip_address` BETWEEN ? AND ?", (int(network.network_address), int(network.broadcast_address))
+        )
+
+    def load_device_ptrs(self, hostname):
+        """
+        Load PTRs of the device
+        :param hostname:    Device hostname (FQDN)
+        :return: dict of Ptr objects keyed by IP address
+        """
+        return self._load_ptrs("`hostname` = ?", (hostname,))
+
+    def load_zone_ptrs(self, zone):
+        """
+        Load PTRs from the zone
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :return: dict of Ptr objects keyed by IP address
+        """
+        return self._load_ptrs("`ptr_zone` = ?", (zone,))
+
+    @staticmethod
+    def _get_rows(ptrs):
+        """
+        Generate table rows sorted by IP address (primary key), so they're appended to the table B-tree.
+        Zone is calculated from integer IP address. Zones and insert times are shared by many PTRs
+        so they're calculated once
+        :param ptrs:    List of Ptr objects
+        :return: Generator of tuples in table column order
+        """
+        zones = {}
+        insert_times = {}
+        for ip_int, ptr in sorted((x.ip_int(), x) for x in ptrs):
+            prefix = ip_int >> 8
+            if prefix not in zones:
+                zones[prefix] = '%d.%d.%d.in-addr.arpa.' % (prefix & 255, (prefix >> 8) & 255, prefix >> 16)
+            if ptr.time not in insert_times:
+                insert_times[ptr.time] = calendar.timegm(ptr.time)
+            yield ip_int, ptr.hostname, ptr.if_name, ptr.ptr, zones[prefix], ptr.status, insert_times[ptr.time]
+
     def save_ptr(self, ptr, commit=True):
         """
         Save a single Ptr to database
         :param ptr:
         :return:
         """
-        sql = "INSERT OR REPLACE INTO `ptrs` VALUES (" \
-              ":ip_address, :hostname, :if_name, :ptr, :ptr_zone, :status, :insert_time" \
-              ")"
-
-        data = {
-            "ip_address": ptr.ip_int(),
-            "hostname": ptr.hostname,
-            "if_name": ptr.if_name,
-            "ptr": ptr.ptr,
-            "ptr_zone": ptr.get_ptr_zone(),
-            "status": ptr.status,
-            "insert_time": calendar.timegm(ptr.time)
-        }
-        self.c.execute(sql, data)
+        sql = "INSERT OR REPLACE INTO `ptrs` VALUES (?, ?, ?, ?, ?, ?, ?)"
+        self.c.executemany(sql, SqliteConnector._get_rows([ptr]))
         if commit:
             self.connection.commit()
 
     def save_ptrs(self, ptrs):
         """
-        Save multiple Ptrs to database. Uses `save_ptr` method
+        Save multiple Ptrs to database.
+        Rows are inserted with executemany and committed every `chunk_size` rows
         :param ptrs:
         :return:
         """
         self.logger.info("Saving %d PTRs to database..." % len(ptrs))
-        for ptr in ptrs:
-            self.save_ptr(ptrs[ptr], commit=False)
-        self.connection.commit()
+        sql = "INSERT OR REPLACE INTO `ptrs` VALUES (?, ?, ?, ?, ?, ?, ?)"
+        rows = SqliteConnector._get_rows(ptrs.values())
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.c.executemany(sql, chunk)
+            self.connection.commit()
         self.logger.info("Saved %d PTRs to database." % len(ptrs))
 
     def delete_ptrs(self, ip_addresses):
         """
         Delete Ptrs for a list of IP addresses
-        :param ptrs:
-        :return:
+        :param ip_addresses:    List of IP addresses or dict of Ptr objects keyed by IP address
+        :return: List of IP addresses whose PTRs were deleted
         """
         for ip in ip_addresses:
             sql = "DELETE FROM `ptrs` WHERE ip_address == :ip"
             self.c.execute(sql, {"ip": Ptr.get_ip_int(ip)})
         self.connection.commit()
+        return list(ip_addresses)
+
+    def _get_stale_time(self):
+        """
+        Returns time before which PTRs are considered stale (not seen in more than `stale_hours`, 72h by default)
+        :return:
+        """
+        stale_hours = self.config['stale_hours'] if 'stale_hours' in self.config else 72
+        return time.time() - stale_hours * 3600
+
+    def load_stale_ptrs(self):
+        """
+        Load PTR records that are not seen in more than 72h
+        :return: dict of Ptr objects with STATUS_FOR_DELETION status
+        """
+        ptrs = {}
+        sql = "SELECT `ip_address`, `hostname`, `if_name`, `ptr` FROM `ptrs` WHERE `insert_time` < :time"
+        self.c.execute(sql, {"time": self._get_stale_time()})
+        for ptr_row in self.c.fetchall():
+            ptr = Ptr(
+                ip_address=ptr_row[0],
+                hostname=ptr_row[1],
+                if_name=ptr_row[2],
+                ptr=ptr_row[3],
+                status=Ptr.STATUS_FOR_DELETION
+            )
+            ptrs[str(ptr.ip_address)] = ptr
+        self.logger.info("Found %d stale PTRs in database." % len(ptrs))
+        return ptrs
 
     def delete_stale_ptrs(self):
         """
         Deletes PTR records that are not seen in more than 72h
         :return: Number of deleted rows
         """
-        stale_hours = self.config['stale_hours'] if 'stale_hours' in self.config else 72
-        time_threshold = time.time() - stale_hours * 3600
         sql = "DELETE FROM `ptrs` WHERE `insert_time` < :time"
-        self.c.execute(sql, {"time": time_threshold})
+        self.c.execute(sql, {"time": self._get_stale_time()})
+        self.connection.commit()
         return self.c.rowcount
 
     def load_devices(self):
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from classes.connectors.base import BaseConnector
+from classes import Ptr
+import dns.exception
+import dns.rdatatype
+import dns.reversename
+import dns.zone
+import logging
+import os
+import time
+
+__version__ = '0.4.4'
+
+
+class ZonefileConnector(BaseConnector):
+    """
+    Writes PTRs to reverse zone files (or nsupdate scripts), one file per zone.
+    PTRs from all save_ptrs calls in a run are collected, so each file holds all PTRs of the zone
+    and is rewritten when the zone changes. Records are sorted by IP address.
+    Zone files are seeded with PTRs from the existing file, so runs that don't poll all devices
+    (single device, failed or skipped devices) don't drop records. PTRs are removed only by delete_ptrs.
+    """
+
+    # PTRs of zones we don't serve yet (new prefixes) are exported as well
+    ptr_statuses = (Ptr.STATUS_OK, Ptr.STATUS_NOT_UPDATED, Ptr.STATUS_NOT_CREATED, Ptr.STATUS_NOT_AUTHORITATIVE)
+
+    FORMAT_ZONE = 'zone'
+    FORMAT_NSUPDATE = 'nsupdate'
+
+    def __init__(self, dispatcher):
+        BaseConnector.__init__(self, dispatcher)
+        self.logger = logging.getLogger('dns_update.connector.zonefile')
+        self.directory = os.path.dirname(os.path.abspath(__file__)) + '/../../../' + (
+            self.config['dir'] if 'dir' in self.config else 'zones'
+        )
+        self.format = self.config['format'] if 'format' in self.config else ZonefileConnector.FORMAT_ZONE
+        if self.format not in (ZonefileConnector.FORMAT_ZONE, ZonefileConnector.FORMAT_NSUPDATE):
+            self.logger.warning("Unknown format '%s'. Writing zone files" % self.format)
+            self.format = ZonefileConnector.FORMAT_ZONE
+        self.ttl = self._get_positive('ttl', 300)
+        self.nameservers = self.config['nameservers'] if 'nameservers' in self.config else ['localhost.']
+        self.hostmaster = self.config['hostmaster'] if 'hostmaster' in self.config else 'hostmaster.localhost.'
+        # nsupdate options
+        self.server = self.config['server'] if 'server' in self.config else None
+        self.max_records = self._get_positive('max_records', 1000)
+        # PTRs of each zone: {zone: {ip_int: Ptr}}
+        self.zones = {}
+
+    @staticmethod
+    def _absolute(name):
+        return name if name.endswith('.') else name + '.'
+
+    def get_filename(self, zone):
+        """
+        Returns file the zone is written to: <dir>/<zone>.zone or <dir>/<zone>.nsupdate
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :return:
+        """
+        return '%s/%s.%s' % (self.directory, zone.rstrip('.'), self.format)
+
+    def _get_zone(self, zone):
+        """
+        Returns PTRs of the zone collected in this run: {ip_int: Ptr}.
+        With zone format PTRs from the existing zone file are loaded first
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :return:
+        """
+        if zone not in self.zones:
+            self.zones[zone] = self._read_zone(zone) if self.format == ZonefileConnector.FORMAT_ZONE else {}
+        return self.zones[zone]
+
+    def _read_zone(self, zone):
+        """
+        Read PTRs from existing zone file
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :return: dict {ip_int: Ptr}. Empty if file doesn't exist or can't be parsed
+        """
+        filename = self.get_filename(zone)
+        ptrs = {}
+        if not os.path.exists(filename):
+            return ptrs
+        try:
+            zone_data = dns.zone.from_file(filename, origin=zone, relativize=False)
+            for name, ttl, rdata in zone_data.iterate_rdatas(dns.rdatatype.PTR):
+                ptr = Ptr(unicode(dns.reversename.to_address(name)), rdata.target.to_text(), None, None)
+                ptrs[ptr.ip_int()] = ptr
+        except (IOError, ValueError, dns.exception.DNSException) as e:
+            self.logger.error("Couldn't read zone file '%s': %s. It will hold only PTRs from this run" % (
+                filename, e
+            ))
+            return {}
+        self.logger.debug("Loaded %d PTRs from '%s'" % (len(ptrs), filename))
+        return ptrs
+
+    def _write_zone(self, zone):
+        """
+        Write zone file with SOA, NS and all PTRs of the zone
+        """
+        ptrs = self.zones[zone]
+        filename = self.get_filename(zone)
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as zone_file:
+            zone_file.write("$ORIGIN %s\n" % zone)
+            zone_file.write("$TTL %d\n" % self.ttl)
+            # Serial is increased on every run
+            zone_file.write("@ IN SOA %s %s %d 3600 600 604800 %d\n" % (
+                self._absolute(self.nameservers[0]), self._absolute(self.hostmaster), int(time.time()), self.ttl
+            ))
+            for nameserver in self.nameservers:
+                zone_file.write("@ IN NS %s\n" % self._absolute(nameserver))
+            for ip_int in sorted(ptrs):
+                ptr = ptrs[ip_int]
+                zone_file.write("%s IN PTR %s\n" % (
+                    ptr.get_ptr_zone_name(), self._absolute(ptr.ptr)
+                ))
+        os.rename(tmp_filename, filename)
+        return filename
+
+    def _write_nsupdate(self, zone):
+        """
+        Write nsupdate script replacing all PTRs of the zone. Changes are sent every `max_records` records
+        """
+        ptrs = self.zones[zone]
+        filename = self.get_filename(zone)
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as script:
+            if self.server:
+                script.write("server %s\n" % self.server)
+            script.write("zone %s\n" % zone)
+            for i, ip_int in enumerate(sorted(ptrs)):
+                if i and not i % self.max_records:
+                    script.write("send\n")
+                ptr = ptrs[ip_int]
+                name = '%s.%s' % (ptr.get_ptr_zone_name(), zone)
+                script.write("update delete %s PTR\n" % name)
+                script.write("update add %s %d PTR %s\n" % (name, self.ttl, self._absolute(ptr.ptr)))
+            script.write("send\n")
+        os.rename(tmp_filename, filename)
+        return filename
+
+    def _write(self, zones):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        for zone in sorted(zones):
+            if self.format == ZonefileConnector.FORMAT_NSUPDATE:
+                filename = self._write_nsupdate(zone)
+            else:
+                filename = self._write_zone(zone)
+            self.logger.debug("Written %d PTRs to '%s'" % (len(self.zones[zone]), filename))
+
+    def save_ptrs(self, ptrs):
+        """
+        Add PTRs to their zones and rewrite files of changed zones
+        :param ptrs:    dict of Ptr objects
+        :return:
+        """
+        changed = set()
+        for ptr in ptrs.values():
+            if not ptr.ptr:
+                continue
+            zone = ptr.get_ptr_zone()
+            self._get_zone(zone)[ptr.ip_int()] = ptr
+            changed.add(zone)
+        self._write(changed)
+        self.logger.info("Written %d PTRs to %d zone file(s)." % (len(ptrs), len(changed)))
+
+    def delete_ptrs(self, ip_addresses):
+        """
+        Remove PTRs from their zones and rewrite files of changed zones
+        :param ip_addresses:    List of IP addresses or dict of Ptr objects keyed by IP address
+        :return: List of IP addresses whose PTRs were deleted
+        """
+        changed = set()
+        for ip_address in ip_addresses:
+            try:
+                ptr = Ptr(ip_address, None, None, None)
+            except ValueError:
+                continue
+            zone = ptr.get_ptr_zone()
+            if self._get_zone(zone).pop(ptr.ip_int(), None):
+                changed.add(zone)
+        self._write(changed)
+        return list(ip_addresses)
+
+    def delete_stale_ptrs(self):
+        """
+        Zone files hold only PTRs from the current run
+        :return:
+        """
+        return 0
+
+    def load_stale_ptrs(self):
+        return {}
+
+    def load_devices(self):
+        return []
+
+    def load_ptrs(self):
+        return {}
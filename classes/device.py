@@ -19,17 +19,23 @@
 import easysnmp
 import re
 import logging
+import os
+import time
 
 from device_interface import DeviceInterface
 from dns_check import DnsCheck
+from snmp_session import RecordingSession
+from snmp_session import ReplaySession
 
 
 class Device:
-    def __init__(self, hostname, config, dns=None):
+    def __init__(self, hostname, config, dns=None, snmp_cache=None, snmp_latency=None):
         """
         Initialize instance with empty interfaces array
         :param hostname:    Hostname of device. Must be FQDN
         :param config:      Config instance
+        :param snmp_cache:  SnmpCache instance. ifName and HSRP tables are always walked if not set
+        :param snmp_latency: SnmpLatency instance. Configured timeout and retries are used if not set
         """
         self.logger = logging.getLogger('dns_update.device:%s' % hostname)
         self.session = None
@@ -38,6 +44,8 @@ class Device:
         self.hsrp_addresses = {}
         self.ignored = False
         self.dns = dns if dns else DnsCheck(self.config)
+        self.snmp_cache = snmp_cache
+        self.snmp_latency = snmp_latency
         self.hostname = hostname
         # Split device.hostname into two parts: (hostname).(domain.example)
         try:
@@ -49,12 +57,15 @@ class Device:
         self.ip = self.dns.get_a(self.hostname)
         # TODO: update to support v3
         self.community = config.get_snmp_community(self.hostname)
+        self.max_repetitions = config.get_snmp_max_repetitions(self.hostname)
         self.ignored = self.config.is_device_ignored(self.hostname)
 
-    def get_interfaces(self):
+    def get_interfaces(self, session=None):
         """
         Walks trough the
         and fetches IP address and  IF-MIB::ifIndex
+        :param session: Session with already fetched SNMP data (MemorySession).
+                        easysnmp session to device is established if not set
         :return:
         """
 
@@ -66,19 +77,19 @@ class Device:
 
         # Setup SNMP session
         try:
-            self.logger.debug("Establishing SNMP session to '%s'" % self.hostname)
-            self.session = easysnmp.Session(
-                hostname=self.hostname,
-                community=self.community,
-                use_numeric=True,
-                version=2,
-                timeout=self.config.get_snmp_timeout(),
-                retries=self.config.get_snmp_retries(),
-                abort_on_nonexistent=True
-            )
+            self.session = session if session else self._create_session()
 
-            # Fetch HSRP VIP addresses
-            hsrp_addresses = self._get_hsrp_addresses()
+            # Reuse ifName and HSRP tables from previous run if device didn't change since
+            # Response time is measured only for requests that actually go to the device
+            cache_markers = self._probe(timed=session is None)
+            cached_tables = None
+            if self.snmp_cache and cache_markers:
+                cached_tables = self.snmp_cache.get_tables(self.hostname, *cache_markers)
+            if cached_tables:
+                if_names, hsrp_addresses = cached_tables
+            else:
+                # Fetch HSRP VIP addresses
+                hsrp_addresses = self._get_hsrp_addresses()
 
             """
             Implemented OID IP-MIB::ipAdEntIfIndex (1.3.6.1.2.1.4.20.1.2) is apparently deprecated.
@@ -93,11 +104,20 @@ class Device:
             # .1.3.6.1.2.1.4.20.1.2.10.170.1.1   = INTEGER: 10
             #       OID ends here-^|^- IP starts here       ^- ifIndex
             # etc...
-            interface_address_results = self.session.walk('.1.3.6.1.2.1.4.20.1.2')
+            interface_address_results = self._walk('.1.3.6.1.2.1.4.20.1.2')
             self.logger.info("Device has %d IP addresses" % len(interface_address_results))
+
+            if not cached_tables:
+                # Fetch IF-MIB::ifName for all interfaces at once instead of one GET per ifIndex
+                # Device without IP addresses still needs the full table if it's going to be cached
+                cache_tables = self.snmp_cache and cache_markers
+                if_names = self._get_if_names() if interface_address_results or cache_tables else {}
+                if cache_tables:
+                    self.snmp_cache.set_tables(self.hostname, cache_markers[0], cache_markers[1], if_names, hsrp_addresses)
+
             for interface_address_result in interface_address_results:
 
-                # IF-MIB::ifIndex later used to get IF-MIB::ifName
+                # IF-MIB::ifIndex used to get IF-MIB::ifName
                 if_index = int(interface_address_result.value)
                 # If this is the first time encountering this ifIndex,
                 # create DeviceInstance
@@ -105,12 +125,11 @@ class Device:
                     # Some devices will have loopback IP and ifIndex
                     # But no ifName associated with that ifIndex
                     # We can skip those since we can't make PTRs
-                    try:
-                        self.logger.debug("Create DeviceInterface object for ifIndex:%d" % if_index)
-                        self.interfaces[if_index] = DeviceInterface(self, if_index)
-                    except easysnmp.EasySNMPNoSuchInstanceError:
-                        self.logger.warning("SNMP returned NOSUCHINSTANCE for ifIndex:%d" % if_index)
+                    if if_index not in if_names:
+                        self.logger.warning("No ifName found for ifIndex:%d" % if_index)
                         continue
+                    self.logger.debug("Create DeviceInterface object for ifIndex:%d" % if_index)
+                    self.interfaces[if_index] = DeviceInterface(self, if_index, if_names[if_index])
                 # Remove the part of the OID we used to walk on. Leave just the IP address part.
                 # Add it to interface
                 ip_address = '.'.join([
@@ -126,11 +145,149 @@ class Device:
                 # Add polled IP to interface IP list
                 self.interfaces[if_index].add_ip_address(ip_address)
 
+            self._save_fixture()
             return True
         except easysnmp.EasySNMPError as e:
             self.logger.error("Failed to connect to '%s': %s" % (self.hostname, e))
+            self._save_fixture()
             return False
 
+    def _walk(self, oid):
+        """
+        Walks the subtree with GETBULK requests or with GETNEXT requests if max repetitions is set to 0
+        :param oid: Subtree OID
+        :return: list of SNMP variables
+        """
+        if self.max_repetitions:
+            return self.session.bulkwalk(oid, max_repetitions=self.max_repetitions)
+        return self.session.walk(oid)
+
+    def _create_session(self):
+        """
+        Establish easysnmp session to device.
+        With replay engine responses are served from fixture file instead,
+        with record engine easysnmp session is wrapped so responses are saved to one.
+        :return: easysnmp.Session, RecordingSession or ReplaySession
+        """
+        engine = self.config.get_snmp_engine()
+        if engine == 'replay':
+            self.logger.debug("Replaying SNMP responses for '%s'" % self.hostname)
+            return ReplaySession.from_fixture(
+                self.get_fixture_filename(),
+                self.hostname,
+                latency=self.config.get_snmp_replay_latency(),
+                loss=self.config.get_snmp_replay_loss(),
+                timeout=self.get_snmp_timeout(),
+                retries=self.get_snmp_retries()
+            )
+        self.logger.debug("Establishing SNMP session to '%s'" % self.hostname)
+        session = easysnmp.Session(
+            hostname=self.hostname,
+            community=self.community,
+            use_numeric=True,
+            version=2,
+            timeout=self.get_snmp_timeout(),
+            retries=self.get_snmp_retries(),
+            abort_on_nonexistent=True
+        )
+        if engine == 'record':
+            return RecordingSession(session, self.hostname)
+        return session
+
+    def get_fixture_filename(self):
+        """
+        Returns path to fixture file with recorded SNMP responses of the device
+        :return:
+        """
+        return '%s/%s.json' % (self.config.get_snmp_fixtures_dir(), self.hostname)
+
+    def _save_fixture(self):
+        """
+        Save responses recorded during discovery. Fixtures directory is created if it doesn't exist
+        :return:
+        """
+        if isinstance(self.session, RecordingSession):
+            filename = self.get_fixture_filename()
+            try:
+                directory = os.path.dirname(filename)
+                if not os.path.isdir(directory):
+                    try:
+                        os.makedirs(directory)
+                    except OSError:
+                        # Created by another worker in the meantime
+                        if not os.path.isdir(directory):
+                            raise
+                self.session.save(filename)
+            except (IOError, OSError) as e:
+                self.logger.error("Couldn't save SNMP fixture for '%s': %s" % (self.hostname, e))
+
+    def get_snmp_timeout(self):
+        """
+        Returns SNMP timeout derived from recorded response times or configured timeout
+        :return: Timeout in seconds
+        """
+        if self.snmp_latency:
+            return self.snmp_latency.get_timeout(self.hostname)
+        return self.config.get_snmp_timeout()
+
+    def get_snmp_retries(self):
+        """
+        Returns SNMP retries derived from recorded lost requests or configured retries
+        :return:
+        """
+        if self.snmp_latency:
+            return self.snmp_latency.get_retries(self.hostname)
+        return self.config.get_snmp_retries()
+
+    def _probe(self, timed=True):
+        """
+        Fetches SNMPv2-MIB::sysUpTime and IF-MIB::ifTableLastChange in a single GET request.
+        Those two values tell if cached ifName and HSRP tables are still valid.
+        Response time of the request is recorded if adaptive timeout is used.
+        :param timed:   Record response time. Should be False for sessions with already fetched data
+        :return: tuple (sysUpTime, ifTableLastChange) or None if probe is not needed or values are not available
+        """
+        record = timed and self.snmp_latency
+        if not self.snmp_cache and not record:
+            return None
+        start = time.time()
+        try:
+            sys_uptime, if_table_last_change = self.session.get(['.1.3.6.1.2.1.1.3.0', '.1.3.6.1.2.1.31.1.5.0'])
+            if record:
+                self.snmp_latency.record(self.hostname, time.time() - start)
+            return int(sys_uptime.value), int(if_table_last_change.value)
+        except (easysnmp.EasySNMPNoSuchObjectError, easysnmp.EasySNMPNoSuchInstanceError):
+            # Device responded, only the values are missing
+            if record:
+                self.snmp_latency.record(self.hostname, time.time() - start)
+            self.logger.info("IF-MIB::ifTableLastChange not available on '%s'. Not using cache" % self.hostname)
+        except easysnmp.EasySNMPTimeoutError:
+            if record:
+                self.snmp_latency.record_loss(self.hostname)
+            raise
+        except ValueError:
+            self.logger.warning("Invalid sysUpTime or ifTableLastChange value on '%s'. Not using cache" % self.hostname)
+        return None
+
+    def _get_if_names(self):
+        """
+        Walks through the IF-MIB::ifName column and returns interface names keyed by ifIndex.
+        :return: dict {ifIndex: ifName}
+        """
+        if_names = {}
+        # Walk trough the IF-MIB::ifName tree. Results are in format:
+        # .1.3.6.1.2.1.31.1.1.1.1.8 = STRING: GigabitEthernet0/0/0
+        #         OID ends here-^|^- ifIndex   ^- ifName
+        try:
+            if_name_results = self._walk('.1.3.6.1.2.1.31.1.1.1.1')
+        except (easysnmp.EasySNMPNoSuchObjectError, easysnmp.EasySNMPNoSuchInstanceError):
+            self.logger.warning("IF-MIB::ifName not supported on '%s'" % self.hostname)
+            return if_names
+        for if_name_result in if_name_results:
+            if_names[int(if_name_result.oid_index)] = if_name_result.value
+        self.logger.info("Device has %d interfaces with ifName" % len(if_names))
+        return if_names
+
     def _get_hsrp_addresses(self):
         """
         Walks through the CISCO-HSRP-MIB::cHsrpGrpVirtualIpAddr and fetches ip addresses used as VIPs.
@@ -153,7 +310,7 @@ class Device:
         #                 OID ends here-^|^-iFindex ^-HSRP group     ^- VIP IP address
         # etc...
         try:
-            hsrp_address_results = self.session.walk('.1.3.6.1.4.1.9.9.106.1.2.1.1.11')
+            hsrp_address_results = self._walk('.1.3.6.1.4.1.9.9.106.1.2.1.1.11')
             self.logger.info("Device has %d VIP addresses" % len(hsrp_address_results))
             for hsrp_address_result in hsrp_address_results:
                 vip_address = hsrp_address_result.value
@@ -183,8 +340,19 @@ class Device:
         :return:
         """
         self.logger.debug("Check PTRs for %d interfaces" % len(self.interfaces))
-        for interface in self.interfaces:
-            self.interfaces[interface].check_ptr()
+        checks = []
+        for interface in self.interfaces.values():
+            for ip_address in interface.ip_addresses:
+                if interface.is_ip_ignored(ip_address):
+                    interface.update_ptr_status(ip_address, None, DnsCheck.STATUS_IGNORED)
+                else:
+                    checks.append((interface, ip_address))
+        # All IP addresses on the device are checked concurrently
+        results = self.dns.check_many(
+            [(ip_address, interface.get_expected_ptr(ip_address)) for interface, ip_address in checks]
+        )
+        for (interface, ip_address), (existing_ptr, status) in zip(checks, results):
+            interface.update_ptr_status(ip_address, existing_ptr, status)
 
     def get_number_of_interfaces(self):
         """
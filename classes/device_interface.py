@@ -23,16 +23,24 @@ from ptr import Ptr
 
 
 class DeviceInterface:
-    def __init__(self, device, if_index):
+    def __init__(self, device, if_index, if_name=None):
+        """
+        :param device:      Device instance
+        :param if_index:    IF-MIB::ifIndex
+        :param if_name:     IF-MIB::ifName. Fetched from device if not provided
+        """
         self.logger = logging.getLogger('dns_update.device_interface:%s:ifIndex.%d' % (device.hostname, if_index))
         self.logger.debug("Created DeviceInterface object")
         self.device = device
         self.ip_addresses = {}
         self.if_index = if_index
-        self.if_name = None
+        self.if_name = if_name
         self.ptr = None
         self.short_ptr = None
-        self.get_if_name()
+        if self.if_name is None:
+            self.get_if_name()
+        else:
+            self._make_ptr()
         self.ignored = self.device.config.is_interface_ignored(self.device.hostname, self.if_name)
         self.vip_addresses = []
 
@@ -83,22 +91,48 @@ class DeviceInterface:
             )
         )
         for ip_address in self.ip_addresses:
-            # Check if interface or IP is ignored or if IP address is a VIP address
-            # And set PTR status to STATUS_IGNORED
-            if self.device.config.is_ip_ignored(ip_address) or ip_address in self.vip_addresses or self.ignored:
-                self.update_ptr_status(ip_address, None, DnsCheck.STATUS_IGNORED)
-                self.logger.debug("Interface '%s' or IP address '%s' are on ignore list" % (self.if_name, ip_address))
-                continue
-
-            # If IP matches loopback IP, expected PTR is device.hostname
-            if self.is_loopback(ip_address):
-                existing_ptr, status = self.device.dns.get_status(ip_address, self.device.hostname)
-            else:
-                existing_ptr, status = self.device.dns.get_status(ip_address, self.ptr)
-
-            # Update PTR status in interfaces dictionary
-            self.logger.debug("Update DeviceInterface PTR status for '%s' to '%d'" % (ip_address, status))
-            self.update_ptr_status(ip_address, existing_ptr, status)
+            self.check_ip(ip_address)
+
+    def check_ip(self, ip_address):
+        """
+        Check PTR of a single IP address on the interface and update its status
+        :param ip_address:  IP address
+        :return:
+        """
+        # Check if interface or IP is ignored or if IP address is a VIP address
+        # And set PTR status to STATUS_IGNORED
+        if self.is_ip_ignored(ip_address):
+            self.update_ptr_status(ip_address, None, DnsCheck.STATUS_IGNORED)
+            return
+
+        existing_ptr, status = self.device.dns.get_status(ip_address, self.get_expected_ptr(ip_address))
+
+        # Update PTR status in interfaces dictionary
+        self.logger.debug("Update DeviceInterface PTR status for '%s' to '%d'" % (ip_address, status))
+        self.update_ptr_status(ip_address, existing_ptr, status)
+
+    def is_ip_ignored(self, ip_address):
+        """
+        Check if PTR for the IP address shouldn't be checked.
+        Ignored interfaces and IP addresses and VIP addresses are not checked
+        :param ip_address:  IP address
+        :return:
+        """
+        if self.device.config.is_ip_ignored(ip_address) or ip_address in self.vip_addresses or self.ignored:
+            self.logger.debug("Interface '%s' or IP address '%s' are on ignore list" % (self.if_name, ip_address))
+            return True
+        return False
+
+    def get_expected_ptr(self, ip_address):
+        """
+        Returns PTR the IP address should have
+        If IP matches loopback IP, expected PTR is device.hostname
+        :param ip_address:  IP address
+        :return:
+        """
+        if self.is_loopback(ip_address):
+            return self.device.hostname
+        return self.ptr
 
     def add_ip_address(self, ip_address, vip_addresses=None):
         """
@@ -195,17 +229,28 @@ class DeviceInterface:
         self.logger.debug("Total number of IPs: %d" % (len(self.ip_addresses)))
         ptrs = {}
         for ip in self.ip_addresses:
-            try:
-                ptrs[ip] = Ptr(
-                    ip_address=ip,
-                    hostname=self.device.hostname,
-                    if_name=self.if_name,
-                    ptr=self._get_full_ptr(ip),
-                    status=self.ip_addresses[ip]['status']
-                )
-                self.logger.debug("Prepared PTR: %s" % ptrs[ip])
-            except ValueError as e:
-                self.logger.warning("Can't create PTR: %s" % e)
-                continue
+            ptr = self.get_ptr(ip)
+            if ptr:
+                ptrs[ip] = ptr
         self.logger.info("Returned %d PTRs for interface '%s'" % (len(ptrs), self.if_name))
         return ptrs
+
+    def get_ptr(self, ip_address):
+        """
+        Return ptr record for a single IP address on this interface
+        :param ip_address:  IP address
+        :return: Ptr or None if PTR can't be created
+        """
+        try:
+            ptr = Ptr(
+                ip_address=ip_address,
+                hostname=self.device.hostname,
+                if_name=self.if_name,
+                ptr=self._get_full_ptr(ip_address),
+                status=self.ip_addresses[ip_address]['status']
+            )
+            self.logger.debug("Prepared PTR: %s" % ptr)
+            return ptr
+        except ValueError as e:
+            self.logger.warning("Can't create PTR: %s" % e)
+            return None
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import itertools
+import logging
+from multiprocessing.pool import ThreadPool
+
+
+class DevicePoller:
+    """
+
+    Polls devices loaded by the Dispatcher and checks their PTRs.
+    Devices are processed by a bounded pool of worker threads.
+    Results are merged in the calling thread so no locking is needed.
+
+    """
+
+    def __init__(self, dispatcher, workers=None):
+        """
+        :param dispatcher:  Dispatcher instance with loaded devices
+        :param workers:     Number of devices polled in parallel. Config value is used if not set
+        """
+        self.logger = logging.getLogger('dns_update.device_poller')
+        self.dispatcher = dispatcher
+        self.workers = workers if workers else dispatcher.config.get_poller_workers()
+        self.engine = dispatcher.config.get_snmp_engine()
+        # SNMP data fetched by asynchronous engine. Keyed by hostname
+        self.sessions = {}
+        # Dict of PTRs from all polled devices. Keyed by IP address
+        self.ptrs = {}
+        # List of devices that couldn't be polled
+        self.failed_devices = []
+        # List of devices skipped because they failed in previous runs
+        self.breaker_skipped = []
+        self.interface_number = 0
+        self.ip_address_number = 0
+
+    def _poll_device(self, hostname):
+        """
+        Fetch interfaces from the device and check PTRs for them.
+        Runs in a worker thread.
+        :param hostname:    Device hostname (FQDN)
+        :return: tuple (hostname, success)
+        """
+        device = self.dispatcher.devices[hostname]
+        if device.get_interfaces(session=self.sessions.get(hostname)):
+            device.check_ptrs()
+            return hostname, True
+        return hostname, False
+
+    def poll(self, hostnames=None, callback=None):
+        """
+        Poll devices and merge results
+        :param hostnames:   List of device hostnames. All dispatcher devices if not set
+        :param callback:    Called with (completed, total) after each device is finished
+        :return: List of devices that couldn't be polled
+        """
+        hostnames = self._skip_open_breakers(hostnames)
+        total = len(hostnames)
+        workers = max(1, min(self.workers, total))
+        self.logger.info("Polling %d device(s) with %d worker(s)" % (total, workers))
+
+        pool = None
+        if workers > 1:
+            pool = ThreadPool(workers)
+            map_function = pool.imap_unordered
+        else:
+            map_function = itertools.imap
+
+        try:
+            completed = 0
+            for chunk in self._get_chunks(hostnames):
+                self._prefetch(chunk)
+                for hostname, success in map_function(self._poll_device, chunk):
+                    completed += 1
+                    self._merge(hostname, success)
+                    if callback:
+                        callback(completed, total)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        self.logger.info("Polled %d device(s), %d failed" % (total, len(self.failed_devices)))
+        return self.failed_devices
+
+    def _skip_open_breakers(self, hostnames=None):
+        """
+        Remove devices with open circuit breaker from the list
+        :param hostnames:   List of device hostnames. All dispatcher devices if not set
+        :return: List of hostnames that should be polled
+        """
+        if hostnames is None:
+            hostnames = self.dispatcher.devices.keys()
+        hostnames = list(hostnames)
+        breaker = self.dispatcher.breaker
+        if breaker:
+            skipped = set(x for x in hostnames if breaker.is_open(x))
+            self.breaker_skipped = sorted(skipped)
+            hostnames = [x for x in hostnames if x not in skipped]
+            self.logger.info("Skipping %d device(s) with open circuit breaker" % len(self.breaker_skipped))
+        return hostnames
+
+    def _get_chunks(self, hostnames):
+        """
+        Split hostnames into chunks that are fetched by asynchronous SNMP engine at once.
+        easysnmp engine polls each device from a worker so there's only one chunk.
+        :param hostnames: List of device hostnames
+        :return:
+        """
+        if self.engine != 'pysnmp':
+            return [hostnames]
+        # Several windows per chunk keep the engine busy while memory used by fetched data stays bounded
+        size = self.dispatcher.config.get_snmp_max_in_flight() * 10
+        return [hostnames[i:i + size] for i in range(0, len(hostnames), size)]
+
+    def _prefetch(self, hostnames):
+        """
+        Fetch SNMP data for devices with asynchronous engine
+        :param hostnames: List of device hostnames
+        :return:
+        """
+        if self.engine != 'pysnmp':
+            return
+        # Imported here so pysnmp is required only if the engine is used
+        from async_snmp_poller import AsyncSnmpPoller
+        devices = [self.dispatcher.devices[x] for x in hostnames if not self.dispatcher.devices[x].ignored]
+        self.sessions = AsyncSnmpPoller(self.dispatcher.config).poll(devices)
+
+    def _merge(self, hostname, success):
+        """
+        Merge results of a single device into poller totals
+        :param hostname:    Device hostname (FQDN)
+        :param success:     Whether the device was polled successfully
+        :return:
+        """
+        self._record_device(hostname, success)
+        self.ptrs.update(self.dispatcher.devices[hostname].get_ptrs())
+
+    def _record_device(self, hostname, success):
+        """
+        Update poller totals and circuit breaker state with a finished device
+        :param hostname:    Device hostname (FQDN)
+        :param success:     Whether the device was polled successfully
+        :return:
+        """
+        device = self.dispatcher.devices[hostname]
+        if not success:
+            self.failed_devices.append(hostname)
+        if self.dispatcher.breaker:
+            if success:
+                self.dispatcher.breaker.record_success(hostname)
+            else:
+                self.dispatcher.breaker.record_failure(hostname)
+        self.interface_number += device.get_number_of_interfaces()
+        self.ip_address_number += device.get_number_of_ip_addresses()
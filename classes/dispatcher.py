@@ -21,6 +21,11 @@ import imp
 import logging
 from classes import DnsCheck
 from classes import Device
+from classes import SnmpCache
+from classes import SnmpLatency
+from classes import CircuitBreaker
+from classes import PollResult
+from classes import Ptr
 
 
 class Dispatcher:
@@ -43,6 +48,12 @@ class Dispatcher:
         self.config = config
         # DNS
         self.dns = DnsCheck(self.config)
+        # ifName and HSRP tables kept between runs
+        self.snmp_cache = SnmpCache(self.config) if self.config.is_snmp_cache_enabled() else None
+        # Device response times used for adaptive SNMP timeouts
+        self.snmp_latency = SnmpLatency(self.config) if self.config.is_snmp_adaptive_timeout_enabled() else None
+        # Failure state of devices that couldn't be polled
+        self.breaker = CircuitBreaker(self.config) if self.config.is_breaker_enabled() else None
 
         if auto_load:
             # Autoload all connectors
@@ -94,20 +105,67 @@ class Dispatcher:
 
     def save_ptrs(self, ptrs):
         """
-        Issue save multiple PTRs command on each connector
+        Issue save multiple PTRs command on each connector.
+        Connector receives only PTRs with statuses from its ptr_statuses, or all of them if it's not set
         :param ptrs: PTR dict
         :return:
         """
-        self.logger.info("Dispatch save PTRs command for %d PTRs to all (%d) connectors" % (
-            len(ptrs), len(self.__connectors)
+        changed = len([x for x in ptrs.itervalues() if x.status in (Ptr.STATUS_NOT_CREATED, Ptr.STATUS_NOT_UPDATED)])
+        self.logger.info("Dispatch save PTRs command for %d PTRs (%d changed) to all (%d) connectors" % (
+            len(ptrs), changed, len(self.__connectors)
         ))
         for connector in self.__connectors:
-            connector.save_ptrs(ptrs)
-
-    def load(self):
+            if connector.ptr_statuses is None:
+                connector.save_ptrs(ptrs)
+                continue
+            selected = {k: v for k, v in ptrs.iteritems() if v.status in connector.ptr_statuses}
+            if not selected:
+                self.logger.debug("No PTRs to save for '%s'" % connector.__class__.__name__)
+                continue
+            connector.save_ptrs(selected)
+
+    def delete_stale_ptrs(self, skip_hostnames=()):
+        """
+        Cleanup stage. Stale PTRs are loaded from connectors that keep track of them (database)
+        and deleted from all other connectors (DNS) first. They're deleted from the database
+        only if all other connectors deleted them, so failed deletes are retried on next run.
+        :param skip_hostnames:  Devices that weren't polled in this run (failed, circuit breaker open).
+                                Their PTRs are kept even if they're stale
+        :return: List of deleted IP addresses
+        """
+        stale_ptrs = {}
+        sources = []
+        for connector in self.__connectors:
+            ptrs = connector.load_stale_ptrs()
+            if ptrs:
+                sources.append(connector)
+                stale_ptrs.update(ptrs)
+        skip_hostnames = set(skip_hostnames)
+        ptrs = {k: v for k, v in stale_ptrs.iteritems() if v.hostname not in skip_hostnames}
+        self.logger.info("Dispatch delete command for %d stale PTRs to all (%d) connectors, %d kept" % (
+            len(ptrs), len(self.__connectors), len(stale_ptrs) - len(ptrs)
+        ))
+        if not ptrs:
+            return []
+        deleted = set(ptrs)
+        for connector in self.__connectors:
+            if connector not in sources:
+                deleted &= set(connector.delete_ptrs(ptrs))
+        if len(deleted) < len(ptrs):
+            self.logger.warning("%d stale PTRs couldn't be deleted. Keeping them in database." % (
+                len(ptrs) - len(deleted)
+            ))
+        deleted = sorted(deleted, key=Ptr.get_ip_int)
+        for connector in sources:
+            connector.delete_ptrs(deleted)
+        return deleted
+
+    def load(self, shard=None, shard_count=None):
         """
         Load list of devices from each connector
         Since devices dict is keyed by hostnames, there are no duplicates
+        :param shard:       Load only devices from this shard (1..shard_count)
+        :param shard_count: Total number of shards
         :return:
         """
         # Temporary list
@@ -122,10 +180,22 @@ class Dispatcher:
         for device in device_list:
             hostname = self.dns.get_fqdn(device)
             if hostname:
+                if shard and PollResult.get_shard(hostname, shard_count) != shard:
+                    continue
                 if hostname not in self.devices:
-                    self.devices[hostname] = Device(hostname, self.config, self.dns)
+                    self.devices[hostname] = Device(hostname, self.config, self.dns, self.snmp_cache, self.snmp_latency)
             else:
                 self.logger.warning("Hostname '%s' couldn't be resolved. SKipping..." % device)
                 pass
 
         self.logger.info("Loaded %d device(s) from %d connectors" % (len(device_list), len(self.__connectors)))
+
+    def save_state(self):
+        """
+        Save state kept between runs (SNMP cache, device response times, circuit breaker, zone mirror, DNS cache)
+        :return:
+        """
+        zone_mirror = self.dns.zone_transfer.mirror if self.dns.zone_transfer else None
+        for state in (self.snmp_cache, self.snmp_latency, self.breaker, zone_mirror, self.dns.cache):
+            if state:
+                state.save()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import time
+from collections import OrderedDict
+
+from state_file import StateFile
+
+
+class DnsCache(StateFile):
+    """
+
+    DNS answers (A, PTR, SOA...) cached for their TTL.
+    Non-existing names and names without records of the type are cached as well (negative caching).
+    Cache is limited in size, least recently used answers are removed first.
+    Entries are keyed by record type and queried name ('A/host1', 'PTR/1.2.0.192.in-addr.arpa.').
+
+    """
+
+    # Negative answer types
+    NXDOMAIN = 'NXDOMAIN'
+    NO_ANSWER = 'NoAnswer'
+
+    def __init__(self, config, filename=None):
+        """
+        :param config:      Config instance
+        :param filename:    Cache file. dns_cache.json in state directory if not set.
+                            Cache is kept only in memory if dns.cache.persist isn't enabled
+        """
+        self.persistent = config.is_ns_cache_persistent()
+        self.size = config.get_ns_cache_size()
+        self.hits = 0
+        self.misses = 0
+        StateFile.__init__(self, filename if filename else config.get_state_dir() + '/dns_cache.json')
+        self.logger = logging.getLogger('dns_update.dns_cache')
+
+    def load(self):
+        """
+        Load answers that didn't expire from the cache file
+        :return:
+        """
+        with self.lock:
+            if self.persistent:
+                StateFile.load(self)
+            now = time.time()
+            # Answers that expire first are removed first
+            entries = sorted((x for x in self.data.items() if x[1]['expires'] > now), key=lambda x: x[1]['expires'])
+            self.data = OrderedDict(entries)
+            self._evict()
+
+    def save(self):
+        if self.persistent:
+            StateFile.save(self)
+
+    @staticmethod
+    def _get_key(name, rdtype):
+        return '%s/%s' % (rdtype, name)
+
+    def get_answer(self, name, rdtype):
+        """
+        Returns cached answer
+        :param name:    Queried name
+        :param rdtype:  Record type ('A', 'PTR', 'SOA'...)
+        :return: dict with 'qname', 'rdatas' (list of records in text format) and 'ttl' for positive answers,
+                 'error' (DnsCache.NXDOMAIN or DnsCache.NO_ANSWER) for negative ones. None if not cached
+        """
+        key = DnsCache._get_key(name, rdtype)
+        with self.lock:
+            entry = self.data.pop(key, None)
+            if not entry or entry['expires'] <= time.time():
+                self.misses += 1
+                return None
+            # Move to the end as the most recently used
+            self.data[key] = entry
+            self.hits += 1
+            return entry
+
+    def set_answer(self, name, rdtype, qname, rdatas, ttl):
+        """
+        Cache positive answer
+        :param name:    Queried name
+        :param rdtype:  Record type
+        :param qname:   Name the answer is for (FQDN from search list...)
+        :param rdatas:  List of records in text format
+        :param ttl:     TTL of the answer
+        :return:
+        """
+        self._set(name, rdtype, {
+            'qname': qname,
+            'rdatas': rdatas,
+            'ttl': ttl,
+            'expires': time.time() + ttl
+        })
+
+    def set_error(self, name, rdtype, error, ttl):
+        """
+        Cache negative answer
+        :param name:    Queried name
+        :param rdtype:  Record type
+        :param error:   DnsCache.NXDOMAIN or DnsCache.NO_ANSWER
+        :param ttl:     Number of seconds the answer is valid
+        :return:
+        """
+        self._set(name, rdtype, {
+            'error': error,
+            'expires': time.time() + ttl
+        })
+
+    def invalidate(self, name, rdtype):
+        """
+        Remove cached answer (after the record was changed)
+        :return:
+        """
+        self.delete(DnsCache._get_key(name, rdtype))
+
+    def _set(self, name, rdtype, entry):
+        key = DnsCache._get_key(name, rdtype)
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = entry
+            self._evict()
+
+    def _evict(self):
+        """
+        Remove least recently used answers over the size limit
+        :return:
+        """
+        while len(self.data) > self.size:
+            self.data.popitem(last=False)
@@ -16,13 +16,24 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import itertools
 import socket
+import threading
+import time
+import dns.rdata
+import dns.rdataclass
+import dns.rdatatype
 import dns.resolver
 import dns.reversename
 import dns.exception
 import logging
 import ipaddress
+from multiprocessing.pool import ThreadPool
 from config import Config
+from dns_cache import DnsCache
+from nameserver_selector import NameserverSelector
+from zone_mirror import ZoneMirror
+from zone_transfer import ZoneTransfer
 from pprint import pprint
 
 
@@ -34,6 +45,9 @@ class DnsCheck:
     STATUS_NOT_AUTHORITATIVE = 4
     STATUS_IGNORED = 5
 
+    # Seconds to remember zones whose SOA couldn't be fetched
+    AUTHORITY_NEGATIVE_TTL = 60
+
     def __init__(self, config=None):
         self.logger = logging.getLogger('dns_update.dns_check')
         self.config = config if config else Config()
@@ -47,14 +61,99 @@ class DnsCheck:
         for domain in self.config.get_ns_search_domains():
             self.resolver.search.append(dns.name.from_text(domain))
         self.logger.info("There are %d domains in search list" % len(self.resolver.search))
+        # Worker threads used by check_many. Shared by all callers so the limit is global
+        self.max_in_flight = self.config.get_ns_max_in_flight()
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        # Queries go to the fastest server instead of servers in configured order.
+        # Each concurrent check may have a hedged query in flight to every server
+        self.selector = NameserverSelector(
+            self.resolver.nameservers, self.resolver.search, self.resolver.timeout, self.config.is_ns_hedge_enabled(),
+            workers=self.max_in_flight * len(self.resolver.nameservers)
+        )
+        # Answers shared by all lookups (device hostnames, PTRs, SOA)
+        self.cache = DnsCache(self.config) if self.config.is_ns_cache_enabled() else None
+        self.authoritative_prefixes = self.config.get_ns_authoritative_prefixes()
+        # Authority of each PTR zone: {zone: (authoritative, expires)}
+        self.authority_cache = {}
+        self.authority_lock = threading.Lock()
+        self.authority_hits = 0
+        self.authority_misses = 0
+        # PTRs in zones we're authoritative for are read from zone transfers
+        self.zone_transfer = None
+        if self.config.is_ns_axfr_enabled():
+            master = self.config.get_ns_axfr_master()
+            if master:
+                mirror = ZoneMirror(self.config) if self.config.is_ns_zone_mirror_enabled() else None
+                self.zone_transfer = ZoneTransfer(*master, mirror=mirror)
+
+    def _query(self, name, rdtype):
+        """
+        Query DNS servers. Answers are taken from the cache and stored in it if cache is enabled.
+        Raises dns.exception.DNSException if there is no answer
+        :param name:    Name to query
+        :param rdtype:  Record type ('A', 'PTR', 'SOA'...)
+        :return: tuple (qname, list of rdata objects, ttl)
+        """
+        name = str(name)
+        if self.cache:
+            entry = self.cache.get_answer(name, rdtype)
+            if entry:
+                self.logger.debug("Answer for %s '%s' found in cache" % (rdtype, name))
+                if entry.get('error') == DnsCache.NXDOMAIN:
+                    raise dns.resolver.NXDOMAIN(qnames=[name])
+                if entry.get('error') == DnsCache.NO_ANSWER:
+                    raise dns.resolver.NoAnswer
+                rdatas = [dns.rdata.from_text(dns.rdataclass.IN, dns.rdatatype.from_text(rdtype), x)
+                          for x in entry['rdatas']]
+                return dns.name.from_text(entry['qname']), rdatas, entry['ttl']
+        try:
+            answers = self.selector.query(name, rdtype)
+        except dns.resolver.NXDOMAIN as e:
+            if self.cache:
+                self.cache.set_error(name, rdtype, DnsCache.NXDOMAIN, self._get_negative_ttl(e))
+            raise
+        except dns.resolver.NoAnswer as e:
+            if self.cache:
+                self.cache.set_error(name, rdtype, DnsCache.NO_ANSWER, self._get_negative_ttl(e))
+            raise
+        rdatas = list(answers)
+        if self.cache:
+            qname = answers.qname.to_text()
+            texts = [x.to_text() for x in rdatas]
+            self.cache.set_answer(name, rdtype, qname, texts, answers.rrset.ttl)
+            # Name found with search list is queried as FQDN later (Dispatcher.load and Device)
+            if qname != name:
+                self.cache.set_answer(qname, rdtype, qname, texts, answers.rrset.ttl)
+        return answers.qname, rdatas, answers.rrset.ttl
+
+    def _get_negative_ttl(self, e):
+        """
+        Returns number of seconds negative answer can be cached.
+        SOA minimum (or SOA TTL if lower) from the answer, configured value if there is no SOA
+        :param e:   NXDOMAIN or NoAnswer exception
+        :return:
+        """
+        kwargs = getattr(e, 'kwargs', None) or {}
+        responses = list(kwargs.get('responses', {}).values())
+        if kwargs.get('response'):
+            responses.append(kwargs['response'])
+        ttls = []
+        for response in responses:
+            for rrset in response.authority:
+                if rrset.rdtype == dns.rdatatype.SOA:
+                    ttls.append(min(rrset.ttl, rrset[0].minimum))
+        if ttls:
+            return min(ttls)
+        return self.config.get_ns_cache_negative_ttl()
 
     def get_fqdn(self, hostname):
         if not len(hostname):
             self.logger.debug("Empty hostname provided")
             return False
         try:
-            answers = self.resolver.query(hostname, 'A')
-            fqdn = answers.qname.to_text()
+            qname, rdatas, ttl = self._query(hostname, 'A')
+            fqdn = qname.to_text()
             self.logger.debug("FQDN ('%s') = '%s'" % (hostname, fqdn))
             return fqdn
         except dns.exception.DNSException as e:
@@ -66,8 +165,8 @@ class DnsCheck:
             self.logger.debug("Empty hostname provided")
             return False
         try:
-            answers = self.resolver.query(hostname, 'A')
-            for rdata in answers:
+            qname, rdatas, ttl = self._query(hostname, 'A')
+            for rdata in rdatas:
                 ip = rdata.to_text()
                 self.logger.debug("'%s' = '%s'" % (hostname, ip))
                 return ip
@@ -78,8 +177,8 @@ class DnsCheck:
     def get_ptr(self, ip_address):
         ipaddress.IPv4Address(ip_address.decode('utf-8'))
         try:
-            answers = self.resolver.query(dns.reversename.from_address(ip_address), 'PTR')
-            for rdata in answers:
+            qname, rdatas, ttl = self._query(dns.reversename.from_address(ip_address), 'PTR')
+            for rdata in rdatas:
                 ptr = rdata.to_text()
                 self.logger.debug("'%s' = '%s'" % (ptr, ip_address))
                 return ptr
@@ -87,6 +186,40 @@ class DnsCheck:
             self.logger.error("DNSException raised for '%s': %s" % (ip_address, e))
             return False
 
+    def log_stats(self):
+        """
+        Log statistics of DNS servers and caches
+        :return:
+        """
+        self.selector.log_stats()
+        self.logger.info("PTR zone authority cache: %d hits, %d misses" % (self.authority_hits, self.authority_misses))
+        if self.cache:
+            self.logger.info("DNS cache: %d hits, %d misses" % (self.cache.hits, self.cache.misses))
+
+    def invalidate_ptr(self, ip_address):
+        """
+        Remove cached PTR for the IP address after it was changed
+        :param ip_address:  IP address
+        :return:
+        """
+        if self.cache:
+            self.cache.invalidate(str(dns.reversename.from_address(ip_address)), 'PTR')
+
+    def get_existing_ptr(self, ip_address):
+        """
+        Returns existing PTR for the IP address.
+        Zone transfer is used for zones we're authoritative for (if enabled), PTR query otherwise.
+        :param ip_address:  IP address
+        :return: PTR or False if there is no PTR
+        """
+        if self.zone_transfer and self.is_authoritative(ip_address):
+            ptrs = self.zone_transfer.get_ptrs(DnsCheck.get_ptr_zone(ip_address))
+            if ptrs is not None:
+                ptr = ptrs.get(ip_address, False)
+                self.logger.debug("'%s' = '%s' (zone transfer)" % (ptr, ip_address))
+                return ptr
+        return self.get_ptr(ip_address)
+
     def get_status(self, ip_address, expected_ptr):
         """
         Checks if expected and existing PTR for the IP address are the same.
@@ -102,7 +235,7 @@ class DnsCheck:
         :return:
         """
         ipaddress.IPv4Address(ip_address.decode('utf-8'))
-        existing_ptr = self.get_ptr(ip_address)
+        existing_ptr = self.get_existing_ptr(ip_address)
 
         # There is no PTR
         if not existing_ptr:
@@ -146,30 +279,91 @@ class DnsCheck:
                 ))
                 return existing_ptr, DnsCheck.STATUS_NOT_AUTHORITATIVE
 
+    def check_many(self, checks):
+        """
+        Checks many IP addresses at once. Up to max_in_flight checks run concurrently
+        :param checks:  List of (ip_address, expected_ptr) tuples
+        :return: List of (existing_ptr, status) tuples in the same order, as returned by get_status
+        """
+        checks = list(checks)
+        if self.max_in_flight < 2 or len(checks) < 2:
+            return list(itertools.starmap(self.get_status, checks))
+        self.logger.debug("Checking %d IP addresses" % len(checks))
+        return self._get_pool().map(self._check, checks)
+
+    def _check(self, check):
+        return self.get_status(*check)
+
+    def _get_pool(self):
+        """
+        Returns thread pool used for concurrent checks. Created on first use
+        """
+        with self.pool_lock:
+            if not self.pool:
+                self.logger.info("Starting %d DNS worker(s)" % self.max_in_flight)
+                self.pool = ThreadPool(self.max_in_flight)
+            return self.pool
+
+    def close(self):
+        """
+        Stop worker threads used for concurrent checks and hedged queries
+        :return:
+        """
+        with self.pool_lock:
+            if self.pool:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+        self.selector.close()
+
     def is_authoritative(self, ip_address):
         """
         Checks if we are responsible for PTR zone.
-        Queries for SOA record for PTR zone and checks if mname is in servers list defined in config file
+        IP addresses from authoritative prefixes in config file are accepted without a query.
+        Otherwise SOA of the PTR zone is checked once and the result is cached for the SOA TTL.
         """
-        ipaddress.IPv4Address(ip_address.decode('utf-8'))
-        ns_list = self.config.get_ns_servers()
+        address = ipaddress.IPv4Address(ip_address.decode('utf-8'))
+        for prefix in self.authoritative_prefixes:
+            if address in prefix:
+                self.logger.debug("'%s' is in authoritative prefix %s" % (ip_address, prefix))
+                return True
 
-        # Get SOA record. If master name is in ns servers list return true
         ptr_zone = DnsCheck.get_ptr_zone(ip_address)
+        with self.authority_lock:
+            cached = self.authority_cache.get(ptr_zone)
+            if cached and cached[1] > time.time():
+                self.authority_hits += 1
+                self.logger.debug("Authority for '%s' found in cache: %s" % (ptr_zone, cached[0]))
+                return cached[0]
+            self.authority_misses += 1
+
+        authoritative, ttl = self._query_authority(ptr_zone)
+        with self.authority_lock:
+            self.authority_cache[ptr_zone] = (authoritative, time.time() + ttl)
+        if authoritative:
+            self.logger.debug("Server responsible for '%s' is in NS list" % ip_address)
+        else:
+            self.logger.debug("Server responsible for '%s' is NOT in NS list" % ip_address)
+        return authoritative
+
+    def _query_authority(self, ptr_zone):
+        """
+        Queries for SOA record for PTR zone and checks if mname is in servers list defined in config file
+        :param ptr_zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :return: tuple (authoritative, ttl)
+        """
+        ns_list = self.config.get_ns_servers()
         try:
-            soa_answers = self.resolver.query(ptr_zone, 'SOA')
-            for rdata in soa_answers:
-                self.logger.debug("NS servers found in SOA for %s: %s" % (ptr_zone, str(rdata.mname).rstrip('.')))
-                # Remove fqdn dot from the end of the master name in SOA and check if in our NS servers list
-                if str(rdata.mname).rstrip('.') in ns_list:
-                    self.logger.debug("Server responsible for '%s' is in NS list" % ip_address)
-                    return True
+            qname, rdatas, ttl = self._query(ptr_zone, 'SOA')
         except dns.exception.DNSException as e:
             self.logger.warning("Error querying '%s' SOA RR: %s" % (ptr_zone, e))
-            return False
-
-        self.logger.debug("Server responsible for '%s' is NOT in NS list" % ip_address)
-        return False
+            return False, DnsCheck.AUTHORITY_NEGATIVE_TTL
+        for rdata in rdatas:
+            self.logger.debug("NS servers found in SOA for %s: %s" % (ptr_zone, str(rdata.mname).rstrip('.')))
+            # Remove fqdn dot from the end of the master name in SOA and check if in our NS servers list
+            if str(rdata.mname).rstrip('.') in ns_list:
+                return True, ttl
+        return False, ttl
 
     @staticmethod
     def get_ptr_zone(ip_address):
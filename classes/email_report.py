@@ -77,14 +77,15 @@ class EmailReport:
             except smtplib.SMTPException as e:
                 self.logger.error(e)
 
-    def generate_report(self, ptrs=None, error_message=None, devices_skipped=None):
+    def generate_report(self, ptrs=None, error_message=None, devices_skipped=None, devices_breaker_open=None):
         # Html part
         if error_message:
             content = self._generate_error_html(error_message)
         else:
             content = self._generate_html(
                 ptrs=self._prepare_ptrs(ptrs),
-                devices_skipped=devices_skipped
+                devices_skipped=devices_skipped,
+                devices_breaker_open=devices_breaker_open
             )
         self.html = self._generate_base_html(content)
 
@@ -92,6 +93,7 @@ class EmailReport:
         self.plaintext = self._generate_plaintext(
             ptrs=self._prepare_ptrs(ptrs),
             devices_skipped=devices_skipped,
+            devices_breaker_open=devices_breaker_open,
             error_message=error_message
         )
 
@@ -130,7 +132,7 @@ class EmailReport:
             content=content
         )
 
-    def _generate_html(self, ptrs, devices_skipped):
+    def _generate_html(self, ptrs, devices_skipped, devices_breaker_open=None):
 
         html_report_raw = self.base_html_path + 'report.html'
         updated_rows_file = self.base_html_path + 'updated_rows.html'
@@ -150,6 +152,7 @@ class EmailReport:
             updated_rows=self.html_updated_rows,
             ptrs_updated=True if len(ptrs) else False,
             devices_skipped=devices_skipped,
+            devices_breaker_open=devices_breaker_open,
             hostname=self.device,
             interface_number=self.interface_number,
             ip_number=self.ip_number,
@@ -174,7 +177,7 @@ class EmailReport:
                 })
         return prepared_ptrs
 
-    def _generate_plaintext(self, ptrs, devices_skipped, error_message):
+    def _generate_plaintext(self, ptrs, devices_skipped, error_message, devices_breaker_open=None):
         text_raw_file = self.base_text_path + 'report.txt'
         with open(text_raw_file) as text_template:
             self.text_raw = text_template.read()
@@ -185,6 +188,7 @@ class EmailReport:
             ptrs=ptrs,
             ptrs_updated=True if len(ptrs) else False,
             devices_skipped=devices_skipped,
+            devices_breaker_open=devices_breaker_open,
             hostname=self.device,
             interface_number=self.interface_number,
             ip_number=self.ip_number,
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from Queue import Queue, Empty
+import dns.exception
+import dns.resolver
+
+
+class NameserverSelector:
+    """
+
+    Sends queries to the fastest of the configured DNS servers.
+    Response time of each server is tracked as exponentially weighted moving average.
+    Timeouts and failures count as responses that took the whole timeout, so a degraded
+    server moves to the end of the list. If the server doesn't answer within a few of its
+    average response times, the query is also sent to the next server (hedging)
+    and the first answer is used. Hedged queries are sent by a pool of worker threads shared by all lookups.
+
+    """
+
+    # Weight of the last response time in the average
+    ALPHA = 0.3
+    # Query is hedged after HEDGE_FACTOR average response times, but not sooner than MIN_HEDGE_DELAY seconds
+    HEDGE_FACTOR = 3
+    MIN_HEDGE_DELAY = 0.02
+
+    def __init__(self, nameservers, search=None, timeout=2, hedge=True, workers=10):
+        """
+        :param nameservers: List of DNS server addresses
+        :param search:      List of dns.name.Name objects (search list)
+        :param timeout:     Seconds to wait for a single server
+        :param hedge:       Send query to the next server if the fastest one is late
+        :param workers:     Number of threads sending hedged queries. Should allow a query to every server
+                            for each concurrent lookup, otherwise queries wait for a free thread
+        """
+        self.logger = logging.getLogger('dns_update.nameserver_selector')
+        self.nameservers = list(nameservers)
+        self.timeout = timeout
+        self.hedge = hedge and len(self.nameservers) > 1
+        self.lock = threading.Lock()
+        self.workers = max(1, workers)
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        self.resolvers = {}
+        self.stats = {}
+        for nameserver in self.nameservers:
+            resolver = dns.resolver.Resolver(configure=False)
+            resolver.nameservers = [nameserver]
+            resolver.search = list(search) if search else []
+            resolver.timeout = timeout
+            # Don't retry the same server. Next one is tried instead
+            resolver.lifetime = timeout
+            self.resolvers[nameserver] = resolver
+            self.stats[nameserver] = {
+                'queries': 0,
+                'errors': 0,
+                'hedged': 0,
+                'latency': None
+            }
+
+    def get_order(self):
+        """
+        Returns servers ordered by average response time. Servers without responses are tried first
+        :return: List of server addresses
+        """
+        with self.lock:
+            return sorted(
+                self.nameservers,
+                key=lambda x: (self.stats[x]['latency'] is not None, self.stats[x]['latency'])
+            )
+
+    def query(self, name, rdtype):
+        """
+        Query servers starting with the fastest one.
+        NXDOMAIN and NoAnswer are answers and are raised immediately. Next server is tried on other errors.
+        :param name:    Name to query
+        :param rdtype:  Record type
+        :return: dns.resolver.Answer
+        """
+        servers = self.get_order()
+        if not self.hedge:
+            error = None
+            for nameserver in servers:
+                try:
+                    return self._query(nameserver, name, rdtype)
+                except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                    raise
+                except dns.exception.DNSException as e:
+                    error = e
+            raise error
+
+        results = Queue()
+        pending = 0
+        error = None
+        while servers or pending:
+            if servers:
+                nameserver = servers.pop(0)
+                if pending:
+                    with self.lock:
+                        self.stats[nameserver]['hedged'] += 1
+                    self.logger.debug("Hedging query for %s '%s' to %s" % (rdtype, name, nameserver))
+                self._get_pool().apply_async(self._query_task, (results, nameserver, name, rdtype))
+                pending += 1
+                # Wait for any answer, then send the query to the next server
+                wait = self._get_hedge_delay(nameserver) if servers else None
+            else:
+                wait = None
+            try:
+                answer, e = results.get(timeout=wait)
+            except Empty:
+                continue
+            pending -= 1
+            if e is None:
+                return answer
+            if isinstance(e, (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)):
+                raise e
+            error = e
+        raise error
+
+    def _get_pool(self):
+        """
+        Returns thread pool used for hedged queries. Created on first use
+        """
+        with self.pool_lock:
+            if not self.pool:
+                self.logger.info("Starting %d DNS query worker(s)" % self.workers)
+                self.pool = ThreadPool(self.workers)
+            return self.pool
+
+    def close(self):
+        """
+        Stop worker threads used for hedged queries
+        :return:
+        """
+        with self.pool_lock:
+            if self.pool:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+
+    def _query_task(self, results, nameserver, name, rdtype):
+        try:
+            results.put((self._query(nameserver, name, rdtype), None))
+        except Exception as e:
+            # Any error must be reported, the caller waits for a result of every query
+            results.put((None, e))
+
+    def _query(self, nameserver, name, rdtype):
+        """
+        Query single server and record its response time
+        """
+        start_time = time.time()
+        try:
+            answer = self.resolvers[nameserver].query(name, rdtype)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            self._record(nameserver, time.time() - start_time)
+            raise
+        except dns.exception.DNSException as e:
+            self.logger.warning("Query for %s '%s' to %s failed: %s" % (rdtype, name, nameserver, e))
+            self._record(nameserver, self.timeout, error=True)
+            raise
+        self._record(nameserver, time.time() - start_time)
+        return answer
+
+    def _record(self, nameserver, latency, error=False):
+        with self.lock:
+            stats = self.stats[nameserver]
+            stats['queries'] += 1
+            if error:
+                stats['errors'] += 1
+            if stats['latency'] is None:
+                stats['latency'] = latency
+            else:
+                stats['latency'] += NameserverSelector.ALPHA * (latency - stats['latency'])
+
+    def _get_hedge_delay(self, nameserver):
+        with self.lock:
+            latency = self.stats[nameserver]['latency']
+        if latency is None:
+            return self.timeout
+        return min(self.timeout, max(NameserverSelector.MIN_HEDGE_DELAY, latency * NameserverSelector.HEDGE_FACTOR))
+
+    def log_stats(self):
+        """
+        Log number of queries, errors and average response time of each server
+        :return:
+        """
+        for nameserver in self.nameservers:
+            stats = self.stats[nameserver]
+            self.logger.info("DNS server %s: %d queries, %d errors, %d hedged, average response time %s" % (
+                nameserver, stats['queries'], stats['errors'], stats['hedged'],
+                '%.1f ms' % (stats['latency'] * 1000) if stats['latency'] is not None else 'n/a'
+            ))
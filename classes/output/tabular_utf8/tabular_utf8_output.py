@@ -30,7 +30,7 @@ class TabularUtf8Output(BaseOutput):
         pass
 
     @staticmethod
-    def display_summary(dispatcher):
+    def display_summary(dispatcher, breaker_skipped=None):
         horizontal_border = (
             '═' * 37,
             '═' * 6,
@@ -56,9 +56,14 @@ class TabularUtf8Output(BaseOutput):
 
         output_array = []
 
+        breaker_skipped = breaker_skipped if breaker_skipped else []
         for device in dispatcher.devices:
             if not dispatcher.devices[device]:
                 continue
+            # Devices skipped by circuit breaker weren't polled. Nothing to count
+            if device in breaker_skipped:
+                output_array.append("│%-37s│\033[90m %-56s\033[0;0m│\n" % (device, 'SKIPPED (circuit breaker open)'))
+                continue
             output_array.append(TabularUtf8Output.display_device_summary(dispatcher.devices[device]))
 
         output_string += ''.join(filter(None, output_array))
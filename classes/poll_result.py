@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import hashlib
+import json
+import logging
+import os
+
+from ptr import Ptr
+
+
+class PollResult:
+    """
+
+    Results of polling one shard of devices.
+    Shards are polled on separate hosts, saved to JSON files and merged
+    so PTRs are saved through connectors only once for the whole inventory.
+
+    """
+
+    def __init__(self, shard=None, shard_count=None):
+        """
+        :param shard:       Shard number (1..shard_count). None for unsharded run
+        :param shard_count: Total number of shards
+        """
+        self.logger = logging.getLogger('dns_update.poll_result')
+        self.shard = shard
+        self.shard_count = shard_count
+        # Dict of PTRs keyed by IP address
+        self.ptrs = {}
+        self.failed_devices = []
+        self.breaker_skipped = []
+        self.device_number = 0
+        self.interface_number = 0
+        self.ip_address_number = 0
+        self.delta_time = 0
+
+    @staticmethod
+    def get_shard(hostname, shard_count):
+        """
+        Returns shard the device belongs to. Hash of the hostname doesn't change between runs or hosts.
+        :param hostname:    Device hostname (FQDN)
+        :param shard_count: Total number of shards
+        :return: Shard number (1..shard_count)
+        """
+        return int(hashlib.md5(hostname.lower()).hexdigest(), 16) % shard_count + 1
+
+    @classmethod
+    def from_poller(cls, poller, delta_time, shard=None, shard_count=None):
+        """
+        Creates result from finished DevicePoller
+        :param poller:      DevicePoller instance
+        :param delta_time:  Time it took to poll devices
+        :param shard:       Shard number
+        :param shard_count: Total number of shards
+        :return: PollResult
+        """
+        result = cls(shard, shard_count)
+        result.ptrs = poller.ptrs
+        result.failed_devices = list(poller.failed_devices)
+        result.breaker_skipped = list(poller.breaker_skipped)
+        result.device_number = len(poller.dispatcher.devices)
+        result.interface_number = poller.interface_number
+        result.ip_address_number = poller.ip_address_number
+        result.delta_time = delta_time
+        return result
+
+    def save(self, filename):
+        """
+        Write result to JSON file
+        :param filename: Path to file
+        :return:
+        """
+        data = {
+            'shard': self.shard,
+            'shard_count': self.shard_count,
+            'ptrs': [ptr.to_dict() for ptr in self.ptrs.values()],
+            'failed_devices': self.failed_devices,
+            'breaker_skipped': self.breaker_skipped,
+            'device_number': self.device_number,
+            'interface_number': self.interface_number,
+            'ip_address_number': self.ip_address_number,
+            'delta_time': self.delta_time
+        }
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as data_file:
+            json.dump(data, data_file)
+        os.rename(tmp_filename, filename)
+        self.logger.info("Saved %d PTRs from shard %s/%s to '%s'" % (
+            len(self.ptrs), self.shard, self.shard_count, filename
+        ))
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read result from JSON file
+        :param filename: Path to file
+        :return: PollResult
+        """
+        with open(filename) as data_file:
+            data = json.load(data_file)
+        result = cls(data['shard'], data['shard_count'])
+        for ptr_data in data['ptrs']:
+            ptr = Ptr.from_dict(ptr_data)
+            result.ptrs[str(ptr.ip_address)] = ptr
+        result.failed_devices = data['failed_devices']
+        result.breaker_skipped = data['breaker_skipped']
+        result.device_number = data['device_number']
+        result.interface_number = data['interface_number']
+        result.ip_address_number = data['ip_address_number']
+        result.delta_time = data['delta_time']
+        result.logger.info("Loaded %d PTRs from shard %s/%s" % (len(result.ptrs), result.shard, result.shard_count))
+        return result
+
+    @classmethod
+    def merge(cls, results):
+        """
+        Merge results of all shards into one.
+        Raises ValueError if results are not from the same set of shards or some shard is missing
+        :param results: List of PollResult objects
+        :return: PollResult
+        """
+        if not results:
+            raise ValueError("No results to merge")
+        shard_count = results[0].shard_count
+        shards = sorted(x.shard for x in results)
+        if any(x.shard_count != shard_count for x in results):
+            raise ValueError("Results are from different number of shards")
+        if shards != range(1, shard_count + 1):
+            raise ValueError("Expected shards 1..%s, got: %s" % (shard_count, ', '.join(str(x) for x in shards)))
+
+        merged = cls()
+        for result in sorted(results, key=lambda x: x.shard):
+            merged.ptrs.update(result.ptrs)
+            merged.failed_devices += result.failed_devices
+            merged.breaker_skipped += result.breaker_skipped
+            merged.device_number += result.device_number
+            merged.interface_number += result.interface_number
+            merged.ip_address_number += result.ip_address_number
+            # Shards are polled in parallel
+            merged.delta_time = max(merged.delta_time, result.delta_time)
+        merged.logger.info("Merged %d PTRs from %d shards" % (len(merged.ptrs), shard_count))
+        return merged
@@ -16,6 +16,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import calendar
 import ipaddress
 import logging
 import time
@@ -80,6 +81,32 @@ class Ptr:
     def __repr__(self):
         return "%s (%s)" % (self.ptr, self.ip_address)
 
+    def to_dict(self):
+        """
+        Returns PTR as a dict that can be serialized to JSON
+        :return:
+        """
+        return {
+            'ip_address': str(self.ip_address),
+            'ptr': self.ptr,
+            'hostname': self.hostname,
+            'if_name': self.if_name,
+            'status': self.status,
+            'time': calendar.timegm(self.time)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates PTR from a dict made by to_dict
+        :param data: dict
+        :return: Ptr
+        """
+        return cls(
+            str(data['ip_address']), data['ptr'], data['hostname'], data['if_name'],
+            status=data['status'], create_time=data['time']
+        )
+
     def get_status_action_took_string(self):
         statuses = {
             0: "Unknown",
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import threading
+from Queue import Queue
+
+from device_poller import DevicePoller
+from ptr import Ptr
+
+
+class PtrPipeline(DevicePoller):
+    """
+
+    Polls devices and checks PTRs in three stages connected by bounded queues:
+        - SNMP:     worker threads fetch interfaces from devices
+        - DNS:      worker threads check PTR of each IP address as soon as it's discovered
+        - persist:  calling thread passes checked PTRs to the sink in batches
+    Network waits of both stages overlap and PTRs are saved while devices are still being polled.
+
+    """
+
+    # Marks the end of work in a queue
+    _DONE = None
+
+    def __init__(self, dispatcher, sink=None, workers=None, dns_workers=None, queue_size=None, batch_size=None):
+        """
+        :param dispatcher:  Dispatcher instance with loaded devices
+        :param sink:        Called with dict of PTRs (keyed by IP address) for each batch.
+                            All PTRs are kept in self.ptrs if not set, otherwise only PTRs that need update
+        :param workers:     Number of devices polled in parallel. Config value is used if not set
+        :param dns_workers: Number of IP addresses checked in parallel. Config value is used if not set
+        :param queue_size:  Maximum number of items waiting between stages. Config value is used if not set
+        :param batch_size:  Number of PTRs passed to sink at once. Config value is used if not set
+        """
+        DevicePoller.__init__(self, dispatcher, workers)
+        self.logger = logging.getLogger('dns_update.ptr_pipeline')
+        config = dispatcher.config
+        self.sink = sink
+        self.dns_workers = dns_workers if dns_workers else config.get_poller_dns_workers()
+        self.queue_size = queue_size if queue_size else config.get_poller_queue_size()
+        self.batch_size = batch_size if batch_size else config.get_poller_batch_size()
+        self.saved_ptr_number = 0
+        self._batch = {}
+
+    def poll(self, hostnames=None, callback=None):
+        """
+        Poll devices, check and save PTRs
+        :param hostnames:   List of device hostnames. All dispatcher devices if not set
+        :param callback:    Called with (completed, total) after each device is polled
+        :return: List of devices that couldn't be polled
+        """
+        hostnames = self._skip_open_breakers(hostnames)
+        total = len(hostnames)
+        self.logger.info("Polling %d device(s) with %d SNMP and %d DNS worker(s)" % (
+            total, self.workers, self.dns_workers
+        ))
+        completed = 0
+        for chunk in self._get_chunks(hostnames):
+            self._prefetch(chunk)
+            completed = self._run(chunk, completed, total, callback)
+        self._flush()
+        self.logger.info("Polled %d device(s), %d failed, %d PTRs saved" % (
+            total, len(self.failed_devices), self.saved_ptr_number
+        ))
+        return self.failed_devices
+
+    def _run(self, hostnames, completed, total, callback):
+        """
+        Run pipeline for a list of devices
+        :return: Number of completed devices
+        """
+        device_queue = Queue()
+        check_queue = Queue(self.queue_size)
+        persist_queue = Queue(self.queue_size)
+        for hostname in hostnames:
+            device_queue.put(hostname)
+
+        snmp_workers = max(1, min(self.workers, len(hostnames)))
+        snmp_threads = []
+        for _ in range(snmp_workers):
+            device_queue.put(PtrPipeline._DONE)
+            snmp_threads.append(self._start_thread(self._snmp_stage, device_queue, check_queue, persist_queue))
+        dns_threads = []
+        for _ in range(self.dns_workers):
+            dns_threads.append(self._start_thread(self._dns_stage, check_queue, persist_queue))
+
+        # DNS workers are stopped once all devices are discovered
+        def stop_dns_stage():
+            for thread in snmp_threads:
+                thread.join()
+            for _ in dns_threads:
+                check_queue.put(PtrPipeline._DONE)
+        self._start_thread(stop_dns_stage)
+
+        # Persist stage. Runs in the calling thread so connectors are used only from the thread that created them
+        running = len(dns_threads)
+        while running:
+            item = persist_queue.get()
+            if item is PtrPipeline._DONE:
+                running -= 1
+            elif isinstance(item, Ptr):
+                self._add_ptr(item)
+            else:
+                hostname, success = item
+                self._record_device(hostname, success)
+                completed += 1
+                if callback:
+                    callback(completed, total)
+        return completed
+
+    @staticmethod
+    def _start_thread(target, *args):
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _snmp_stage(self, device_queue, check_queue, persist_queue):
+        """
+        Fetch interfaces from devices and pass each IP address to DNS stage
+        :return:
+        """
+        while True:
+            hostname = device_queue.get()
+            if hostname is PtrPipeline._DONE:
+                return
+            device = self.dispatcher.devices[hostname]
+            try:
+                success = device.get_interfaces(session=self.sessions.get(hostname))
+            except Exception as e:
+                self.logger.error("Failed to poll '%s': %s" % (hostname, e))
+                success = False
+            if success:
+                for interface in device.interfaces.values():
+                    for ip_address in interface.ip_addresses.keys():
+                        check_queue.put((interface, ip_address))
+            persist_queue.put((hostname, success))
+
+    def _dns_stage(self, check_queue, persist_queue):
+        """
+        Check PTR for each IP address and pass it to persist stage
+        :return:
+        """
+        while True:
+            item = check_queue.get()
+            if item is PtrPipeline._DONE:
+                persist_queue.put(PtrPipeline._DONE)
+                return
+            interface, ip_address = item
+            try:
+                interface.check_ip(ip_address)
+                ptr = interface.get_ptr(ip_address)
+            except Exception as e:
+                self.logger.error("Failed to check PTR for '%s': %s" % (ip_address, e))
+                continue
+            if ptr:
+                persist_queue.put(ptr)
+
+    def _add_ptr(self, ptr):
+        """
+        Add checked PTR to current batch. Batch is passed to sink once it's full
+        :param ptr: Ptr object
+        :return:
+        """
+        ip_address = str(ptr.ip_address)
+        if not self.sink:
+            self.ptrs[ip_address] = ptr
+            return
+        # Only PTRs that need update are kept for the report
+        if ptr.status in (Ptr.STATUS_NOT_CREATED, Ptr.STATUS_NOT_UPDATED):
+            self.ptrs[ip_address] = ptr
+        self._batch[ip_address] = ptr
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """
+        Pass current batch to sink
+        :return:
+        """
+        if self.sink and self._batch:
+            self.logger.debug("Saving batch of %d PTRs" % len(self._batch))
+            self.sink(self._batch)
+            self.saved_ptr_number += len(self._batch)
+        self._batch = {}
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import time
+
+from state_file import StateFile
+
+
+class SnmpCache(StateFile):
+    """
+
+    Keeps IF-MIB::ifName and HSRP VIP tables of each device between runs.
+    Cached tables are valid as long as the device wasn't restarted and no interface was created or deleted
+    (IF-MIB::ifTableLastChange is the same). Device was restarted if SNMPv2-MIB::sysUpTime is lower than
+    the cached value plus time passed since tables were cached.
+
+    """
+
+    # Seconds sysUpTime may fall behind the expected value (clock difference, time to walk the tables)
+    UPTIME_TOLERANCE = 60
+
+    def __init__(self, config, filename=None):
+        """
+        :param config:      Config instance
+        :param filename:    Cache file. snmp_cache.json in state directory if not set
+        """
+        StateFile.__init__(self, filename if filename else config.get_state_dir() + '/snmp_cache.json')
+        self.logger = logging.getLogger('dns_update.snmp_cache')
+        self.max_age = config.get_snmp_cache_max_age()
+        self.hits = 0
+        self.misses = 0
+
+    def get_tables(self, hostname, sys_uptime, if_table_last_change):
+        """
+        Returns cached tables if they are still valid for the device
+        :param hostname:                Device hostname
+        :param sys_uptime:              Current SNMPv2-MIB::sysUpTime value
+        :param if_table_last_change:    Current IF-MIB::ifTableLastChange value
+        :return: tuple (if_names, hsrp_addresses) or None
+        """
+        with self.lock:
+            entry = self.get(hostname)
+            if not entry:
+                self.misses += 1
+                self.logger.debug("No cache entry for '%s'" % hostname)
+                return None
+            # sysUpTime is in hundredths of a second
+            expected_uptime = entry['sys_uptime'] + (time.time() - entry['time']) * 100
+            if sys_uptime < entry['sys_uptime'] or sys_uptime < expected_uptime - SnmpCache.UPTIME_TOLERANCE * 100:
+                self.misses += 1
+                self.logger.info("'%s' restarted since last run, cache invalidated" % hostname)
+                return None
+            if if_table_last_change != entry['if_table_last_change']:
+                self.misses += 1
+                self.logger.info("Interface table on '%s' changed since last run, cache invalidated" % hostname)
+                return None
+            if time.time() - entry['time'] > self.max_age * 3600:
+                self.misses += 1
+                self.logger.info("Cache entry for '%s' older than %d hours" % (hostname, self.max_age))
+                return None
+            self.hits += 1
+            # JSON object keys are strings. Convert them back to ifIndex integers
+            if_names = dict((int(k), v) for k, v in entry['if_names'].iteritems())
+            hsrp_addresses = dict((int(k), list(v)) for k, v in entry['hsrp_addresses'].iteritems())
+            self.logger.debug("Cache hit for '%s'" % hostname)
+            return if_names, hsrp_addresses
+
+    def set_tables(self, hostname, sys_uptime, if_table_last_change, if_names, hsrp_addresses):
+        """
+        Store tables fetched from the device
+        :param hostname:                Device hostname
+        :param sys_uptime:              SNMPv2-MIB::sysUpTime at the time tables were fetched
+        :param if_table_last_change:    IF-MIB::ifTableLastChange at the time tables were fetched
+        :param if_names:                dict {ifIndex: ifName}
+        :param hsrp_addresses:          dict {ifIndex: [VIP addresses]}
+        :return:
+        """
+        self.set(hostname, {
+            'time': time.time(),
+            'sys_uptime': sys_uptime,
+            'if_table_last_change': if_table_last_change,
+            'if_names': dict((str(k), v) for k, v in if_names.iteritems()),
+            'hsrp_addresses': dict((str(k), list(v)) for k, v in hsrp_addresses.iteritems())
+        })
+
+    def save(self):
+        self.logger.info("SNMP cache hits: %d, misses: %d" % (self.hits, self.misses))
+        StateFile.save(self)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import math
+
+from state_file import StateFile
+
+
+class SnmpLatency(StateFile):
+    """
+
+    Records SNMP response times of each device across runs and derives per device timeout and retries.
+    Timeout is 99th percentile of recorded response times multiplied by a factor and limited
+    by configured minimum and maximum. Devices that lose some of the requests (timeouts) get more retries.
+
+    """
+
+    # Number of most recent requests kept per device
+    WINDOW = 50
+
+    def __init__(self, config, filename=None):
+        """
+        :param config:      Config instance
+        :param filename:    State file. snmp_latency.json in state directory if not set
+        """
+        StateFile.__init__(self, filename if filename else config.get_state_dir() + '/snmp_latency.json')
+        self.logger = logging.getLogger('dns_update.snmp_latency')
+        self.timeout = config.get_snmp_timeout()
+        self.retries = config.get_snmp_retries()
+        self.factor = config.get_snmp_timeout_factor()
+        self.min_timeout = config.get_snmp_min_timeout()
+        self.max_timeout = config.get_snmp_max_timeout()
+        self.max_retries = config.get_snmp_max_retries()
+
+    def _add_sample(self, hostname, sample):
+        with self.lock:
+            samples = self.get(hostname, [])
+            samples.append(sample)
+            self.set(hostname, samples[-SnmpLatency.WINDOW:])
+
+    def record(self, hostname, seconds):
+        """
+        Record response time of a request
+        :param hostname:    Device hostname
+        :param seconds:     Time from sending request to receiving response
+        :return:
+        """
+        self.logger.debug("'%s' responded in %.3fs" % (hostname, seconds))
+        self._add_sample(hostname, round(seconds, 6))
+
+    def record_loss(self, hostname):
+        """
+        Record request that timed out
+        :param hostname:    Device hostname
+        :return:
+        """
+        self.logger.debug("Request to '%s' timed out" % hostname)
+        self._add_sample(hostname, None)
+
+    def get_timeout(self, hostname):
+        """
+        Returns timeout for device. Configured timeout is returned for devices without recorded responses
+        :param hostname:    Device hostname
+        :return: Timeout in seconds
+        """
+        samples = sorted(x for x in self.get(hostname, []) if x is not None)
+        if not samples:
+            return self.timeout
+        p99 = samples[int(math.ceil(0.99 * len(samples))) - 1]
+        timeout = min(max(p99 * self.factor, self.min_timeout), self.max_timeout)
+        self.logger.debug("'%s' p99 response time: %.3fs, timeout: %.3fs" % (hostname, p99, timeout))
+        return timeout
+
+    def get_retries(self, hostname):
+        """
+        Returns number of retries for device. Retries are added in proportion to the share of lost requests
+        in recorded window, up to max_retries. Devices that didn't respond to any recorded request
+        get configured retries, so time is not wasted on dead devices
+        :param hostname:    Device hostname
+        :return:
+        """
+        samples = self.get(hostname, [])
+        losses = len([x for x in samples if x is None])
+        if not losses or losses == len(samples):
+            return self.retries
+        extra = int(math.ceil(float(losses) / len(samples) * (self.max_retries - self.retries)))
+        return self.retries + max(0, extra)
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import bisect
+import json
+import logging
+import math
+import os
+import random
+import time
+import easysnmp
+
+
+class SnmpVariable:
+    """
+    Single SNMP variable in the same format as easysnmp.SNMPVariable with numeric OIDs:
+    .1.3.6.1.2.1.4.20.1.2.10.170.0.129 = INTEGER: 8
+    oid = '.1.3.6.1.2.1.4.20.1.2.10.170.0', oid_index = '129', value = '8'
+    """
+
+    def __init__(self, oid, value, snmp_type=None):
+        self.oid, self.oid_index = MemorySession.normalize_oid(oid).rsplit('.', 1)
+        self.value = value
+        self.snmp_type = snmp_type
+
+    def __repr__(self):
+        return "%s.%s = %s" % (self.oid, self.oid_index, self.value)
+
+
+class MemorySession:
+    """
+    Serves SNMP get and walk requests from variables that were fetched beforehand.
+    Provides the subset of easysnmp.Session interface used by Device and raises easysnmp exceptions
+    so the device discovery code doesn't need to know where the data came from.
+    """
+
+    def __init__(self, hostname, error=None):
+        """
+        :param hostname:    Device hostname
+        :param error:       Error message. If set every request raises EasySNMPError
+        """
+        self.logger = logging.getLogger('dns_update.snmp_session:%s' % hostname)
+        self.hostname = hostname
+        self.error = error
+        # Sorted list of OIDs (tuples of ints) and dict of variables keyed by the same tuples
+        self._oids = []
+        self._variables = {}
+
+    @staticmethod
+    def normalize_oid(oid):
+        """
+        Returns numeric OID with leading dot
+        :param oid: OID with or without leading dot
+        :return:
+        """
+        return '.' + str(oid).strip('.')
+
+    @staticmethod
+    def _oid_key(oid):
+        return tuple(int(x) for x in str(oid).strip('.').split('.'))
+
+    def add(self, oid, value, snmp_type=None):
+        """
+        Store variable in session
+        :param oid:         Numeric OID
+        :param value:       Variable value as string
+        :param snmp_type:   easysnmp type name (INTEGER, IPADDR, OCTETSTR...)
+        :return:
+        """
+        key = self._oid_key(oid)
+        if key not in self._variables:
+            bisect.insort(self._oids, key)
+        self._variables[key] = SnmpVariable(oid, value, snmp_type)
+
+    def set_error(self, error):
+        self.error = error
+
+    def _check_error(self):
+        if self.error:
+            raise easysnmp.EasySNMPError(self.error)
+
+    def get(self, oids):
+        """
+        Get variable(s). Raises EasySNMPNoSuchInstanceError for missing instances
+        :param oids: OID or list of OIDs
+        :return: SnmpVariable or list of SnmpVariables
+        """
+        self._check_error()
+        if isinstance(oids, (list, tuple)):
+            return [MemorySession.get(self, oid) for oid in oids]
+        key = self._oid_key(oids)
+        if key not in self._variables:
+            raise easysnmp.EasySNMPNoSuchInstanceError("No Such Instance currently exists at this OID")
+        return self._variables[key]
+
+    def walk(self, oids='.1.3.6.1.2.1'):
+        """
+        Returns all variables within given subtree(s)
+        :param oids: OID or list of OIDs
+        :return: list of SnmpVariables
+        """
+        self._check_error()
+        if isinstance(oids, (list, tuple)):
+            variables = []
+            for oid in oids:
+                variables.extend(MemorySession.walk(self, oid))
+            return variables
+        root = self._oid_key(oids)
+        variables = []
+        for key in self._oids[bisect.bisect_left(self._oids, root):]:
+            if key[:len(root)] != root:
+                break
+            variables.append(self._variables[key])
+        self.logger.debug("Walk of '%s' returned %d variable(s)" % (oids, len(variables)))
+        return variables
+
+    def bulkwalk(self, oids='.1.3.6.1.2.1', non_repeaters=0, max_repetitions=10):
+        """
+        Same as walk. Data is already fetched so there are no requests to bulk
+        :return: list of SnmpVariables
+        """
+        return self.walk(oids)
+
+    def save(self, filename):
+        """
+        Save variables to JSON fixture file
+        :param filename: Path to file
+        :return:
+        """
+        data = {
+            'hostname': self.hostname,
+            'error': self.error,
+            'variables': [
+                ['%s.%s' % (x.oid, x.oid_index), x.value, x.snmp_type]
+                for x in [self._variables[key] for key in self._oids]
+            ]
+        }
+        with open(filename, 'w') as data_file:
+            # OCTET STRING values are not necessarily UTF-8. Latin-1 maps every byte to a character
+            json.dump(data, data_file, encoding='latin-1', indent=1)
+        self.logger.info("Saved %d variable(s) to '%s'" % (len(self._oids), filename))
+
+    def load(self, filename):
+        """
+        Add variables from JSON fixture file made by save
+        :param filename: Path to file
+        :return:
+        """
+        with open(filename) as data_file:
+            data = json.load(data_file)
+        if data.get('error'):
+            self.set_error(data['error'])
+        for oid, value, snmp_type in data['variables']:
+            self.add(oid, value.encode('latin-1'), snmp_type)
+        self.logger.info("Loaded %d variable(s) from '%s'" % (len(self._oids), filename))
+
+
+class RecordingSession:
+    """
+    Wraps easysnmp session and records every response so the device can be replayed offline.
+    """
+
+    def __init__(self, session, hostname):
+        """
+        :param session:     easysnmp.Session
+        :param hostname:    Device hostname
+        """
+        self.session = session
+        self.hostname = hostname
+        self.memory = MemorySession(hostname)
+
+    def _record(self, variables):
+        for variable in variables if isinstance(variables, list) else [variables]:
+            oid = '.'.join(filter(None, [variable.oid, variable.oid_index]))
+            self.memory.add(oid, variable.value, variable.snmp_type)
+        return variables
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return self._record(getattr(self.session, method)(*args, **kwargs))
+        except (easysnmp.EasySNMPNoSuchObjectError, easysnmp.EasySNMPNoSuchInstanceError):
+            # Missing values are just not recorded. Replay raises or returns nothing the same way
+            raise
+        except easysnmp.EasySNMPError as e:
+            self.memory.set_error(str(e))
+            raise
+
+    def get(self, oids):
+        return self._call('get', oids)
+
+    def walk(self, oids='.1.3.6.1.2.1'):
+        return self._call('walk', oids)
+
+    def bulkwalk(self, oids='.1.3.6.1.2.1', non_repeaters=0, max_repetitions=10):
+        return self._call('bulkwalk', oids, non_repeaters=non_repeaters, max_repetitions=max_repetitions)
+
+    def save(self, filename):
+        """
+        Save recorded responses to JSON fixture file
+        :param filename: Path to file
+        :return:
+        """
+        self.memory.save(filename)
+
+
+class ReplaySession(MemorySession):
+    """
+    Serves recorded responses like a device would, with simulated network latency and packet loss.
+    Each request takes latency (+/-50%) seconds. Lost request costs the full timeout and is retried.
+    Walks take as many requests as they would on the device: one per row for GETNEXT,
+    one per max_repetitions rows for GETBULK.
+    """
+
+    def __init__(self, hostname, latency=0, loss=0, timeout=1, retries=0):
+        """
+        :param hostname:    Device hostname
+        :param latency:     Average response time in seconds
+        :param loss:        Probability of a request being lost (0..1)
+        :param timeout:     Time to wait for a lost request in seconds
+        :param retries:     Number of retries for lost requests
+        """
+        MemorySession.__init__(self, hostname)
+        self.latency = latency
+        self.loss = loss
+        self.timeout = timeout
+        self.retries = retries
+        self.requests = 0
+
+    @classmethod
+    def from_fixture(cls, filename, hostname, **kwargs):
+        """
+        Create session from fixture file. Every request fails if the file doesn't exist
+        :param filename:    Path to fixture file
+        :param hostname:    Device hostname
+        :param kwargs:      ReplaySession parameters
+        :return: ReplaySession
+        """
+        session = cls(hostname, **kwargs)
+        if os.path.exists(filename):
+            session.load(filename)
+        else:
+            session.set_error("No fixture for '%s'" % hostname)
+        return session
+
+    def _request(self, count=1):
+        """
+        Simulate round trips to the device
+        :param count: Number of requests
+        :return:
+        """
+        for _ in range(count):
+            self.requests += 1
+            for attempt in range(self.retries + 1):
+                if self.loss and random.random() < self.loss:
+                    time.sleep(self.timeout)
+                    continue
+                if self.latency:
+                    time.sleep(self.latency * random.uniform(0.5, 1.5))
+                break
+            else:
+                raise easysnmp.EasySNMPTimeoutError("Timed out while connecting to remote host")
+
+    def get(self, oids):
+        self._check_error()
+        self._request()
+        return MemorySession.get(self, oids)
+
+    def walk(self, oids='.1.3.6.1.2.1'):
+        variables = []
+        for oid in oids if isinstance(oids, (list, tuple)) else [oids]:
+            subtree = MemorySession.walk(self, oid)
+            # Last request returns the first variable outside of the subtree
+            self._request(len(subtree) + 1)
+            variables.extend(subtree)
+        return variables
+
+    def bulkwalk(self, oids='.1.3.6.1.2.1', non_repeaters=0, max_repetitions=10):
+        variables = []
+        for oid in oids if isinstance(oids, (list, tuple)) else [oids]:
+            subtree = MemorySession.walk(self, oid)
+            self._request(int(math.ceil((len(subtree) + 1) / float(max(max_repetitions, 1)))))
+            variables.extend(subtree)
+        return variables
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import json
+import logging
+import os
+import threading
+
+
+class StateFile:
+    """
+
+    JSON file used to keep per device state between runs.
+    Entries are keyed by device hostname. Access is synchronized
+    so the same instance can be shared by poller worker threads.
+
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: Absolute path to JSON file. Created on first save
+        """
+        self.logger = logging.getLogger('dns_update.state_file')
+        self.filename = filename
+        self.lock = threading.RLock()
+        self.data = {}
+        self.load()
+
+    def load(self):
+        """
+        Load state from file. Missing or broken file results in empty state
+        :return:
+        """
+        with self.lock:
+            try:
+                with open(self.filename) as data_file:
+                    self.data = json.load(data_file)
+                self.logger.info("Loaded %d entries from '%s'" % (len(self.data), self.filename))
+            except IOError:
+                self.logger.info("State file '%s' doesn't exist" % self.filename)
+                self.data = {}
+            except ValueError:
+                self.logger.warning("Couldn't parse state file '%s'. Starting with empty state" % self.filename)
+                self.data = {}
+
+    def save(self):
+        """
+        Write state to file. File is replaced atomically so an interrupted run doesn't leave it broken.
+        Missing directory is created. Failure is logged, state of this run is lost
+        :return:
+        """
+        with self.lock:
+            tmp_filename = self.filename + '.tmp'
+            try:
+                directory = os.path.dirname(self.filename)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                with open(tmp_filename, 'w') as data_file:
+                    json.dump(self.data, data_file)
+                os.rename(tmp_filename, self.filename)
+                self.logger.info("Saved %d entries to '%s'" % (len(self.data), self.filename))
+            except (IOError, OSError) as e:
+                self.logger.error("Couldn't save state file '%s': %s" % (self.filename, e))
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.data.get(key, default)
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+
+from state_file import StateFile
+
+
+class ZoneMirror(StateFile):
+    """
+
+    Local copy of transferred PTR zones kept between runs.
+    Entries are keyed by zone name and hold SOA serial and PTRs of the zone,
+    so the next run only needs changes since that serial (IXFR).
+
+    """
+
+    def __init__(self, config, filename=None):
+        """
+        :param config:      Config instance
+        :param filename:    Mirror file. zone_mirror.json in state directory if not set
+        """
+        StateFile.__init__(self, filename if filename else config.get_state_dir() + '/zone_mirror.json')
+        self.logger = logging.getLogger('dns_update.zone_mirror')
+
+    def get_zone(self, zone):
+        """
+        Returns mirrored zone
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :return: tuple (serial, ptrs) or None if zone isn't mirrored
+        """
+        entry = self.get(zone)
+        if not entry:
+            return None
+        return entry['serial'], entry['ptrs']
+
+    def set_zone(self, zone, serial, ptrs):
+        """
+        Store zone
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :param serial:  SOA serial of the zone
+        :param ptrs:    dict {ip_address: ptr}
+        :return:
+        """
+        self.set(zone, {
+            'serial': serial,
+            'ptrs': ptrs
+        })
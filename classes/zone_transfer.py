@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import threading
+import dns.exception
+import dns.query
+import dns.rdatatype
+import dns.reversename
+import dns.tsigkeyring
+from dns.tsig import HMAC_MD5
+
+
+class ZoneTransfer:
+    """
+
+    Transfers PTR zones (AXFR) from the master server so PTRs of all IP addresses
+    in a zone are known after a single request. Each zone is transferred once.
+    Zones that couldn't be transferred are remembered so they're not requested again.
+    If zone mirror is used, zones mirrored in previous runs are brought up to date
+    with incremental transfer (IXFR) of changes since the mirrored serial.
+
+    """
+
+    KEY_NAME = 'nsupdate_key'
+
+    def __init__(self, hostname, key=None, timeout=10, mirror=None):
+        """
+        :param hostname:    Master DNS server
+        :param key:         TSIG key (HMAC-MD5) allowed to transfer zones
+        :param timeout:     Transfer timeout in seconds
+        :param mirror:      ZoneMirror instance. Zones are transferred in full on every run if not set
+        """
+        self.logger = logging.getLogger('dns_update.zone_transfer')
+        self.hostname = hostname
+        self.keyring = dns.tsigkeyring.from_text({ZoneTransfer.KEY_NAME: key}) if key else None
+        self.timeout = timeout
+        self.mirror = mirror
+        # PTRs of each zone: {zone: {ip_address: ptr}}. None if zone couldn't be transferred
+        self.zones = {}
+        self.lock = threading.Lock()
+        self.zone_locks = {}
+        self.transfers = 0
+        self.incremental_transfers = 0
+
+    def get_ptrs(self, zone):
+        """
+        Returns PTRs from the zone. Zone is transferred on first call.
+        Concurrent calls for the same zone wait for a single transfer.
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :return: dict {ip_address: ptr} or None if zone couldn't be transferred
+        """
+        with self.lock:
+            zone_lock = self.zone_locks.setdefault(zone, threading.Lock())
+        with zone_lock:
+            if zone not in self.zones:
+                self.zones[zone] = self._transfer(zone)
+            return self.zones[zone]
+
+    def _transfer(self, zone):
+        """
+        Transfer zone from the master server. Mirrored zone is updated with IXFR, other zones with AXFR
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :return: dict {ip_address: ptr} or None on failure
+        """
+        mirrored = self.mirror.get_zone(zone) if self.mirror else None
+        try:
+            if mirrored:
+                try:
+                    serial, ptrs = self._ixfr(zone, *mirrored)
+                except dns.exception.DNSException as e:
+                    # Unexpected answer (serial reset on server...). Transfer whole zone
+                    self.logger.info("Incremental transfer of zone '%s' failed: %s" % (zone, e))
+                    serial, ptrs = self._axfr(zone)
+            else:
+                serial, ptrs = self._axfr(zone)
+        except (dns.exception.DNSException, EOFError, IOError, ValueError, IndexError) as e:
+            self.logger.warning("Couldn't transfer zone '%s' from %s: %s" % (zone, self.hostname, e))
+            return None
+        if self.mirror:
+            self.mirror.set_zone(zone, serial, ptrs)
+        return ptrs
+
+    def _axfr(self, zone):
+        """
+        Full zone transfer
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :return: tuple (serial, ptrs)
+        """
+        self.logger.debug("Transferring zone '%s' from %s" % (zone, self.hostname))
+        rrsets = self._request(zone, dns.rdatatype.AXFR)
+        self.transfers += 1
+        ptrs = self._get_ptrs(rrsets)
+        self.logger.info("Transferred zone '%s' with %d PTRs" % (zone, len(ptrs)))
+        return rrsets[0][0].serial, ptrs
+
+    def _ixfr(self, zone, serial, ptrs):
+        """
+        Apply changes since mirrored serial to mirrored PTRs.
+        Server may reply with the whole zone if it doesn't have changes since that serial
+        :param zone:    PTR zone in x.y.z.in-addr.arpa. format
+        :param serial:  Mirrored SOA serial
+        :param ptrs:    Mirrored PTRs
+        :return: tuple (serial, ptrs)
+        """
+        self.logger.debug("Transferring changes of zone '%s' since serial %d from %s" % (zone, serial, self.hostname))
+        rrsets = self._request(zone, dns.rdatatype.IXFR, serial)
+        current_serial = rrsets[0][0].serial
+        if len(rrsets) == 1:
+            if current_serial != serial:
+                # Serial went back (zone recreated...). Mirror can't be trusted
+                self.logger.info("Serial of zone '%s' changed from %d to %d" % (zone, serial, current_serial))
+                return self._axfr(zone)
+            self.logger.debug("Zone '%s' didn't change since serial %d" % (zone, serial))
+            return serial, ptrs
+        if rrsets[1].rdtype != dns.rdatatype.SOA or rrsets[1][0].serial != serial:
+            self.transfers += 1
+            self.logger.info("Whole zone '%s' received instead of changes" % zone)
+            return current_serial, self._get_ptrs(rrsets)
+
+        # Each change is the old SOA followed by deleted records, then the new SOA followed by added records
+        self.incremental_transfers += 1
+        ptrs = dict(ptrs)
+        deleting = False
+        changes = 0
+        for rrset in rrsets[1:-1]:
+            if rrset.rdtype == dns.rdatatype.SOA:
+                deleting = not deleting
+                continue
+            if rrset.rdtype != dns.rdatatype.PTR:
+                continue
+            ip_address = ZoneTransfer._get_address(rrset.name)
+            if not ip_address:
+                continue
+            for rdata in rrset:
+                if not deleting:
+                    ptrs[ip_address] = rdata.to_text()
+                elif ptrs.get(ip_address) == rdata.to_text():
+                    del ptrs[ip_address]
+                changes += 1
+        self.logger.info("Applied %d change(s) to zone '%s' (serial %d -> %d)" % (
+            changes, zone, serial, current_serial
+        ))
+        return current_serial, ptrs
+
+    def _request(self, zone, rdtype, serial=0):
+        """
+        Send transfer request
+        :return: List of all RRsets received. First and last are zone SOA
+        """
+        xfr = dns.query.xfr(
+            self.hostname, zone, rdtype=rdtype, serial=serial, keyring=self.keyring,
+            keyname=ZoneTransfer.KEY_NAME, keyalgorithm=HMAC_MD5, timeout=self.timeout, relativize=False
+        )
+        return [rrset for message in xfr for rrset in message.answer]
+
+    @staticmethod
+    def _get_ptrs(rrsets):
+        """
+        Returns PTRs from full zone transfer
+        :return: dict {ip_address: ptr}
+        """
+        ptrs = {}
+        for rrset in rrsets:
+            if rrset.rdtype != dns.rdatatype.PTR:
+                continue
+            ip_address = ZoneTransfer._get_address(rrset.name)
+            if ip_address:
+                for rdata in rrset:
+                    ptrs[ip_address] = rdata.to_text()
+        return ptrs
+
+    @staticmethod
+    def _get_address(name):
+        """
+        Returns IP address for PTR record name. None if name isn't an IP address
+        """
+        try:
+            return dns.reversename.to_address(name)
+        except (dns.exception.SyntaxError, ValueError):
+            return None
@@ -67,14 +67,20 @@ dispatcher = Dispatcher(config)
 
 print "Loaded connectors: %s" % ', '.join(dispatcher.get_connector_list())
 
-dns = DnsCheck(config=config)
 output = TabularUtf8Output()
 
-fqdn = dns.get_fqdn(hostname)
+# Dispatcher's DnsCheck is used so device name is resolved only once
+fqdn = dispatcher.dns.get_fqdn(hostname)
 if fqdn:
-    d = Device(hostname=fqdn, config=config)
-    if d.get_interfaces():
+    d = Device(hostname=fqdn, config=config, dns=dispatcher.dns, snmp_cache=dispatcher.snmp_cache,
+               snmp_latency=dispatcher.snmp_latency)
+    success = d.get_interfaces()
+    if success:
         d.check_ptrs()
+    dispatcher.dns.log_stats()
+    # Checks are done. Worker threads are started again if needed
+    dispatcher.dns.close()
+    if success:
         print output.display_device_detailed(d)
 
         # Filter all PTRs that don't have status equal to STATUS_NOT_UPDATED or STATUS_NOT_CREATED
@@ -83,8 +89,10 @@ if fqdn:
             if v.status in
                (DnsCheck.STATUS_NOT_UPDATED, DnsCheck.STATUS_NOT_CREATED)
         }
-        #print ptrs_for_update
-        dispatcher.save_ptrs(ptrs_for_update)
+        # Connectors select PTRs they need (DNS only changed ones, database all of them)
+        dispatcher.save_ptrs(d.get_ptrs())
+        # State is saved after PTRs so a state file problem can't keep them from being saved
+        dispatcher.save_state()
 
         email = EmailReport(
             config=config,
@@ -98,6 +106,7 @@ if fqdn:
         )
         email.generate_report(ptrs=ptrs_for_update)
     else:
+        dispatcher.save_state()
         email = EmailReport(
             config=config,
             device=fqdn,
@@ -27,6 +27,9 @@ from classes import Config
 from classes import Device
 from classes import EmailReport
 from classes import Dispatcher
+from classes import DevicePoller
+from classes import PtrPipeline
+from classes import PollResult
 from classes.output.tabular_utf8 import TabularUtf8Output
 
 __version__ = '0.4.4'
@@ -42,6 +45,22 @@ logging.basicConfig(
     level=logging.INFO
 )
 
+
+def shard_type(value):
+    """
+    Parse N/M shard argument
+    :param value: Argument value
+    :return: tuple (shard, shard_count)
+    """
+    try:
+        shard, shard_count = [int(x) for x in value.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("shard must be in N/M format")
+    if shard_count < 1 or not 1 <= shard <= shard_count:
+        raise argparse.ArgumentTypeError("shard number must be between 1 and M")
+    return shard, shard_count
+
+
 parser = argparse.ArgumentParser()
 parser.add_argument("-c", "--check", help="check PTRs but don't update them",
                     action="store_true")
@@ -49,6 +68,17 @@ parser.add_argument("-f", "--full", help="show full output not just differences"
                     action="store_true")
 parser.add_argument("-t", "--terse", help="terse output - don't display domains",
                     action="store_true")
+parser.add_argument("-w", "--workers", type=int, help="number of devices polled in parallel")
+parser.add_argument("-p", "--pipeline", action="store_true",
+                    help="check and save PTRs while devices are still being polled")
+parser.add_argument("-o", "--output", help="file shard results are saved to")
+parser.add_argument("-d", "--delete-stale", action="store_true",
+                    help="delete PTRs of IP addresses that weren't seen on any device for a long time")
+shard_group = parser.add_mutually_exclusive_group()
+shard_group.add_argument("-s", "--shard", type=shard_type, metavar="N/M",
+                         help="poll only shard N of M and save results to a file instead of updating PTRs")
+shard_group.add_argument("-m", "--merge", nargs='+', metavar="FILE",
+                         help="merge results of all shards, update PTRs and send report")
 
 args = parser.parse_args()
 
@@ -56,12 +86,6 @@ check_only = args.check
 diff_only = not args.full
 terse = args.terse
 
-ptrs = {}
-failed_devices = []
-
-interface_number = 0
-ip_address_number = 0
-
 config = Config(check_only=check_only,
                 diff_only=diff_only,
                 terse=terse)
@@ -70,49 +94,86 @@ dispatcher = Dispatcher(config)
 output = TabularUtf8Output()
 
 print "Loaded connectors: %s" % ', '.join(dispatcher.get_connector_list())
-dispatcher.load()
-total_devices = len(dispatcher.devices)
-print "Loaded %d device(s) from %d connector(s)" % (total_devices, len(dispatcher.get_connector_list()))
-print "Fetching data from devices:"
-# Number of devices we've finished so far
-iterator = 0
-for device in dispatcher.devices.keys():
-    # Create Device instance from hostname
-    # dispatcher.devices[device] = Device(device, config, dispatcher.dns)
-    # Fetch interfaces
-    if dispatcher.devices[device].get_interfaces():
-        # Check PTRs
-        dispatcher.devices[device].check_ptrs()
-        # print output.display_device_detailed(dispatcher.devices[device])
-        # print output.display_device_summary(dispatcher.devices[device])
-    else:
-        failed_devices.append(device)
 
-    interface_number += dispatcher.devices[device].get_number_of_interfaces()
-    ip_address_number += dispatcher.devices[device].get_number_of_ip_addresses()
 
-    iterator += 1
+def print_progress(completed, total):
     # Print progress bar.
     # It will not go to a new line after finishing. Has to be done manually
-    percent_complete = int(iterator * 100 / total_devices)
-    output.print_progress_bar(percent_complete)
-    ptrs.update(dispatcher.devices[device].get_ptrs())
-
-# New line to fix the progress bar \r magic.
-print
-
-print output.display_summary(dispatcher)
+    output.print_progress_bar(int(completed * 100 / total))
+
+
+if args.merge:
+    # Results were fetched by sharded runs. Just merge them
+    try:
+        result = PollResult.merge([PollResult.load(filename) for filename in args.merge])
+    except (IOError, ValueError, KeyError) as e:
+        print "Couldn't merge shard results: %s" % e
+        sys.exit(1)
+    print "Merged %d PTRs from %d shard(s) (%d devices)" % (len(result.ptrs), len(args.merge), result.device_number)
+    # Shards were polled in parallel. Report the slowest one plus time it took to merge
+    shard_time = result.delta_time
+else:
+    shard, shard_count = args.shard if args.shard else (None, None)
+    dispatcher.load(shard, shard_count)
+    total_devices = len(dispatcher.devices)
+    print "Loaded %d device(s) from %d connector(s)" % (total_devices, len(dispatcher.get_connector_list()))
+    print "Fetching data from devices:"
+
+    if args.pipeline:
+        # Sharded runs save results to file. PTRs are saved by merge
+        sink = dispatcher.save_ptrs if not check_only and not shard else None
+        poller = PtrPipeline(dispatcher, sink=sink, workers=args.workers)
+    else:
+        poller = DevicePoller(dispatcher, workers=args.workers)
+    poller.poll(callback=print_progress)
+    dispatcher.dns.log_stats()
+    # Checks are done. Worker threads are started again if needed
+    dispatcher.dns.close()
+    shard_time = 0
+    result = PollResult.from_poller(poller, time.time() - start_time, shard, shard_count)
+
+    # New line to fix the progress bar \r magic.
+    print
+
+    print output.display_summary(dispatcher, poller.breaker_skipped)
+
+    if shard:
+        # PTRs are saved once all shards are merged
+        filename = args.output if args.output else (
+            config.get_state_dir() + '/ptr-update-shard-%d-of-%d.json' % (shard, shard_count)
+        )
+        result.save(filename)
+        print "Saved results of shard %d/%d to %s" % (shard, shard_count, filename)
+        dispatcher.save_state()
+        sys.exit(0)
+
+ptrs = result.ptrs
 if not check_only:
-    print "Saving %d PTRs..." % len(ptrs),
-    dispatcher.save_ptrs(ptrs)
-    print " done."
+    if args.pipeline and not args.merge:
+        print "Saved %d PTRs while polling." % poller.saved_ptr_number
+    else:
+        print "Saving %d PTRs..." % len(ptrs),
+        dispatcher.save_ptrs(ptrs)
+        print " done."
+    if args.delete_stale:
+        # PTRs of devices that weren't polled are not stale
+        deleted = dispatcher.delete_stale_ptrs(result.failed_devices + result.breaker_skipped)
+        print "Deleted %d stale PTRs." % len(deleted)
     email = EmailReport(
         config=config,
-        interface_number=interface_number,
-        ip_number=ip_address_number,
-        delta_time=time.time() - start_time,
+        interface_number=result.interface_number,
+        ip_number=result.ip_address_number,
+        delta_time=shard_time + time.time() - start_time,
         connector_number=len(dispatcher.get_connector_list()),
         app_name=os.path.basename(__file__),
         app_version=__version__
     )
-    email.generate_report(ptrs=ptrs, devices_skipped=failed_devices)
+    email.generate_report(
+        ptrs=ptrs,
+        devices_skipped=result.failed_devices,
+        devices_breaker_open=result.breaker_skipped
+    )
+
+if not args.merge:
+    # State is saved last so a state file problem can't keep PTRs from being saved
+    dispatcher.save_state()
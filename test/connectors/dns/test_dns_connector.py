@@ -17,7 +17,11 @@
 
 
 import logging
+import os
+import shutil
+import socket
 import unittest
+import dns.query
 import dns.update
 from dns.tsig import HMAC_MD5
 
@@ -26,6 +30,7 @@ from classes import Dispatcher
 from classes import DnsCheck
 from classes import Ptr
 from classes.connectors.dns.dns_connector import DnsConnector
+from classes.connectors.dns.rate_governor import RateGovernor
 
 
 class TestDnsConnector(unittest.TestCase):
@@ -39,6 +44,11 @@ class TestDnsConnector(unittest.TestCase):
         self.dispatcher = Dispatcher(Config(filename='test/configuration_examples/configuration.json'))
         self.connector = DnsConnector(self.dispatcher)
         self.dns = DnsCheck(config=Config('test/configuration_examples/configuration.json'))
+        self.connector.outbox.filename = 'test/dns_outbox.sql'
+
+    def tearDown(self):
+        if os.path.exists('test/dns_outbox.sql'):
+            os.remove('test/dns_outbox.sql')
 
     def test_create(self):
         ptr_dict = {
@@ -103,4 +113,188 @@ class TestDnsConnector(unittest.TestCase):
         self.connector.delete_ptrs(['192.0.2.201','192.0.2.202','192.0.2.203'])
         self.assertNotEquals('host201-et2-0-1.domain.example.', self.dns.get_ptr('192.0.2.201'))
         self.assertNotEquals('host202-et2-0-2.domain.example.', self.dns.get_ptr('192.0.2.202'))
-        self.assertNotEquals('host203-et2-0-3.domain.example.', self.dns.get_ptr('192.0.2.203'))
\ No newline at end of file
+        self.assertNotEquals('host203-et2-0-3.domain.example.', self.dns.get_ptr('192.0.2.203'))
+
+    def test_save_ptrs_batched(self):
+        self.connector.max_records = 2
+        ptrs = {}
+        for x in range(211, 216):
+            ptr = Ptr(u'192.0.2.%d' % x, 'host%d-eth0.domain.example.' % x, 'host%d.domain.example' % x, 'eth0')
+            ptrs[str(ptr.ip_address)] = ptr
+        self.connector.save_ptrs(ptrs)
+        # 5 PTRs from the same zone in 3 messages of up to 2 records, all over a single connection
+        self.assertEquals(3, self.connector.channel.messages)
+        self.assertEquals(1, self.connector.channel.connections)
+        for x in range(211, 216):
+            self.assertEquals('host%d-eth0.domain.example.' % x, self.dns.get_ptr('192.0.2.%d' % x))
+        self.connector.delete_ptrs(ptrs.keys())
+        self.assertEquals(6, self.connector.channel.messages)
+        self.assertEquals(1, self.connector.channel.connections)
+        for x in range(211, 216):
+            self.assertFalse(self.dns.get_ptr('192.0.2.%d' % x))
+
+    def test_invalid_config(self):
+        config = self.dispatcher.get_connector_config(self.connector)
+        config.update({'max_records': 0, 'ttl': -1})
+        connector = DnsConnector(self.dispatcher)
+        self.assertEquals(100, connector.max_records)
+        self.assertEquals(300, connector.ttl)
+        config.update({'max_records': '20', 'ttl': 'x'})
+        connector = DnsConnector(self.dispatcher)
+        self.assertEquals(20, connector.max_records)
+        self.assertEquals(300, connector.ttl)
+
+    def test_invalid_channel_config(self):
+        config = self.dispatcher.get_connector_config(self.connector)
+        config.update({'timeout': 'x', 'max_in_flight': None})
+        connector = DnsConnector(self.dispatcher)
+        self.assertEquals(10, connector.channel.timeout)
+        self.assertEquals(10, connector.channel.max_in_flight)
+        config.update({'timeout': 0.5, 'max_in_flight': -5})
+        connector = DnsConnector(self.dispatcher)
+        self.assertEquals(0.5, connector.channel.timeout)
+        self.assertEquals(10, connector.channel.max_in_flight)
+
+    def test_invalid_rate_config(self):
+        config = self.dispatcher.get_connector_config(self.connector)
+        config['rate'] = {'updates_per_second': -10, 'zone_updates_per_second': 'x'}
+        self.assertIsNone(DnsConnector(self.dispatcher).governor)
+        config['rate'] = {'updates_per_second': '20', 'burst': 0, 'zone_updates_per_second': 0.5, 'zone_burst': None}
+        governor = DnsConnector(self.dispatcher).governor
+        self.assertEquals(20, governor.bucket.rate)
+        self.assertEquals(20, governor.bucket.burst)
+        self.assertEquals(0.5, governor.zone_rate)
+        self.assertIsNone(governor.zone_burst)
+
+    def test_invalid_outbox_config(self):
+        config = self.dispatcher.get_connector_config(self.connector)
+        config['outbox'] = {'retries': -1, 'backoff': 'x', 'max_backoff': 0, 'max_attempts': -3}
+        connector = DnsConnector(self.dispatcher)
+        self.assertEquals(2, connector.retries)
+        self.assertEquals(1, connector.outbox.backoff)
+        self.assertEquals(300, connector.outbox.max_backoff)
+        self.assertEquals(10, connector.outbox.max_attempts)
+        # Changes may be sent only once and retried without waiting
+        config['outbox'] = {'retries': 0, 'backoff': 0, 'max_backoff': '60', 'max_attempts': '5'}
+        connector = DnsConnector(self.dispatcher)
+        self.assertEquals(0, connector.retries)
+        self.assertEquals(0, connector.outbox.backoff)
+        self.assertEquals(60, connector.outbox.max_backoff)
+        self.assertEquals(5, connector.outbox.max_attempts)
+
+    def test_reconnect(self):
+        ptr1 = Ptr(u'192.0.2.221', 'host221-eth0.domain.example.', 'host221.domain.example', 'eth0')
+        ptr2 = Ptr(u'192.0.2.222', 'host222-eth0.domain.example.', 'host222.domain.example', 'eth0')
+        self.connector.create_ptr(ptr1)
+        self.assertEquals(1, self.connector.channel.connections)
+        # Connection closed by the server
+        self.connector.channel.socket.shutdown(socket.SHUT_RDWR)
+        self.connector.create_ptr(ptr2)
+        self.assertEquals(2, self.connector.channel.connections)
+        self.assertEquals('host222-eth0.domain.example.', self.dns.get_ptr('192.0.2.222'))
+        self.connector.delete_ptrs(['192.0.2.221', '192.0.2.222'])
+        self.assertEquals(2, self.connector.channel.connections)
+
+    def test_bad_response(self):
+        ptr1 = Ptr(u'192.0.2.225', 'host225-eth0.domain.example.', 'host225.domain.example', 'eth0')
+        ptr2 = Ptr(u'192.0.2.226', 'host226-eth0.domain.example.', 'host226.domain.example', 'eth0')
+        updates = []
+        for ptr in (ptr1, ptr2):
+            update = self.connector._new_update(ptr.get_ptr_zone())
+            update.replace(ptr.get_ptr_zone_name(), 300, 'PTR', ptr.ptr)
+            updates.append(update)
+        updates[0].is_response = lambda response: False
+        self.assertRaises(dns.query.BadResponse, self.connector.channel.send_many, updates)
+        # Connection with the second message in flight is not reused
+        self.assertIsNone(self.connector.channel.socket)
+        response = self.connector.channel.send(updates[1])
+        self.assertEquals(updates[1].id, response.id)
+        self.assertEquals(2, self.connector.channel.connections)
+        self.connector.delete_ptrs(['192.0.2.225', '192.0.2.226'])
+
+    def test_delete_same_ptrs(self):
+        ptr1 = Ptr(u'192.0.2.231', 'host231-eth0.domain.example.', 'host231.domain.example', 'eth0')
+        ptr2 = Ptr(u'192.0.2.232', 'host232-eth0.domain.example.', 'host232.domain.example', 'eth0')
+        self.connector.save_ptrs({'192.0.2.231': ptr1, '192.0.2.232': ptr2})
+        # PTR of the second address changed since it was saved
+        stale_ptrs = {
+            '192.0.2.231': ptr1,
+            '192.0.2.232': Ptr(u'192.0.2.232', 'old-eth0.domain.example.', 'old.domain.example', 'eth0')
+        }
+        self.assertListEqual(['192.0.2.231', '192.0.2.232'], sorted(self.connector.delete_ptrs(stale_ptrs)))
+        self.assertFalse(self.dns.get_ptr('192.0.2.231'))
+        self.assertEquals('host232-eth0.domain.example.', self.dns.get_ptr('192.0.2.232'))
+        self.connector.delete_ptrs(['192.0.2.232'])
+
+    def test_refused_update(self):
+        # Server isn't authoritative for the zone
+        ptr = Ptr(u'198.51.100.1', 'host1-eth0.domain.example.', 'host1.domain.example', 'eth0')
+        update = self.connector._new_update(ptr.get_ptr_zone())
+        update.replace(ptr.get_ptr_zone_name(), 300, 'PTR', ptr.ptr)
+        self.assertFalse(self.connector._send(update, 1))
+
+    def test_outbox_refused(self):
+        ptr = Ptr(u'198.51.100.1', 'host1-eth0.domain.example.', 'host1.domain.example', 'eth0')
+        self.connector.save_ptrs({'198.51.100.1': ptr})
+        # Refused change is retried in the next run
+        self.assertEquals(1, self.connector.outbox.count())
+        self.assertListEqual([], self.connector.outbox.get_due())
+        self.connector.outbox.max_attempts = 2
+        self.connector.outbox.defer(['198.51.100.1'], 'refused')
+        self.assertEquals(0, self.connector.outbox.count())
+
+    def test_outbox_new_state_dir(self):
+        self.dispatcher.config.data['state']['dir'] = 'test/new_state'
+        connector = DnsConnector(self.dispatcher)
+        ptr = Ptr(u'198.51.100.2', 'host2-eth0.domain.example.', 'host2.domain.example', 'eth0')
+        try:
+            # Outbox database and its directory are created before state is saved
+            connector.save_ptrs({'198.51.100.2': ptr})
+            self.assertEquals(1, connector.outbox.count())
+            self.assertTrue(os.path.exists('test/new_state/dns_outbox.sql'))
+        finally:
+            connector.outbox.connection.close()
+            shutil.rmtree('test/new_state', ignore_errors=True)
+
+    def test_outbox_retry(self):
+        ptr = Ptr(u'192.0.2.241', 'host241-eth0.domain.example.', 'host241.domain.example', 'eth0')
+        self.connector.outbox.backoff = 0
+        # Server unreachable. Change is kept in the outbox instead of raising an exception
+        self.connector.channel.port = 1
+        self.connector.save_ptrs({'192.0.2.241': ptr})
+        changes = self.connector.outbox.get_due()
+        self.assertEquals(1, len(changes))
+        self.assertEquals('replace', changes[0]['action'])
+        # Tried once plus the retries
+        self.assertEquals(3, changes[0]['attempts'])
+        self.assertFalse(self.dns.get_ptr('192.0.2.241'))
+        # Next drain sends the change
+        self.connector.channel.port = 53
+        self.assertListEqual(['192.0.2.241'], self.connector.drain())
+        self.assertEquals(0, self.connector.outbox.count())
+        self.assertEquals('host241-eth0.domain.example.', self.dns.get_ptr('192.0.2.241'))
+        # Newer change replaces the older one
+        self.connector.channel.close()
+        self.connector.channel.port = 1
+        self.connector.retries = 0
+        self.connector.create_ptr(ptr)
+        self.connector.delete_ptr('192.0.2.241')
+        self.assertEquals('delete', self.connector.outbox.get_due()[0]['action'])
+        self.connector.channel.port = 53
+        self.connector.drain()
+        self.assertFalse(self.dns.get_ptr('192.0.2.241'))
+
+    def test_rate_limit(self):
+        self.connector.max_records = 1
+        self.connector.governor = self.connector.channel.governor = RateGovernor(zone_rate=100, zone_burst=1)
+        ptrs = {}
+        for x in range(251, 254):
+            ptr = Ptr(u'192.0.2.%d' % x, 'host%d-eth0.domain.example.' % x, 'host%d.domain.example' % x, 'eth0')
+            ptrs[str(ptr.ip_address)] = ptr
+        self.connector.save_ptrs(ptrs)
+        # 3 messages for the same zone, 2 of them waited for a token
+        self.assertEquals(3, self.connector.governor.messages)
+        self.assertEquals(2, self.connector.governor.delayed)
+        for x in range(251, 254):
+            self.assertEquals('host%d-eth0.domain.example.' % x, self.dns.get_ptr('192.0.2.%d' % x))
+        self.connector.delete_ptrs(ptrs.keys())
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import time
+import unittest
+
+from classes.connectors.dns.rate_governor import RateGovernor
+from classes.connectors.dns.rate_governor import TokenBucket
+
+
+class TestRateGovernor(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(10, burst=2)
+        now = bucket.last
+        # Burst is allowed
+        self.assertEquals(0, bucket.reserve(now))
+        self.assertEquals(0, bucket.reserve(now))
+        # Next tokens are available every 100ms
+        self.assertAlmostEqual(0.1, bucket.reserve(now))
+        self.assertAlmostEqual(0.2, bucket.reserve(now))
+        # Tokens are refilled over time, up to burst size
+        self.assertEquals(0, bucket.reserve(now + 10))
+        self.assertEquals(0, bucket.reserve(now + 10))
+        self.assertAlmostEqual(0.1, bucket.reserve(now + 10))
+
+    def test_global_rate(self):
+        governor = RateGovernor(rate=50, burst=1)
+        start_time = time.time()
+        for x in range(6):
+            governor.acquire('2.0.192.in-addr.arpa.')
+        # 5 messages waited 20ms each
+        self.assertGreaterEqual(time.time() - start_time, 0.09)
+        self.assertEquals(6, governor.messages)
+        self.assertEquals(5, governor.delayed)
+        self.assertAlmostEqual(0.1, governor.total_delay, places=1)
+        governor.log_stats()
+
+    def test_zone_rate(self):
+        governor = RateGovernor(zone_rate=50, zone_burst=1)
+        # Zones don't wait for each other
+        self.assertEquals(0, governor.acquire('2.0.192.in-addr.arpa.'))
+        self.assertEquals(0, governor.acquire('100.51.198.in-addr.arpa.'))
+        self.assertEquals(0, governor.acquire())
+        self.assertGreater(governor.acquire('2.0.192.in-addr.arpa.'), 0)
+        self.assertListEqual(['2.0.192.in-addr.arpa.'], governor.zone_delay.keys())
+
+    def test_unlimited(self):
+        governor = RateGovernor()
+        for x in range(100):
+            self.assertEquals(0, governor.acquire('2.0.192.in-addr.arpa.'))
+        self.assertEquals(0, governor.delayed)
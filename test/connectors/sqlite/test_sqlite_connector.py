@@ -133,6 +133,57 @@ class TestSqliteConnector(unittest.TestCase):
         self.connector.save_ptrs(ptrs=ptrs)
         self.assertEquals(self.connector.ptr_count(), len(self.connector.load_ptrs()))
 
+    def test_save_ptrs_chunked(self):
+        self.connector.chunk_size = 100
+        ptrs = {}
+        for x in range(256):
+            ptr = Ptr(ip_address=u'10.%d.%d.%d' % (x, x, x), hostname='test', if_name='test', ptr='test')
+            ptrs[str(ptr.ip_address)] = ptr
+        self.connector.save_ptrs(ptrs)
+        # 10.10.10.10 replaced the existing PTR
+        self.assertEquals(256, self.connector.ptr_count())
+        self.connector.c.execute("SELECT `ip_address`, `ptr_zone` FROM `ptrs`")
+        for ip_int, ptr_zone in self.connector.c.fetchall():
+            self.assertEquals(Ptr(ip_int, None, None, None).get_ptr_zone(), ptr_zone)
+
+    def test_load_ptr_queries(self):
+        ptrs = {}
+        for ip_address, hostname in [(u'192.0.2.1', 'r1'), (u'192.0.2.130', 'r1'), (u'192.0.3.1', 'r2'),
+                                     (u'198.51.100.1', 'r2')]:
+            ptr = Ptr(ip_address, '%s-eth0.domain.example.' % hostname, hostname + '.domain.example.', 'eth0')
+            ptrs[ip_address] = ptr
+        self.connector.save_ptrs(ptrs)
+        self.assertListEqual(['192.0.2.1', '192.0.2.130'], sorted(self.connector.load_prefix_ptrs('192.0.2.0/24')))
+        self.assertListEqual(['192.0.2.130'], self.connector.load_prefix_ptrs('192.0.2.128/25').keys())
+        self.assertListEqual(
+            ['192.0.2.1', '192.0.2.130', '192.0.3.1'], sorted(self.connector.load_prefix_ptrs('192.0.2.0/23'))
+        )
+        self.assertListEqual(['192.0.2.1'], self.connector.load_prefix_ptrs('192.0.2.1').keys())
+        self.assertRaises(ValueError, self.connector.load_prefix_ptrs, '192.0.2.0/33')
+        self.assertListEqual(
+            ['192.0.3.1', '198.51.100.1'], sorted(self.connector.load_device_ptrs('r2.domain.example.'))
+        )
+        self.assertListEqual(['192.0.3.1'], self.connector.load_zone_ptrs('3.0.192.in-addr.arpa.').keys())
+        self.assertDictEqual({}, self.connector.load_zone_ptrs('4.0.192.in-addr.arpa.'))
+
+    def test_indexes(self):
+        queries = [
+            ("SELECT * FROM `ptrs` WHERE `insert_time` < 1", 'ptrs_insert_time'),
+            ("SELECT * FROM `ptrs` WHERE `hostname` = 'x'", 'ptrs_hostname'),
+            ("SELECT * FROM `ptrs` WHERE `ptr_zone` = 'x'", 'ptrs_ptr_zone'),
+            ("SELECT * FROM `ptrs` WHERE `ip_address` BETWEEN 1 AND 2", 'PRIMARY KEY')
+        ]
+        for sql, index in queries:
+            self.connector.c.execute("EXPLAIN QUERY PLAN " + sql)
+            self.assertIn(index, self.connector.c.fetchone()[-1])
+
+    def test_pragmas(self):
+        self.connector.c.execute("PRAGMA journal_mode")
+        self.assertEquals('wal', self.connector.c.fetchone()[0])
+        self.connector.c.execute("PRAGMA synchronous")
+        # NORMAL
+        self.assertEquals(1, self.connector.c.fetchone()[0])
+
     def test_delete_ptrs(self):
         # Load one (default) ptr from database
         db_ptrs = self.connector.load_ptrs()
@@ -183,4 +234,20 @@ class TestSqliteConnector(unittest.TestCase):
         self.connector.save_ptr(Ptr(**ptr))
         self.assertEquals(2, self.connector.ptr_count())
         self.connector.delete_stale_ptrs()
-        self.assertEquals(1, self.connector.ptr_count())
\ No newline at end of file
+        self.assertEquals(1, self.connector.ptr_count())
+
+    def test_load_stale_ptrs(self):
+        ptr = {
+            'ip_address': u'10.10.10.12',
+            'hostname': 'cmts-sc-2.domain.example',
+            'if_name': 'Ethernet0/0/2',
+            'ptr': 'cmts-sc-2-et0-0-2.domain.example',
+            'create_time': time.time() - 73*3600
+        }
+        self.connector.save_ptr(Ptr(**ptr))
+        stale_ptrs = self.connector.load_stale_ptrs()
+        self.assertListEqual(['10.10.10.12'], stale_ptrs.keys())
+        self.assertEquals('cmts-sc-2-et0-0-2.domain.example', stale_ptrs['10.10.10.12'].ptr)
+        self.assertEquals(Ptr.STATUS_FOR_DELETION, stale_ptrs['10.10.10.12'].status)
+        self.assertListEqual(['10.10.10.12'], self.connector.delete_ptrs(stale_ptrs))
+        self.assertDictEqual({}, self.connector.load_stale_ptrs())
\ No newline at end of file
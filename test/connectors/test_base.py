@@ -46,4 +46,5 @@ class TestBaseConnector(unittest.TestCase):
         self.assertRaises(NotImplementedError, t.load_devices)
         self.assertRaises(NotImplementedError, t.save_ptrs, None)
         self.assertRaises(NotImplementedError, t.delete_ptrs, None)
-        self.assertRaises(NotImplementedError, t.delete_stale_ptrs)
\ No newline at end of file
+        self.assertRaises(NotImplementedError, t.delete_stale_ptrs)
+        self.assertRaises(NotImplementedError, t.load_stale_ptrs)
\ No newline at end of file
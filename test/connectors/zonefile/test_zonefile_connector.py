@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import os
+import shutil
+import unittest
+import dns.rdatatype
+import dns.zone
+
+from classes import Config
+from classes import Dispatcher
+from classes import Ptr
+from classes.connectors.zonefile.zonefile_connector import ZonefileConnector
+
+
+class TestZonefileConnector(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        self.dispatcher = Dispatcher(Config(filename='test/configuration_examples/configuration.json'))
+        self.connector = ZonefileConnector(self.dispatcher)
+
+    def tearDown(self):
+        shutil.rmtree(self.connector.directory, ignore_errors=True)
+
+    @staticmethod
+    def get_ptrs(ip_addresses):
+        ptrs = {}
+        for ip_address in ip_addresses:
+            host = 'host%s' % ip_address.replace('.', '-')
+            ptrs[ip_address] = Ptr(ip_address, '%s-eth0.domain.example.' % host, host + '.domain.example.', 'eth0')
+        return ptrs
+
+    def test_zone_file(self):
+        self.connector.save_ptrs(self.get_ptrs([u'192.0.2.20', u'192.0.2.3', u'198.51.100.1']))
+        # PTRs from the next batch are added to the same zone file
+        self.connector.save_ptrs(self.get_ptrs([u'192.0.2.100']))
+        zone = dns.zone.from_file(self.connector.get_filename('2.0.192.in-addr.arpa.'), relativize=False)
+        self.assertEquals('ns1.domain.example.', zone.find_rdataset(zone.origin, 'SOA')[0].mname.to_text())
+        self.assertListEqual(
+            ['ns1.domain.example.', 'ns2.domain.example.'],
+            sorted(x.to_text() for x in zone.find_rdataset(zone.origin, 'NS'))
+        )
+        ptrs = dict(
+            (name.to_text(), rdata.to_text()) for name, ttl, rdata in zone.iterate_rdatas(dns.rdatatype.PTR)
+        )
+        self.assertDictEqual({
+            '3.2.0.192.in-addr.arpa.': 'host192-0-2-3-eth0.domain.example.',
+            '20.2.0.192.in-addr.arpa.': 'host192-0-2-20-eth0.domain.example.',
+            '100.2.0.192.in-addr.arpa.': 'host192-0-2-100-eth0.domain.example.'
+        }, ptrs)
+        # Records are sorted by IP address
+        with open(self.connector.get_filename('2.0.192.in-addr.arpa.')) as zone_file:
+            names = [x.split()[0] for x in zone_file if ' PTR ' in x]
+        self.assertListEqual(['3', '20', '100'], names)
+        zone = dns.zone.from_file(self.connector.get_filename('100.51.198.in-addr.arpa.'), relativize=False)
+        self.assertEquals(1, len(list(zone.iterate_rdatas(dns.rdatatype.PTR))))
+
+        self.connector.delete_ptrs([u'192.0.2.20', 'x'])
+        zone = dns.zone.from_file(self.connector.get_filename('2.0.192.in-addr.arpa.'), relativize=False)
+        self.assertEquals(2, len(list(zone.iterate_rdatas(dns.rdatatype.PTR))))
+
+    def test_nsupdate(self):
+        self.connector.format = ZonefileConnector.FORMAT_NSUPDATE
+        self.connector.server = 'localhost'
+        self.connector.max_records = 2
+        self.connector.save_ptrs(self.get_ptrs([u'192.0.2.%d' % x for x in [5, 4, 3]]))
+        with open(self.connector.get_filename('2.0.192.in-addr.arpa.')) as script:
+            lines = script.read().splitlines()
+        self.assertListEqual([
+            'server localhost',
+            'zone 2.0.192.in-addr.arpa.',
+            'update delete 3.2.0.192.in-addr.arpa. PTR',
+            'update add 3.2.0.192.in-addr.arpa. 300 PTR host192-0-2-3-eth0.domain.example.',
+            'update delete 4.2.0.192.in-addr.arpa. PTR',
+            'update add 4.2.0.192.in-addr.arpa. 300 PTR host192-0-2-4-eth0.domain.example.',
+            'send',
+            'update delete 5.2.0.192.in-addr.arpa. PTR',
+            'update add 5.2.0.192.in-addr.arpa. 300 PTR host192-0-2-5-eth0.domain.example.',
+            'send'
+        ], lines)
+
+    def test_partial_run(self):
+        self.connector.save_ptrs(self.get_ptrs([u'192.0.2.20', u'192.0.2.3']))
+        # Next run polls only a single device. PTRs of other devices are kept
+        connector = ZonefileConnector(self.dispatcher)
+        connector.save_ptrs(self.get_ptrs([u'192.0.2.100', u'192.0.2.3']))
+        zone = dns.zone.from_file(connector.get_filename('2.0.192.in-addr.arpa.'), relativize=False)
+        ptrs = dict(
+            (name.to_text(), rdata.to_text()) for name, ttl, rdata in zone.iterate_rdatas(dns.rdatatype.PTR)
+        )
+        self.assertDictEqual({
+            '3.2.0.192.in-addr.arpa.': 'host192-0-2-3-eth0.domain.example.',
+            '20.2.0.192.in-addr.arpa.': 'host192-0-2-20-eth0.domain.example.',
+            '100.2.0.192.in-addr.arpa.': 'host192-0-2-100-eth0.domain.example.'
+        }, ptrs)
+        # PTRs are removed by delete_ptrs only
+        connector = ZonefileConnector(self.dispatcher)
+        self.assertListEqual([u'192.0.2.20', u'198.51.100.1'], connector.delete_ptrs([u'192.0.2.20', u'198.51.100.1']))
+        zone = dns.zone.from_file(connector.get_filename('2.0.192.in-addr.arpa.'), relativize=False)
+        self.assertEquals(2, len(list(zone.iterate_rdatas(dns.rdatatype.PTR))))
+        # Zone without PTRs is not written
+        self.assertFalse(os.path.exists(connector.get_filename('100.51.198.in-addr.arpa.')))
+
+    def test_invalid_config(self):
+        config = self.dispatcher.get_connector_config(self.connector)
+        config.update({'max_records': 0, 'ttl': 'x'})
+        connector = ZonefileConnector(self.dispatcher)
+        self.assertEquals(1000, connector.max_records)
+        self.assertEquals(300, connector.ttl)
+        connector.format = ZonefileConnector.FORMAT_NSUPDATE
+        connector.save_ptrs(self.get_ptrs([u'192.0.2.3']))
+        self.assertTrue(os.path.exists(connector.get_filename('2.0.192.in-addr.arpa.')))
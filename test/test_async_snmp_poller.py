@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+from classes import Config
+from classes import Device
+from classes.async_snmp_poller import AsyncSnmpPoller
+
+
+class TestAsyncSnmpPoller(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        self.config = Config(filename='test/configuration_examples/simple.json')
+
+    def test_poll(self):
+        device = Device('localhost', self.config)
+        failed_device = Device('ajajaj', self.config)
+        sessions = AsyncSnmpPoller(self.config, max_in_flight=1).poll([device, failed_device])
+        self.assertListEqual(['ajajaj', 'localhost'], sorted(sessions.keys()))
+        self.assertFalse(failed_device.get_interfaces(session=sessions['ajajaj']))
+        self.assertTrue(device.get_interfaces(session=sessions['localhost']))
+
+    def test_same_as_easysnmp(self):
+        device = Device('localhost', self.config)
+        device.get_interfaces()
+        async_device = Device('localhost', self.config)
+        sessions = AsyncSnmpPoller(self.config).poll([async_device])
+        async_device.get_interfaces(session=sessions['localhost'])
+        self.assertListEqual(sorted(device.interfaces.keys()), sorted(async_device.interfaces.keys()))
+        for if_index in device.interfaces:
+            self.assertEquals(device.interfaces[if_index].if_name, async_device.interfaces[if_index].if_name)
+            self.assertDictEqual(
+                device.interfaces[if_index].ip_addresses,
+                async_device.interfaces[if_index].ip_addresses
+            )
+            self.assertListEqual(
+                device.interfaces[if_index].vip_addresses,
+                async_device.interfaces[if_index].vip_addresses
+            )
+
+    def test_empty(self):
+        self.assertDictEqual({}, AsyncSnmpPoller(self.config).poll([]))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+import os
+import time
+from classes import Config
+from classes import CircuitBreaker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        # backoff: 0.5, max_backoff: 24
+        self.config = Config('test/configuration_examples/configuration.json')
+        self.filename = 'test/circuit_breaker.json'
+        self.breaker = CircuitBreaker(self.config, self.filename)
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_backoff(self):
+        self.assertFalse(self.breaker.is_open('localhost'))
+        self.assertIsNone(self.breaker.get_retry_after('localhost'))
+        for hours in [0.5, 1, 2, 4, 8, 16, 24, 24]:
+            now = time.time()
+            self.breaker.record_failure('localhost')
+            self.assertTrue(self.breaker.is_open('localhost'))
+            self.assertAlmostEqual(now + hours * 3600, self.breaker.get_retry_after('localhost'), delta=5)
+        self.assertEquals(8, self.breaker.get('localhost')['failures'])
+
+    def test_expired_backoff(self):
+        self.breaker.record_failure('localhost')
+        self.breaker.get('localhost')['retry_after'] = time.time() - 1
+        self.assertFalse(self.breaker.is_open('localhost'))
+        # Failure after expired backoff doubles it
+        self.breaker.record_failure('localhost')
+        self.assertEquals(2, self.breaker.get('localhost')['failures'])
+
+    def test_success(self):
+        self.breaker.record_failure('localhost')
+        self.breaker.record_success('localhost')
+        self.assertFalse(self.breaker.is_open('localhost'))
+        self.assertIsNone(self.breaker.get('localhost'))
+
+    def test_save_load(self):
+        self.breaker.record_failure('localhost')
+        self.breaker.save()
+        self.assertTrue(CircuitBreaker(self.config, self.filename).is_open('localhost'))
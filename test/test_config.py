@@ -18,6 +18,7 @@
 
 import unittest
 import logging
+import os
 from classes import Config
 
 
@@ -74,6 +75,53 @@ class TestConfig(unittest.TestCase):
         self.assertListEqual(self.config.data['dns']['servers'], self.ns_servers)
         self.assertListEqual(self.config.get_ns_servers(), self.ns_servers)
 
+    def test_get_ns_authoritative_prefixes(self):
+        self.assertListEqual(
+            ['198.51.100.0/24', '203.0.113.0/25'],
+            [str(x) for x in self.config.get_ns_authoritative_prefixes()]
+        )
+        config = Config('test/configuration_examples/simple.json')
+        self.assertListEqual([], config.get_ns_authoritative_prefixes())
+
+    def test_get_ns_max_in_flight(self):
+        self.assertEquals(20, self.config.get_ns_max_in_flight())
+        config = Config('test/configuration_examples/simple.json')
+        self.assertEquals(50, config.get_ns_max_in_flight())
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertEquals(50, config.get_ns_max_in_flight())
+        config = Config('test/configuration_examples/invalid_values_2.json')
+        self.assertEquals(50, config.get_ns_max_in_flight())
+
+    def test_is_ns_hedge_enabled(self):
+        self.assertTrue(self.config.is_ns_hedge_enabled())
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertFalse(config.is_ns_hedge_enabled())
+
+    def test_get_ns_cache(self):
+        self.assertFalse(self.config.is_ns_cache_enabled())
+        self.assertTrue(self.config.is_ns_cache_persistent())
+        self.assertEquals(100, self.config.get_ns_cache_size())
+        self.assertEquals(60, self.config.get_ns_cache_negative_ttl())
+        config = Config('test/configuration_examples/simple.json')
+        self.assertFalse(config.is_ns_cache_persistent())
+        self.assertEquals(10000, config.get_ns_cache_size())
+        self.assertEquals(300, config.get_ns_cache_negative_ttl())
+        for filename in ['invalid_values.json', 'invalid_values_2.json']:
+            config = Config('test/configuration_examples/' + filename)
+            self.assertEquals(10000, config.get_ns_cache_size())
+            self.assertEquals(300, config.get_ns_cache_negative_ttl())
+
+    def test_get_ns_axfr(self):
+        self.assertFalse(self.config.is_ns_axfr_enabled())
+        self.assertFalse(self.config.is_ns_zone_mirror_enabled())
+        self.assertTupleEqual(
+            ('localhost', self.config.data['connector']['dns']['key']),
+            self.config.get_ns_axfr_master()
+        )
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertFalse(config.is_ns_axfr_enabled())
+        self.assertIsNone(config.get_ns_axfr_master())
+
     def test_get_device_ignored(self):
         self.assertListEqual(sorted(self.config.data['ignored']['device'].keys()), self.ignore_rules_list)
         self.assertListEqual(sorted(self.config.get_device_ignore_rules().keys()), self.ignore_rules_list)
@@ -160,6 +208,122 @@ class TestConfig(unittest.TestCase):
         config = Config('test/configuration_examples/invalid_values_2.json')
         self.assertEquals(config.get_snmp_timeout(123.4), 123.4)
 
+    def test_get_snmp_engine(self):
+        self.assertEquals(self.config.get_snmp_engine(), 'pysnmp')
+        config = Config('test/configuration_examples/simple.json')
+        self.assertEquals(config.get_snmp_engine(), 'easysnmp')
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertEquals(config.get_snmp_engine(), 'easysnmp')
+
+    def test_get_snmp_fixtures(self):
+        self.assertEquals(self.config.get_snmp_fixtures_dir(), os.path.abspath('test/fixtures'))
+        self.assertEquals(self.config.get_snmp_replay_latency(), 0.01)
+        self.assertEquals(self.config.get_snmp_replay_loss(), 0.05)
+        config = Config('test/configuration_examples/simple.json')
+        self.assertEquals(config.get_snmp_fixtures_dir(), config.get_state_dir() + '/fixtures')
+        self.assertEquals(config.get_snmp_replay_latency(), 0)
+        self.assertEquals(config.get_snmp_replay_loss(), 0)
+        for filename in ['invalid_values.json', 'invalid_values_2.json']:
+            config = Config('test/configuration_examples/' + filename)
+            self.assertEquals(config.get_snmp_replay_latency(0.1), 0.1)
+            self.assertEquals(config.get_snmp_replay_loss(0.2), 0.2)
+
+    def test_get_snmp_max_in_flight(self):
+        self.assertEquals(self.config.get_snmp_max_in_flight(), 50)
+        config = Config('test/configuration_examples/simple.json')
+        self.assertEquals(config.get_snmp_max_in_flight(), 100)
+        self.assertEquals(config.get_snmp_max_in_flight(10), 10)
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertEquals(config.get_snmp_max_in_flight(10), 10)
+        config = Config('test/configuration_examples/invalid_values_2.json')
+        self.assertEquals(config.get_snmp_max_in_flight(10), 10)
+
+    def test_get_snmp_max_repetitions(self):
+        self.assertEquals(self.config.get_snmp_max_repetitions(), 25)
+        self.assertEquals(self.config.get_snmp_max_repetitions('hostname'), 25)
+        self.assertEquals(self.config.get_snmp_max_repetitions('cmts-sc-1.domain.example'), 50)
+        self.assertEquals(self.config.get_snmp_max_repetitions('slow-host.domain.example'), 0)
+        config = Config('test/configuration_examples/simple.json')
+        self.assertEquals(config.get_snmp_max_repetitions('cmts-sc-1.domain.example'), 10)
+        self.assertEquals(config.get_snmp_max_repetitions(default=20), 20)
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertEquals(config.get_snmp_max_repetitions('localhost', 15), 15)
+        config = Config('test/configuration_examples/invalid_values_2.json')
+        self.assertEquals(config.get_snmp_max_repetitions('localhost', 15), 15)
+
+    def test_get_state_dir(self):
+        self.assertTrue(self.config.get_state_dir().endswith('/test'))
+        config = Config('test/configuration_examples/simple.json')
+        self.assertEquals(config.get_state_dir(), os.path.abspath('test/connectors/sqlite'))
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertEquals(config.get_state_dir(), os.path.abspath('.'))
+
+    def test_is_snmp_cache_enabled(self):
+        self.assertTrue(self.config.is_snmp_cache_enabled())
+        config = Config('test/configuration_examples/simple.json')
+        self.assertFalse(config.is_snmp_cache_enabled())
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertFalse(config.is_snmp_cache_enabled())
+
+    def test_get_snmp_cache_max_age(self):
+        self.assertEquals(self.config.get_snmp_cache_max_age(), 12)
+        config = Config('test/configuration_examples/simple.json')
+        self.assertEquals(config.get_snmp_cache_max_age(), 24)
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertEquals(config.get_snmp_cache_max_age(6), 6)
+        config = Config('test/configuration_examples/invalid_values_2.json')
+        self.assertEquals(config.get_snmp_cache_max_age(6), 6)
+
+    def test_get_snmp_adaptive_timeout(self):
+        self.assertTrue(self.config.is_snmp_adaptive_timeout_enabled())
+        self.assertEquals(self.config.get_snmp_timeout_factor(), 4)
+        self.assertEquals(self.config.get_snmp_min_timeout(), 0.05)
+        self.assertEquals(self.config.get_snmp_max_timeout(), 2.5)
+        self.assertEquals(self.config.get_snmp_max_retries(), 2)
+        for filename in ['simple.json', 'invalid_values.json', 'invalid_values_2.json']:
+            config = Config('test/configuration_examples/' + filename)
+            self.assertFalse(config.is_snmp_adaptive_timeout_enabled())
+            self.assertEquals(config.get_snmp_timeout_factor(), 3)
+            self.assertEquals(config.get_snmp_min_timeout(0.2), 0.2)
+            self.assertEquals(config.get_snmp_max_timeout(), 5)
+            self.assertEquals(config.get_snmp_max_retries(), 3)
+
+    def test_get_pipeline(self):
+        self.assertEquals(self.config.get_poller_dns_workers(), 16)
+        self.assertEquals(self.config.get_poller_queue_size(), 500)
+        self.assertEquals(self.config.get_poller_batch_size(), 50)
+        config = Config('test/configuration_examples/simple.json')
+        # Defaults to number of poller workers
+        self.assertEquals(config.get_poller_dns_workers(), 1)
+        self.assertEquals(config.get_poller_dns_workers(4), 4)
+        self.assertEquals(config.get_poller_queue_size(), 1000)
+        self.assertEquals(config.get_poller_batch_size(), 100)
+        for filename in ['invalid_values.json', 'invalid_values_2.json']:
+            config = Config('test/configuration_examples/' + filename)
+            self.assertEquals(config.get_poller_dns_workers(3), 3)
+            self.assertEquals(config.get_poller_queue_size(10), 10)
+            self.assertEquals(config.get_poller_batch_size(20), 20)
+
+    def test_get_breaker(self):
+        self.assertTrue(self.config.is_breaker_enabled())
+        self.assertEquals(self.config.get_breaker_backoff(), 0.5)
+        self.assertEquals(self.config.get_breaker_max_backoff(), 24)
+        for filename in ['simple.json', 'invalid_values.json', 'invalid_values_2.json']:
+            config = Config('test/configuration_examples/' + filename)
+            self.assertFalse(config.is_breaker_enabled())
+            self.assertEquals(config.get_breaker_backoff(), 1)
+            self.assertEquals(config.get_breaker_max_backoff(48), 48)
+
+    def test_get_poller_workers(self):
+        self.assertEquals(self.config.get_poller_workers(), 8)
+        config = Config('test/configuration_examples/simple.json')
+        self.assertEquals(config.get_poller_workers(), 1)
+        self.assertEquals(config.get_poller_workers(4), 4)
+        config = Config('test/configuration_examples/invalid_values.json')
+        self.assertEquals(config.get_poller_workers(3), 3)
+        config = Config('test/configuration_examples/invalid_values_2.json')
+        self.assertEquals(config.get_poller_workers(3), 3)
+
     def test_get_email_server(self):
         self.assertEqual(self.config.get_email_server(), 'smtp.domain.example')
 
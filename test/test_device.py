@@ -23,6 +23,7 @@ from classes import Device
 from classes import Config
 from classes import DeviceInterface
 from classes import Ptr
+from classes.snmp_session import MemorySession
 
 class TestDevice(unittest.TestCase):
 
@@ -58,4 +59,29 @@ class TestDevice(unittest.TestCase):
 
     def test_fail_to_connect(self):
         d = Device('ajajaj', Config(filename='test/configuration_examples/simple.json'))
-        self.assertFalse(d.get_interfaces())
\ No newline at end of file
+        self.assertFalse(d.get_interfaces())
+
+    def test_get_if_names(self):
+        if_names = self.device._get_if_names()
+        self.assertEquals(len(os.listdir('/sys/class/net/')), len(if_names))
+        for if_index in self.device.interfaces:
+            self.assertEquals(if_names[if_index], self.device.interfaces[if_index].if_name)
+
+    def test_get_interfaces_from_session(self):
+        session = MemorySession('localhost')
+        session.add('.1.3.6.1.2.1.4.20.1.2.127.0.0.1', '1')
+        session.add('.1.3.6.1.2.1.4.20.1.2.192.0.2.1', '2')
+        session.add('.1.3.6.1.2.1.4.20.1.2.192.0.2.2', '2')
+        # No ifName for ifIndex 3
+        session.add('.1.3.6.1.2.1.4.20.1.2.198.51.100.1', '3')
+        session.add('.1.3.6.1.2.1.31.1.1.1.1.1', 'lo')
+        session.add('.1.3.6.1.2.1.31.1.1.1.1.2', 'Vlan100')
+        session.add('.1.3.6.1.4.1.9.9.106.1.2.1.1.11.2.100', '192.0.2.2')
+        device = Device('localhost', Config(filename='test/configuration_examples/simple.json'))
+        self.assertTrue(device.get_interfaces(session=session))
+        self.assertListEqual([1, 2], sorted(device.interfaces.keys()))
+        self.assertEquals('lo', device.interfaces[1].if_name)
+        self.assertEquals('localhost-vlan100', device.interfaces[2].ptr)
+        self.assertListEqual(['192.0.2.1', '192.0.2.2'], sorted(device.interfaces[2].ip_addresses.keys()))
+        self.assertListEqual(['192.0.2.2'], device.interfaces[2].vip_addresses)
+        self.assertEquals(3, device.get_number_of_ip_addresses())
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+import os
+from classes import CircuitBreaker
+from classes import Config
+from classes import Device
+from classes import DevicePoller
+from classes import Dispatcher
+
+
+class TestDevicePoller(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        self.config = Config(filename='test/configuration_examples/simple.json')
+        self.dispatcher = Dispatcher(self.config, auto_load=False)
+        for hostname in ['ignored-1', 'ignored-2', 'ignored-3']:
+            device = Device(hostname, self.config, self.dispatcher.dns)
+            device.ignored = True
+            self.dispatcher.devices[hostname] = device
+        self.dispatcher.devices['ajajaj'] = Device('ajajaj', self.config, self.dispatcher.dns)
+
+    def test_workers(self):
+        self.assertEquals(1, DevicePoller(self.dispatcher).workers)
+        self.assertEquals(4, DevicePoller(self.dispatcher, workers=4).workers)
+
+    def test_poll(self):
+        for workers in [1, 4]:
+            progress = []
+            poller = DevicePoller(self.dispatcher, workers=workers)
+            failed_devices = poller.poll(callback=lambda completed, total: progress.append((completed, total)))
+            self.assertListEqual(['ajajaj'], failed_devices)
+            self.assertListEqual([(1, 4), (2, 4), (3, 4), (4, 4)], progress)
+            self.assertEquals(0, poller.interface_number)
+            self.assertEquals(0, poller.ip_address_number)
+            self.assertDictEqual({}, poller.ptrs)
+
+    def test_poll_subset(self):
+        poller = DevicePoller(self.dispatcher, workers=2)
+        self.assertListEqual([], poller.poll(['ignored-1', 'ignored-2']))
+        self.assertListEqual([], DevicePoller(self.dispatcher).poll([]))
+
+    def test_breaker(self):
+        filename = 'test/circuit_breaker.json'
+        self.dispatcher.breaker = CircuitBreaker(self.config, filename)
+        try:
+            poller = DevicePoller(self.dispatcher)
+            self.assertListEqual(['ajajaj'], poller.poll())
+            self.assertTrue(self.dispatcher.breaker.is_open('ajajaj'))
+            # Failed device is skipped in the next run
+            poller = DevicePoller(self.dispatcher)
+            self.assertListEqual([], poller.poll())
+            self.assertListEqual(['ajajaj'], poller.breaker_skipped)
+        finally:
+            if os.path.exists(filename):
+                os.remove(filename)
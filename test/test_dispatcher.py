@@ -22,6 +22,7 @@ from classes.connectors.base import BaseConnector
 from classes import Dispatcher
 from classes import Config
 from classes import Ptr
+from classes import PollResult
 
 
 class TestConnector(BaseConnector):
@@ -49,6 +50,44 @@ class Test2Connector(BaseConnector):
 class Test3Connector(BaseConnector): pass
 
 
+class ChangedConnector(BaseConnector):
+    ptr_statuses = (Ptr.STATUS_NOT_CREATED, Ptr.STATUS_NOT_UPDATED)
+
+    def __init__(self, dispatcher):
+        BaseConnector.__init__(self, dispatcher)
+        self.saved = []
+
+    def get_connector_name(self):
+        return 'test'
+
+    def save_ptrs(self, ptrs):
+        self.saved.append(ptrs)
+
+
+class StaleSourceConnector(BaseConnector):
+    def __init__(self, dispatcher, stale_ptrs):
+        BaseConnector.__init__(self, dispatcher)
+        self.stale_ptrs = stale_ptrs
+        self.deleted = []
+
+    def get_connector_name(self):
+        return 'test'
+
+    def load_stale_ptrs(self):
+        return self.stale_ptrs
+
+    def delete_ptrs(self, ip_addresses):
+        self.deleted += ip_addresses
+        return list(ip_addresses)
+
+
+class StaleTargetConnector(StaleSourceConnector):
+    def delete_ptrs(self, ip_addresses):
+        self.deleted.append(ip_addresses)
+        # Delete of the first address fails
+        return sorted(ip_addresses)[1:]
+
+
 class TestDispatcher(unittest.TestCase):
     def setUp(self):
         logging.basicConfig(
@@ -89,6 +128,22 @@ class TestDispatcher(unittest.TestCase):
             sorted(self.dispatcher.devices.keys())
         )
 
+    def test_connector_load_shard(self):
+        TestConnector(self.dispatcher)
+        Test2Connector(self.dispatcher)
+        hostnames = []
+        for shard in [1, 2]:
+            dispatcher = Dispatcher(Config(filename='test/configuration_examples/simple.json'), auto_load=False)
+            TestConnector(dispatcher)
+            Test2Connector(dispatcher)
+            dispatcher.load(shard, 2)
+            for hostname in dispatcher.devices:
+                self.assertEquals(shard, PollResult.get_shard(hostname, 2))
+            hostnames += dispatcher.devices.keys()
+        # Each device is in exactly one shard
+        self.dispatcher.load()
+        self.assertListEqual(sorted(self.dispatcher.devices.keys()), sorted(hostnames))
+
     def test_autoload(self):
         self.dispatcher = Dispatcher(
             Config(filename='test/configuration_examples/simple.json'),
@@ -106,6 +161,37 @@ class TestDispatcher(unittest.TestCase):
         ))
         self.dispatcher.save_ptrs({})
 
+    def test_save_changed_ptrs(self):
+        connector = ChangedConnector(self.dispatcher)
+        ptrs = {}
+        for x, status in enumerate([Ptr.STATUS_OK, Ptr.STATUS_NOT_UPDATED, Ptr.STATUS_NOT_CREATED,
+                                    Ptr.STATUS_NOT_AUTHORITATIVE, Ptr.STATUS_IGNORED]):
+            ip_address = u'10.10.10.%d' % x
+            ptrs[ip_address] = Ptr(ip_address, 'host-eth%d.domain.example.' % x, 'host.domain.example',
+                                   'eth%d' % x, status=status)
+        self.dispatcher.save_ptrs(ptrs)
+        self.assertEquals(1, len(connector.saved))
+        self.assertListEqual([u'10.10.10.1', u'10.10.10.2'], sorted(connector.saved[0].keys()))
+        # Nothing changed. Connector isn't called
+        self.dispatcher.save_ptrs({u'10.10.10.0': ptrs[u'10.10.10.0']})
+        self.assertEquals(1, len(connector.saved))
+
+    def test_delete_stale_ptrs(self):
+        stale_ptrs = {}
+        for x in range(1, 5):
+            ip_address = u'10.10.10.%d' % x
+            stale_ptrs[ip_address] = Ptr(ip_address, 'host%d-eth0.domain.example.' % x,
+                                         'host%d.domain.example.' % (x % 2), 'eth0')
+        source = StaleSourceConnector(self.dispatcher, stale_ptrs)
+        target = StaleTargetConnector(self.dispatcher, {})
+        # Devices that weren't polled keep their PTRs
+        deleted = self.dispatcher.delete_stale_ptrs(['host0.domain.example.'])
+        # Target got PTRs with their values so it can delete only the same records
+        self.assertListEqual([u'10.10.10.1', u'10.10.10.3'], sorted(target.deleted[0].keys()))
+        # PTRs are deleted from the source only after target deleted them
+        self.assertListEqual([u'10.10.10.3'], deleted)
+        self.assertListEqual([u'10.10.10.3'], source.deleted)
+
     def test_get_connector_config(self):
         connector = TestConnector(self.dispatcher)
         self.assertDictEqual(
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+import os
+import time
+from classes import Config
+from classes import DnsCache
+
+
+class TestDnsCache(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        self.filename = 'test/dns_cache.json'
+        self.config = Config('test/configuration_examples/configuration.json')
+        self.cache = DnsCache(self.config, filename=self.filename)
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get_answer('host1', 'A'))
+        self.cache.set_answer('host1', 'A', 'host1.domain.example.', ['192.0.2.1'], 300)
+        entry = self.cache.get_answer('host1', 'A')
+        self.assertEquals('host1.domain.example.', entry['qname'])
+        self.assertListEqual(['192.0.2.1'], entry['rdatas'])
+        self.assertIsNone(self.cache.get_answer('host1', 'PTR'))
+        self.cache.set_error('host9', 'A', DnsCache.NXDOMAIN, 300)
+        self.assertEquals(DnsCache.NXDOMAIN, self.cache.get_answer('host9', 'A')['error'])
+        self.assertEquals(2, self.cache.hits)
+        self.assertEquals(2, self.cache.misses)
+        self.cache.invalidate('host1', 'A')
+        self.assertIsNone(self.cache.get_answer('host1', 'A'))
+
+    def test_expired(self):
+        self.cache.set_answer('host1', 'A', 'host1.domain.example.', ['192.0.2.1'], 0)
+        self.assertIsNone(self.cache.get_answer('host1', 'A'))
+
+    def test_lru(self):
+        self.cache.size = 3
+        for x in range(1, 4):
+            self.cache.set_answer('host%d' % x, 'A', 'host%d.' % x, ['192.0.2.%d' % x], 300)
+        # host1 is used, so host2 is the least recently used one
+        self.cache.get_answer('host1', 'A')
+        self.cache.set_answer('host4', 'A', 'host4.', ['192.0.2.4'], 300)
+        self.assertEquals(3, len(self.cache.data))
+        self.assertIsNone(self.cache.get_answer('host2', 'A'))
+        self.assertIsNotNone(self.cache.get_answer('host1', 'A'))
+
+    def test_persist(self):
+        self.cache.set_answer('host1', 'A', 'host1.domain.example.', ['192.0.2.1'], 300)
+        self.cache.set_answer('host2', 'A', 'host2.domain.example.', ['192.0.2.2'], 300)
+        self.cache.data['A/host2']['expires'] = time.time() - 1
+        self.cache.save()
+        cache = DnsCache(self.config, filename=self.filename)
+        self.assertListEqual(['A/host1'], cache.data.keys())
+        # Kept only in memory if not persistent
+        config = Config('test/configuration_examples/simple.json')
+        cache = DnsCache(config, filename=self.filename)
+        self.assertEquals(0, len(cache.data))
+        cache.set_answer('host3', 'A', 'host3.domain.example.', ['192.0.2.3'], 300)
+        cache.save()
+        self.assertListEqual(['A/host1'], DnsCache(self.config, filename=self.filename).data.keys())
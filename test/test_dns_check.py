@@ -68,6 +68,21 @@ class TestDnsCheck(unittest.TestCase):
         self.assertFalse(self.dns.is_authoritative('109.122.98.1'))
         self.assertFalse(self.dns.is_authoritative('1.1.1.1'))
 
+    def test_authority_cache(self):
+        # One SOA query per PTR zone
+        self.assertTrue(self.dns.is_authoritative('192.0.2.1'))
+        self.assertTrue(self.dns.is_authoritative('192.0.2.255'))
+        self.assertEquals(1, self.dns.authority_misses)
+        self.assertEquals(1, self.dns.authority_hits)
+        # Authoritative prefixes are never queried
+        self.assertTrue(self.dns.is_authoritative('198.51.100.7'))
+        self.assertNotIn('100.51.198.in-addr.arpa.', self.dns.authority_cache)
+        self.assertEquals(1, self.dns.authority_misses)
+        # Expired entry is queried again
+        self.dns.authority_cache['2.0.192.in-addr.arpa.'] = (False, 0)
+        self.assertTrue(self.dns.is_authoritative('192.0.2.1'))
+        self.assertEquals(2, self.dns.authority_misses)
+
     def test_check_status(self):
         self.assertRaises(ipaddress.AddressValueError, self.dns.get_status, 'x.x.x.x', 'test')
         # OK PTR
@@ -90,3 +105,61 @@ class TestDnsCheck(unittest.TestCase):
 
         # Wrong IP
         self.assertRaises(ValueError, self.dns.get_status, '192.0.2', 'something.domain.example.')
+
+    def test_cache(self):
+        config = Config('test/configuration_examples/configuration.json')
+        config.data['dns']['cache'] = {'enabled': True}
+        dns_check = DnsCheck(config=config)
+        # FQDN found with search list is cached for A lookup of the device
+        self.assertEquals('host1.domain.example.', dns_check.get_fqdn('host1'))
+        self.assertEquals('192.0.2.1', dns_check.get_a('host1.domain.example.'))
+        self.assertEquals('192.0.2.1', dns_check.get_a('host1'))
+        self.assertEquals(2, dns_check.cache.hits)
+        self.assertEquals('host1.domain.example.', dns_check.get_ptr('192.0.2.1'))
+        self.assertEquals('host1.domain.example.', dns_check.get_ptr('192.0.2.1'))
+        self.assertTrue(dns_check.is_authoritative('192.0.2.1'))
+        self.assertEquals(3, dns_check.cache.hits)
+        # Negative answers
+        self.assertFalse(dns_check.get_ptr('192.0.2.4'))
+        self.assertFalse(dns_check.get_ptr('192.0.2.4'))
+        self.assertEquals(4, dns_check.cache.hits)
+        dns_check.invalidate_ptr('192.0.2.1')
+        self.assertEquals('host1.domain.example.', dns_check.get_ptr('192.0.2.1'))
+        self.assertEquals(4, dns_check.cache.hits)
+        self.assertIsNone(self.dns.cache)
+
+    def test_check_many(self):
+        checks = [
+            ('192.0.2.1', 'host1.domain.example.'),
+            ('192.0.2.22', 'localhost.domain.example.'),
+            ('192.0.2.4', 'host4.domain.example.'),
+            ('8.8.8.8', 'wrong.domain.example.'),
+            ('192.0.2.2', 'host2.domain.example.')
+        ]
+        expected = [self.dns.get_status(*x) for x in checks]
+        self.assertListEqual(expected, self.dns.check_many(checks))
+        self.assertIsNotNone(self.dns.pool)
+        self.dns.close()
+        self.assertIsNone(self.dns.pool)
+        # Sequential checks
+        self.dns.max_in_flight = 1
+        self.assertListEqual(expected, self.dns.check_many(checks))
+        self.assertIsNone(self.dns.pool)
+        self.assertListEqual([], self.dns.check_many([]))
+        self.assertRaises(ipaddress.AddressValueError, self.dns.check_many, [('x.x.x.x', 'test')] * 2)
+
+    def test_check_status_axfr(self):
+        config = Config('test/configuration_examples/configuration.json')
+        config.data['dns']['axfr'] = {'enabled': True}
+        dns_check = DnsCheck(config=config)
+        self.assertIsNotNone(dns_check.zone_transfer)
+        self.assertEqual(DnsCheck.STATUS_OK, dns_check.get_status('192.0.2.1', 'host1.domain.example.')[1])
+        self.assertEqual(DnsCheck.STATUS_NOT_UPDATED,
+                         dns_check.get_status('192.0.2.22', 'localhost.domain.example.')[1])
+        self.assertEqual(DnsCheck.STATUS_NOT_CREATED, dns_check.get_status('192.0.2.4', 'host4.domain.example.')[1])
+        # Whole zone transferred once
+        self.assertEquals(1, dns_check.zone_transfer.transfers)
+        # Non authoritative space is still queried
+        self.assertEqual(DnsCheck.STATUS_NOT_AUTHORITATIVE,
+                         dns_check.get_status('8.8.8.8', 'wrong.domain.example.')[1])
+        self.assertNotIn('8.8.8.in-addr.arpa.', dns_check.zone_transfer.zones)
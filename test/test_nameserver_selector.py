@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+import threading
+import time
+import dns.name
+import dns.resolver
+from classes import NameserverSelector
+
+
+class TestNameserverSelector(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        # Nothing listens on 127.0.0.2, queries to it time out
+        self.nameservers = ['127.0.0.2', '127.0.0.1']
+        self.search = [dns.name.from_text('domain.example')]
+
+    def test_failover(self):
+        selector = NameserverSelector(self.nameservers, self.search, timeout=0.3, hedge=False)
+        self.assertListEqual(self.nameservers, selector.get_order())
+        answer = selector.query('host1', 'A')
+        self.assertEquals('192.0.2.1', answer[0].to_text())
+        self.assertEquals(1, selector.stats['127.0.0.2']['errors'])
+        # Failed server is moved to the end of the list
+        self.assertListEqual(['127.0.0.1', '127.0.0.2'], selector.get_order())
+        start_time = time.time()
+        selector.query('host2', 'A')
+        self.assertLess(time.time() - start_time, 0.2)
+        self.assertEquals(1, selector.stats['127.0.0.2']['queries'])
+        self.assertEquals(2, selector.stats['127.0.0.1']['queries'])
+
+    def test_hedge(self):
+        selector = NameserverSelector(self.nameservers, self.search, timeout=0.5)
+        # Server looks fast but doesn't answer. Query is sent to the next one without waiting for timeout
+        selector.stats['127.0.0.2']['latency'] = 0.001
+        selector.stats['127.0.0.1']['latency'] = 0.01
+        start_time = time.time()
+        answer = selector.query('host1', 'A')
+        self.assertLess(time.time() - start_time, 0.4)
+        self.assertEquals('192.0.2.1', answer[0].to_text())
+        self.assertEquals(1, selector.stats['127.0.0.1']['hedged'])
+
+    def test_shared_workers(self):
+        selector = NameserverSelector(['127.0.0.1', '127.0.0.2'], self.search, timeout=0.3, workers=2)
+        selector.query('host1', 'A')
+        threads = threading.active_count()
+        # Lookups don't start threads of their own
+        for _ in range(5):
+            selector.query('host1', 'A')
+        self.assertEquals(threads, threading.active_count())
+        selector.close()
+        self.assertIsNone(selector.pool)
+        self.assertLess(threading.active_count(), threads)
+
+    def test_negative_answer(self):
+        selector = NameserverSelector(['127.0.0.1', '127.0.0.2'], self.search, timeout=0.3)
+        self.assertRaises(dns.resolver.NXDOMAIN, selector.query, 'asdasd.domain.example.', 'A')
+        # NXDOMAIN is an answer. Other server is not asked
+        self.assertEquals(0, selector.stats['127.0.0.2']['queries'])
+        self.assertEquals(0, selector.stats['127.0.0.1']['errors'])
+
+    def test_all_failed(self):
+        selector = NameserverSelector(['127.0.0.2'], self.search, timeout=0.1)
+        self.assertRaises(dns.exception.Timeout, selector.query, 'host1', 'A')
+        self.assertEquals(1, selector.stats['127.0.0.2']['errors'])
+
+    def test_unexpected_error(self):
+        selector = NameserverSelector(self.nameservers, self.search, timeout=0.3)
+        selector.resolvers['127.0.0.2'].query = lambda name, rdtype: 1 / 0
+        # Error is reported instead of leaving the caller waiting. Next server is tried
+        self.assertEquals('192.0.2.1', selector.query('host1', 'A')[0].to_text())
+        selector.resolvers['127.0.0.1'].query = lambda name, rdtype: 1 / 0
+        self.assertRaises(ZeroDivisionError, selector.query, 'host1', 'A')
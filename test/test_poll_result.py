@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+import os
+from classes import PollResult
+from classes import Ptr
+
+
+class TestPollResult(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        self.filename = 'test/poll_result.json'
+        self.results = []
+        for shard in [1, 2]:
+            result = PollResult(shard, 2)
+            ip_address = '192.0.2.%d' % shard
+            result.ptrs[ip_address] = Ptr(
+                ip_address, 'host%d-eth0.domain.example' % shard, 'host%d.domain.example' % shard, 'eth0',
+                status=Ptr.STATUS_NOT_CREATED
+            )
+            result.failed_devices = ['failed%d.domain.example' % shard]
+            result.device_number = 10
+            result.interface_number = 20
+            result.ip_address_number = 30
+            result.delta_time = shard * 10
+            self.results.append(result)
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_get_shard(self):
+        hostnames = ['host%d.domain.example' % x for x in range(1000)]
+        shards = [PollResult.get_shard(x, 4) for x in hostnames]
+        self.assertSetEqual(set([1, 2, 3, 4]), set(shards))
+        # Stable across calls and case insensitive
+        self.assertEquals(PollResult.get_shard('host1.domain.example', 4), shards[1])
+        self.assertEquals(PollResult.get_shard('HOST1.domain.example', 4), shards[1])
+        self.assertEquals(1, PollResult.get_shard('host1.domain.example', 1))
+
+    def test_save_load(self):
+        self.results[0].save(self.filename)
+        result = PollResult.load(self.filename)
+        self.assertEquals(1, result.shard)
+        self.assertEquals(2, result.shard_count)
+        self.assertListEqual(['192.0.2.1'], result.ptrs.keys())
+        self.assertEquals('host1-eth0.domain.example', result.ptrs['192.0.2.1'].ptr)
+        self.assertEquals(Ptr.STATUS_NOT_CREATED, result.ptrs['192.0.2.1'].status)
+        self.assertListEqual(['failed1.domain.example'], result.failed_devices)
+        self.assertEquals(30, result.ip_address_number)
+
+    def test_merge(self):
+        merged = PollResult.merge(self.results)
+        self.assertListEqual(['192.0.2.1', '192.0.2.2'], sorted(merged.ptrs.keys()))
+        self.assertListEqual(['failed1.domain.example', 'failed2.domain.example'], merged.failed_devices)
+        self.assertEquals(20, merged.device_number)
+        self.assertEquals(40, merged.interface_number)
+        self.assertEquals(60, merged.ip_address_number)
+        self.assertEquals(20, merged.delta_time)
+
+    def test_merge_incomplete(self):
+        self.assertRaises(ValueError, PollResult.merge, [])
+        self.assertRaises(ValueError, PollResult.merge, self.results[:1])
+        self.assertRaises(ValueError, PollResult.merge, [self.results[0], self.results[0]])
+        self.results[1].shard_count = 3
+        self.assertRaises(ValueError, PollResult.merge, self.results)
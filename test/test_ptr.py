@@ -65,4 +65,17 @@ class TestPtr(unittest.TestCase):
         self.obj.create_time()
 
     def test_representation(self):
-        self.assertEquals('host-et0-0-0.domain.example (192.0.2.200)', str(self.obj))
\ No newline at end of file
+        self.assertEquals('host-et0-0-0.domain.example (192.0.2.200)', str(self.obj))
+
+    def test_to_from_dict(self):
+        ptr = Ptr(status=Ptr.STATUS_NOT_CREATED, create_time=1500000000, **self.ptr)
+        data = ptr.to_dict()
+        self.assertEquals('192.0.2.200', data['ip_address'])
+        self.assertEquals(1500000000, data['time'])
+        copy = Ptr.from_dict(data)
+        self.assertEquals(ptr.ip_address, copy.ip_address)
+        self.assertEquals(ptr.ptr, copy.ptr)
+        self.assertEquals(ptr.hostname, copy.hostname)
+        self.assertEquals(ptr.if_name, copy.if_name)
+        self.assertEquals(Ptr.STATUS_NOT_CREATED, copy.status)
+        self.assertEquals(ptr.create_time(), copy.create_time())
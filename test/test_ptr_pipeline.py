@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+from classes import Config
+from classes import Device
+from classes import Dispatcher
+from classes import Ptr
+from classes import PtrPipeline
+from classes.snmp_session import MemorySession
+
+
+class TestPtrPipeline(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        self.config = Config(filename='test/configuration_examples/simple.json')
+        self.dispatcher = Dispatcher(self.config, auto_load=False)
+        self.sessions = {}
+        for device_number in range(1, 6):
+            hostname = 'r%d.domain.example' % device_number
+            self.dispatcher.devices[hostname] = Device(hostname, self.config, self.dispatcher.dns)
+            session = MemorySession(hostname)
+            for if_index in range(1, 4):
+                session.add('.1.3.6.1.2.1.31.1.1.1.1.%d' % if_index, 'eth%d' % if_index)
+                session.add('.1.3.6.1.2.1.4.20.1.2.198.51.%d.%d' % (device_number, if_index), str(if_index))
+            self.sessions[hostname] = session
+        self.sessions['r5.domain.example'].set_error('Timeout')
+
+    def _make_pipeline(self, sink=None):
+        pipeline = PtrPipeline(self.dispatcher, sink=sink, workers=2, dns_workers=3, queue_size=2, batch_size=4)
+        pipeline.sessions = self.sessions
+        return pipeline
+
+    def test_poll(self):
+        progress = []
+        pipeline = self._make_pipeline()
+        failed_devices = pipeline.poll(callback=lambda completed, total: progress.append(completed))
+        self.assertListEqual(['r5.domain.example'], failed_devices)
+        self.assertListEqual([1, 2, 3, 4, 5], progress)
+        self.assertEquals(12, pipeline.interface_number)
+        self.assertEquals(12, pipeline.ip_address_number)
+        # Without sink all PTRs are kept
+        self.assertEquals(12, len(pipeline.ptrs))
+        self.assertEquals('r1-eth2.domain.example', pipeline.ptrs['198.51.1.2'].ptr)
+        for ptr in pipeline.ptrs.values():
+            self.assertNotEquals(Ptr.STATUS_UNKNOWN, ptr.status)
+
+    def test_sink(self):
+        batches = []
+        pipeline = self._make_pipeline(sink=lambda ptrs: batches.append(dict(ptrs)))
+        pipeline.poll()
+        self.assertEquals(12, pipeline.saved_ptr_number)
+        self.assertListEqual([4, 4, 4], [len(x) for x in batches])
+        saved = {}
+        for batch in batches:
+            saved.update(batch)
+        self.assertEquals(12, len(saved))
+        # Only PTRs that need update are kept for the report
+        for ptr in pipeline.ptrs.values():
+            self.assertIn(ptr.status, (Ptr.STATUS_NOT_CREATED, Ptr.STATUS_NOT_UPDATED))
+
+    def test_poll_subset(self):
+        pipeline = self._make_pipeline()
+        self.assertListEqual([], pipeline.poll(['r1.domain.example']))
+        self.assertEquals(3, len(pipeline.ptrs))
+        self.assertListEqual([], self._make_pipeline().poll([]))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+import os
+import time
+from classes import Config
+from classes import Device
+from classes import SnmpCache
+from classes.snmp_session import MemorySession
+
+
+class TestSnmpCache(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        self.config = Config('test/configuration_examples/configuration.json')
+        self.filename = 'test/snmp_cache.json'
+        self.cache = SnmpCache(self.config, self.filename)
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_default_filename(self):
+        self.assertEquals(SnmpCache(self.config).filename, self.config.get_state_dir() + '/snmp_cache.json')
+
+    def test_get_tables(self):
+        self.assertIsNone(self.cache.get_tables('localhost', 1000, 10))
+        self.cache.set_tables('localhost', 1000, 10, {1: 'lo', 2: 'Vlan100'}, {2: ['192.0.2.2']})
+        self.assertEquals(
+            ({1: 'lo', 2: 'Vlan100'}, {2: ['192.0.2.2']}),
+            self.cache.get_tables('localhost', 2000, 10)
+        )
+        # Device restarted
+        self.assertIsNone(self.cache.get_tables('localhost', 500, 10))
+        # Interface created or deleted
+        self.assertIsNone(self.cache.get_tables('localhost', 2000, 1500))
+        self.assertEquals(1, self.cache.hits)
+        self.assertEquals(3, self.cache.misses)
+
+    def test_restart_with_larger_uptime(self):
+        self.cache.set_tables('localhost', 60000, 0, {1: 'lo'}, {})
+        self.cache.data['localhost']['time'] = time.time() - 3600
+        # Restarted 20 minutes ago. Uptime is larger than the cached one, but lower than expected
+        self.assertIsNone(self.cache.get_tables('localhost', 120000, 0))
+        # Up for the whole hour
+        self.assertEquals(({1: 'lo'}, {}), self.cache.get_tables('localhost', 60000 + 360000, 0))
+
+    def test_max_age(self):
+        self.cache.set_tables('localhost', 1000, 10, {1: 'lo'}, {})
+        self.cache.data['localhost']['time'] = time.time() - 13 * 3600
+        self.assertIsNone(self.cache.get_tables('localhost', 2000, 10))
+
+    def test_save_load(self):
+        self.cache.set_tables('localhost', 1000, 10, {1: 'lo'}, {1: ['127.0.0.2']})
+        self.cache.save()
+        cache = SnmpCache(self.config, self.filename)
+        self.assertEquals(({1: 'lo'}, {1: ['127.0.0.2']}), cache.get_tables('localhost', 1000, 10))
+
+    def test_save_missing_directory(self):
+        filename = 'test/state_missing/snmp_cache.json'
+        cache = SnmpCache(self.config, filename)
+        cache.set_tables('localhost', 1000, 10, {1: 'lo'}, {})
+        try:
+            cache.save()
+            self.assertTrue(os.path.exists(filename))
+        finally:
+            if os.path.exists(filename):
+                os.remove(filename)
+            if os.path.isdir('test/state_missing'):
+                os.rmdir('test/state_missing')
+
+    def test_broken_file(self):
+        with open(self.filename, 'w') as f:
+            f.write('{broken')
+        self.assertDictEqual({}, SnmpCache(self.config, self.filename).data)
+
+    def test_device_uses_cache(self):
+        session = MemorySession('localhost')
+        session.add('.1.3.6.1.2.1.1.3.0', '1000')
+        session.add('.1.3.6.1.2.1.31.1.5.0', '10')
+        session.add('.1.3.6.1.2.1.4.20.1.2.192.0.2.1', '2')
+        session.add('.1.3.6.1.2.1.31.1.1.1.1.2', 'Vlan100')
+        session.add('.1.3.6.1.4.1.9.9.106.1.2.1.1.11.2.100', '192.0.2.2')
+        device = Device('localhost', self.config, snmp_cache=self.cache)
+        self.assertTrue(device.get_interfaces(session=session))
+        self.assertEquals(1, self.cache.misses)
+
+        # Same markers, tables are not walked again
+        session = MemorySession('localhost')
+        session.add('.1.3.6.1.2.1.1.3.0', '2000')
+        session.add('.1.3.6.1.2.1.31.1.5.0', '10')
+        session.add('.1.3.6.1.2.1.4.20.1.2.192.0.2.1', '2')
+        device = Device('localhost', self.config, snmp_cache=self.cache)
+        self.assertTrue(device.get_interfaces(session=session))
+        self.assertEquals(1, self.cache.hits)
+        self.assertEquals('Vlan100', device.interfaces[2].if_name)
+        self.assertListEqual(['192.0.2.2'], device.interfaces[2].vip_addresses)
+
+        # Device without ifTableLastChange doesn't use cache
+        session = MemorySession('localhost')
+        session.add('.1.3.6.1.2.1.4.20.1.2.192.0.2.1', '2')
+        device = Device('localhost', self.config, snmp_cache=self.cache)
+        self.assertTrue(device.get_interfaces(session=session))
+        self.assertDictEqual({}, device.interfaces)
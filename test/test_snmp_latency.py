@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+import os
+from classes import Config
+from classes import Device
+from classes import SnmpLatency
+from classes.snmp_session import MemorySession
+
+
+class TestSnmpLatency(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        # factor: 4, min: 0.05, max: 2.5, retries: 143, max_retries: 2
+        self.config = Config('test/configuration_examples/configuration.json')
+        self.filename = 'test/snmp_latency.json'
+        self.latency = SnmpLatency(self.config, self.filename)
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_get_timeout(self):
+        # No samples - configured timeout
+        self.assertEquals(23, self.latency.get_timeout('localhost'))
+        for _ in range(99):
+            self.latency.record('localhost', 0.1)
+        self.assertAlmostEquals(0.4, self.latency.get_timeout('localhost'))
+        # Single slow response within the window of 50 samples sets p99
+        self.latency.record('localhost', 0.5)
+        self.assertAlmostEquals(2.0, self.latency.get_timeout('localhost'))
+        # Limited by max and min
+        self.latency.record('localhost', 1)
+        self.assertAlmostEquals(2.5, self.latency.get_timeout('localhost'))
+        self.latency.record('fast', 0.001)
+        self.assertAlmostEquals(0.05, self.latency.get_timeout('fast'))
+        self.assertEquals(SnmpLatency.WINDOW, len(self.latency.get('localhost')))
+
+    def test_get_retries(self):
+        config = Config('test/configuration_examples/simple.json')
+        latency = SnmpLatency(config, self.filename)
+        self.assertEquals(0, latency.get_retries('localhost'))
+        for _ in range(49):
+            latency.record('localhost', 0.1)
+        latency.record_loss('localhost')
+        self.assertEquals(1, latency.get_retries('localhost'))
+        # Half of the requests lost
+        for _ in range(24):
+            latency.record_loss('localhost')
+        self.assertEquals(2, latency.get_retries('localhost'))
+        # Configured retries higher than max retries
+        self.latency.record('localhost', 0.1)
+        self.latency.record_loss('localhost')
+        self.assertEquals(143, self.latency.get_retries('localhost'))
+
+    def test_get_retries_dead_device(self):
+        config = Config('test/configuration_examples/simple.json')
+        latency = SnmpLatency(config, self.filename)
+        for _ in range(SnmpLatency.WINDOW):
+            latency.record_loss('localhost')
+        # No response in the window - retries are not increased
+        self.assertEquals(0, latency.get_retries('localhost'))
+        # Lost requests are not response times
+        self.assertEquals(1, latency.get_timeout('localhost'))
+
+    def test_save_load(self):
+        self.latency.record('localhost', 0.2)
+        self.latency.record_loss('localhost')
+        self.latency.save()
+        latency = SnmpLatency(self.config, self.filename)
+        self.assertListEqual([0.2, None], latency.get('localhost'))
+
+    def test_device_probe(self):
+        device = Device('localhost', self.config, snmp_latency=self.latency)
+        device.session = MemorySession('localhost')
+        device.session.add('.1.3.6.1.2.1.1.3.0', '1000')
+        device.session.add('.1.3.6.1.2.1.31.1.5.0', '10')
+        self.assertEquals((1000, 10), device._probe())
+        self.assertEquals(1, len(self.latency.get('localhost')))
+        # Data fetched beforehand is not timed. Without cache there's no need for the request
+        self.assertIsNone(device._probe(timed=False))
+        self.assertEquals(1, len(self.latency.get('localhost')))
+        self.assertEquals(self.latency.get_timeout('localhost'), device.get_snmp_timeout())
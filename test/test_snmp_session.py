@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+import os
+import easysnmp
+from classes import Config
+from classes import Device
+from classes.snmp_session import MemorySession
+from classes.snmp_session import RecordingSession
+from classes.snmp_session import ReplaySession
+
+
+class TestMemorySession(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        self.session = MemorySession('localhost')
+        self.session.add('1.3.6.1.2.1.4.20.1.2.192.0.2.1', '2', 'Integer')
+        self.session.add('.1.3.6.1.2.1.4.20.1.2.10.0.0.1', '1', 'Integer')
+        self.session.add('.1.3.6.1.2.1.31.1.1.1.1.1', 'lo')
+        self.session.add('.1.3.6.1.2.1.31.1.1.1.1.2', 'eth0')
+        self.session.add('.1.3.6.1.2.1.31.1.1.1.1.10', 'eth1')
+        self.filename = 'test/localhost.json'
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_walk(self):
+        variables = self.session.walk('.1.3.6.1.2.1.4.20.1.2')
+        self.assertEquals(2, len(variables))
+        # Variables are sorted by OID
+        self.assertEquals('.1.3.6.1.2.1.4.20.1.2.10.0.0', variables[0].oid)
+        self.assertEquals('1', variables[0].oid_index)
+        self.assertEquals('1', variables[0].value)
+        self.assertEquals('.1.3.6.1.2.1.4.20.1.2.192.0.2', variables[1].oid)
+        self.assertListEqual(
+            ['lo', 'eth0', 'eth1'],
+            [x.value for x in self.session.walk('1.3.6.1.2.1.31.1.1.1.1')]
+        )
+        self.assertEquals(5, len(self.session.walk(['.1.3.6.1.2.1.4.20.1.2', '.1.3.6.1.2.1.31.1.1.1.1'])))
+        self.assertListEqual([], self.session.walk('.1.3.6.1.4.1.9.9.106.1.2.1.1.11'))
+        self.assertListEqual([], self.session.walk('.1.3.6.1.2.1.31.1.1.1.2'))
+
+    def test_bulkwalk(self):
+        self.assertListEqual(
+            [x.value for x in self.session.walk('.1.3.6.1.2.1.31.1.1.1.1')],
+            [x.value for x in self.session.bulkwalk('.1.3.6.1.2.1.31.1.1.1.1', max_repetitions=25)]
+        )
+
+    def test_get(self):
+        self.assertEquals('eth1', self.session.get('.1.3.6.1.2.1.31.1.1.1.1.10').value)
+        self.assertEquals('10', self.session.get('.1.3.6.1.2.1.31.1.1.1.1.10').oid_index)
+        self.assertListEqual(
+            ['lo', 'eth0'],
+            [x.value for x in self.session.get(['.1.3.6.1.2.1.31.1.1.1.1.1', '.1.3.6.1.2.1.31.1.1.1.1.2'])]
+        )
+        self.assertRaises(easysnmp.EasySNMPNoSuchInstanceError, self.session.get, '.1.3.6.1.2.1.31.1.1.1.1.3')
+
+    def test_error(self):
+        self.session.set_error('No SNMP response received before timeout')
+        self.assertRaises(easysnmp.EasySNMPError, self.session.walk, '.1.3.6.1.2.1.4.20.1.2')
+        self.assertRaises(easysnmp.EasySNMPError, self.session.get, '.1.3.6.1.2.1.31.1.1.1.1.1')
+
+    def test_save_load(self):
+        self.session.add('.1.3.6.1.2.1.31.1.1.1.18.1', '\xff\xfe binary')
+        self.session.save(self.filename)
+        session = MemorySession('localhost')
+        session.load(self.filename)
+        self.assertListEqual(
+            [(x.oid, x.oid_index, x.value) for x in self.session.walk()],
+            [(x.oid, x.oid_index, x.value) for x in session.walk()]
+        )
+        self.assertEquals('\xff\xfe binary', session.get('.1.3.6.1.2.1.31.1.1.1.18.1').value)
+
+    def test_recording_session(self):
+        session = RecordingSession(self.session, 'localhost')
+        self.assertEquals(2, len(session.bulkwalk('.1.3.6.1.2.1.4.20.1.2', max_repetitions=10)))
+        self.assertEquals('eth0', session.get('.1.3.6.1.2.1.31.1.1.1.1.2').value)
+        self.assertRaises(easysnmp.EasySNMPNoSuchInstanceError, session.get, '.1.3.6.1.2.1.31.1.1.1.1.3')
+        session.save(self.filename)
+        # Only responses are recorded
+        replay = ReplaySession.from_fixture(self.filename, 'localhost')
+        self.assertEquals(2, len(replay.walk('.1.3.6.1.2.1.4.20.1.2')))
+        self.assertListEqual(['eth0'], [x.value for x in replay.walk('.1.3.6.1.2.1.31.1.1.1.1')])
+        # Errors are recorded too
+        self.session.set_error('Timeout')
+        self.assertRaises(easysnmp.EasySNMPError, session.walk, '.1.3.6.1.2.1.31.1.1.1.1')
+        session.save(self.filename)
+        replay = ReplaySession.from_fixture(self.filename, 'localhost')
+        self.assertRaises(easysnmp.EasySNMPError, replay.get, '.1.3.6.1.2.1.31.1.1.1.1.2')
+
+    def test_replay_session(self):
+        self.session.save(self.filename)
+        replay = ReplaySession.from_fixture(self.filename, 'localhost')
+        # GETNEXT walk takes a request per row plus one
+        self.assertEquals(3, len(replay.walk('.1.3.6.1.2.1.31.1.1.1.1')))
+        self.assertEquals(4, replay.requests)
+        # GETBULK walk takes a request per max_repetitions rows
+        replay.bulkwalk('.1.3.6.1.2.1.31.1.1.1.1', max_repetitions=2)
+        self.assertEquals(6, replay.requests)
+        replay.get(['.1.3.6.1.2.1.31.1.1.1.1.1', '.1.3.6.1.2.1.31.1.1.1.1.2'])
+        self.assertEquals(7, replay.requests)
+        # Missing fixture
+        replay = ReplaySession.from_fixture('test/missing.json', 'missing')
+        self.assertRaises(easysnmp.EasySNMPError, replay.walk, '.1.3.6.1.2.1')
+
+    def test_replay_loss(self):
+        replay = ReplaySession('localhost', loss=0.999999, timeout=0, retries=2)
+        self.assertRaises(easysnmp.EasySNMPTimeoutError, replay.walk, '.1.3.6.1.2.1')
+
+    def test_device_replay(self):
+        self.session.save(self.filename)
+        config = Config(filename='test/configuration_examples/simple.json')
+        config.data['snmp']['engine'] = 'replay'
+        config.data['snmp']['fixtures'] = {'dir': 'test'}
+        device = Device('localhost', config)
+        self.assertEquals(os.path.abspath(self.filename), device.get_fixture_filename())
+        self.assertTrue(device.get_interfaces())
+        self.assertListEqual([1, 2], sorted(device.interfaces.keys()))
+        self.assertEquals('eth0', device.interfaces[2].if_name)
+        self.assertFalse(Device('ajajaj', config).get_interfaces())
+
+    def test_device_record(self):
+        config = Config(filename='test/configuration_examples/simple.json')
+        config.data['snmp']['engine'] = 'record'
+        config.data['snmp']['fixtures'] = {'dir': 'test/fixtures_missing'}
+        device = Device('localhost', config)
+        filename = device.get_fixture_filename()
+        try:
+            # Fixtures directory is created
+            self.assertTrue(device.get_interfaces(session=RecordingSession(self.session, 'localhost')))
+            replay = ReplaySession.from_fixture(filename, 'localhost')
+            self.assertEquals(2, len(replay.walk('.1.3.6.1.2.1.4.20.1.2')))
+        finally:
+            if os.path.exists(filename):
+                os.remove(filename)
+            if os.path.isdir(os.path.dirname(filename)):
+                os.rmdir(os.path.dirname(filename))
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# DNS PTR updater
+# Copyright (C) 2017  Pavle Obradovic (pajaja)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+import logging
+import os
+import dns.query
+import dns.tsigkeyring
+import dns.update
+from dns.tsig import HMAC_MD5
+from classes import Config
+from classes import ZoneMirror
+from classes import ZoneTransfer
+
+
+class TestZoneTransfer(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            filename='test/unittest.log',
+            format="%(asctime)s - %(levelname)s - %(name)s:%(funcName)s - %(message)s",
+            level=logging.DEBUG,
+            filemode='w'
+        )
+        self.config = Config('test/configuration_examples/configuration.json')
+        self.zone_transfer = ZoneTransfer(*self.config.get_ns_axfr_master())
+        self.zone = '2.0.192.in-addr.arpa.'
+        self.mirror_filename = 'test/zone_mirror.json'
+
+    def tearDown(self):
+        if os.path.exists(self.mirror_filename):
+            os.remove(self.mirror_filename)
+
+    def _transfer_mirrored(self):
+        """
+        Transfer zone with a new ZoneTransfer (as in the next run) using mirror saved by previous one
+        """
+        zone_transfer = ZoneTransfer(
+            *self.config.get_ns_axfr_master(), mirror=ZoneMirror(self.config, filename=self.mirror_filename)
+        )
+        ptrs = zone_transfer.get_ptrs(self.zone)
+        zone_transfer.mirror.save()
+        return zone_transfer, ptrs
+
+    def _update(self, name, ptr=None):
+        hostname, key = self.config.get_ns_axfr_master()
+        keyring = dns.tsigkeyring.from_text({'nsupdate_key': key})
+        update = dns.update.Update(self.zone, keyring=keyring, keyalgorithm=HMAC_MD5)
+        if ptr:
+            update.replace(name, 300, 'PTR', ptr)
+        else:
+            update.delete(name)
+        dns.query.tcp(update, hostname)
+
+    def test_get_ptrs(self):
+        ptrs = self.zone_transfer.get_ptrs('2.0.192.in-addr.arpa.')
+        self.assertEquals('host1.domain.example.', ptrs['192.0.2.1'])
+        self.assertEquals('wrong.domain.example.', ptrs['192.0.2.10'])
+        self.assertNotIn('192.0.2.4', ptrs)
+        # Zone is transferred only once
+        self.assertIs(ptrs, self.zone_transfer.get_ptrs('2.0.192.in-addr.arpa.'))
+        self.assertEquals(1, self.zone_transfer.transfers)
+
+    def test_failed_transfer(self):
+        self.assertIsNone(self.zone_transfer.get_ptrs('100.51.198.in-addr.arpa.'))
+        self.assertIn('100.51.198.in-addr.arpa.', self.zone_transfer.zones)
+        self.assertEquals(0, self.zone_transfer.transfers)
+
+    def test_mirror_up_to_date(self):
+        zone_transfer, ptrs = self._transfer_mirrored()
+        self.assertEquals(1, zone_transfer.transfers)
+        serial, mirrored = zone_transfer.mirror.get_zone(self.zone)
+        self.assertDictEqual(ptrs, mirrored)
+        # Unchanged zone is not transferred again
+        zone_transfer, ptrs = self._transfer_mirrored()
+        self.assertEquals(0, zone_transfer.transfers)
+        self.assertEquals(0, zone_transfer.incremental_transfers)
+        self.assertEquals('host1.domain.example.', ptrs['192.0.2.1'])
+        self.assertEquals(serial, zone_transfer.mirror.get_zone(self.zone)[0])
+
+    def test_mirror_incremental(self):
+        self._transfer_mirrored()
+        self._update('50', 'host50.domain.example.')
+        try:
+            zone_transfer, ptrs = self._transfer_mirrored()
+            self.assertEquals(1, zone_transfer.incremental_transfers)
+            self.assertEquals(0, zone_transfer.transfers)
+            self.assertEquals('host50.domain.example.', ptrs['192.0.2.50'])
+            self.assertEquals('host1.domain.example.', ptrs['192.0.2.1'])
+        finally:
+            self._update('50')
+        zone_transfer, ptrs = self._transfer_mirrored()
+        self.assertEquals(1, zone_transfer.incremental_transfers)
+        self.assertNotIn('192.0.2.50', ptrs)
+
+    def test_mirror_serial_reset(self):
+        mirror = ZoneMirror(self.config, filename=self.mirror_filename)
+        mirror.set_zone(self.zone, 4000000000, {'192.0.2.99': 'stale.domain.example.'})
+        mirror.save()
+        zone_transfer, ptrs = self._transfer_mirrored()
+        self.assertEquals(1, zone_transfer.transfers)
+        self.assertNotIn('192.0.2.99', ptrs)